@@ -4,18 +4,39 @@ Génère des explications personnalisées pour recruteur et candidat
 Membre 5 - Niveau 1 & 2
 """
 
+import asyncio
+import hashlib
+import math
 import os
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+# LangChain (fournisseur LLM / langchain_core) importé à la demande : pas de coût au démarrage
 from pydantic import BaseModel, Field
 
+from app.ai.fournisseurs_llm import creer_llm, nom_modele
+from app.ai.registre_chaines import obtenir_chaine
+from app.ai.cache_explications import cle_explication, ecrire_explication, lire_explication
+from app.ai.explication_template import (
+    explication_candidat_template,
+    explication_recruteur_template,
+    generer_explications_template,
+)
+
 
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+MODELE_LLM = nom_modele()
+
+# Délai max d'un appel LLM d'explication (chemin async) avant repli sur le fallback
+EXPLICATION_TIMEOUT_S = float(os.getenv("EXPLICATION_TIMEOUT_S", "20"))
+# Nombre max d'appels LLM simultanés par chaîne pour les explications de listes (abatch)
+EXPLICATION_BATCH_CONCURRENCE = int(os.getenv("EXPLICATION_BATCH_CONCURRENCE", "4"))
+# Mode hybrid sur une liste : LLM pour les N premiers résultats, template pour les suivants
+EXPLICATION_HYBRIDE_TOP_LLM = int(os.getenv("EXPLICATION_HYBRIDE_TOP_LLM", "3"))
+
+# Threads dédiés aux appels sync concurrents (recruteur ‖ candidat) hors boucle d'événements
+_executor_explications = ThreadPoolExecutor(max_workers=8, thread_name_prefix="explication")
 
 
 # ============================================
@@ -105,23 +126,74 @@ RÈGLES :
 Retourne uniquement le JSON structuré.
 """
 
+# Version des prompts (change dès qu'un prompt est modifié) : invalide le cache d'explications
+VERSION_PROMPTS = hashlib.sha256((PROMPT_RECRUTEUR + PROMPT_CANDIDAT).encode("utf-8")).hexdigest()[:12]
+
 
 # ============================================
 # INITIALISATION DU LLM
 # ============================================
 
 def initialiser_llm():
-    """Initialise le modèle LangChain avec Groq"""
-    if not GROQ_API_KEY:
-        raise ValueError("❌ GROQ_API_KEY absente du fichier .env")
-    
-    llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.3,  # Un peu plus créatif pour les explications
-        groq_api_key=GROQ_API_KEY,
-        max_tokens=1500
-    )
-    return llm
+    """Initialise le modèle LangChain du fournisseur configuré (LLM_PROVIDER : groq, openai, stub)"""
+    return creer_llm(temperature=0.3, max_tokens=1500, timeout=EXPLICATION_TIMEOUT_S)
+
+
+# ============================================
+# CHAÎNES ET ENTRÉES DES PROMPTS
+# ============================================
+
+def creer_chaine_recruteur():
+    """Chaîne LangChain prompt → LLM → JSON pour l'explication recruteur"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
+    parser = JsonOutputParser(pydantic_object=ExplicationRecruteur)
+    prompt = ChatPromptTemplate.from_template(PROMPT_RECRUTEUR)
+    return prompt | initialiser_llm() | parser
+
+
+def creer_chaine_candidat():
+    """Chaîne LangChain prompt → LLM → JSON pour l'explication candidat"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
+    parser = JsonOutputParser(pydantic_object=ExplicationCandidat)
+    prompt = ChatPromptTemplate.from_template(PROMPT_CANDIDAT)
+    return prompt | initialiser_llm() | parser
+
+
+def entrees_recruteur(score_final: float, details: Dict, recommandation: str, titre_poste: str) -> Dict:
+    """Variables du PROMPT_RECRUTEUR à partir des détails du scoring"""
+    return {
+        "score_final": score_final,
+        "recommandation": recommandation,
+        "similarite": details["similarite_semantique"],
+        "comp_score": details["competences"]["score"],
+        "comp_trouvees": ", ".join(details["competences"]["trouvees"]) or "Aucune",
+        "comp_manquantes": ", ".join(details["competences"]["manquantes"]) or "Aucune",
+        "exp_score": details["experience"]["score"],
+        "exp_candidat": details["experience"]["annees_candidat"],
+        "exp_requis": details["experience"]["annees_requises"],
+        "form_score": details["formation"]["score"],
+        "lang_score": details["langues"]["score"],
+        "lang_trouvees": ", ".join(details["langues"]["trouvees"]) or "Aucune",
+        "lang_manquantes": ", ".join(details["langues"]["manquantes"]) or "Aucune",
+        "titre_poste": titre_poste
+    }
+
+
+def entrees_candidat(score_final: float, details: Dict, recommandation: str, titre_poste: str) -> Dict:
+    """Variables du PROMPT_CANDIDAT à partir des détails du scoring"""
+    return {
+        "score_final": score_final,
+        "recommandation": recommandation,
+        "comp_trouvees": ", ".join(details["competences"]["trouvees"]) or "Aucune compétence technique identifiée",
+        "comp_manquantes": ", ".join(details["competences"]["manquantes"]) or "Aucune",
+        "exp_candidat": details["experience"]["annees_candidat"],
+        "exp_requis": details["experience"]["annees_requises"],
+        "lang_trouvees": ", ".join(details["langues"]["trouvees"]) or "Non précisé",
+        "lang_manquantes": ", ".join(details["langues"]["manquantes"]) or "Aucune",
+        "titre_poste": titre_poste
+    }
 
 
 # ============================================
@@ -132,8 +204,9 @@ def generer_explication_recruteur(
     score_final: float,
     details: Dict,
     recommandation: str,
-    titre_poste: str
-) -> Dict:
+    titre_poste: str,
+    avec_fallback: bool = True
+) -> Optional[Dict]:
     """
     Génère une explication pour le recruteur.
     
@@ -144,53 +217,27 @@ def generer_explication_recruteur(
         titre_poste: Titre du poste de l'offre
         
     Returns:
-        Dict avec l'explication structurée
+        Dict avec l'explication structurée (None en cas d'échec si avec_fallback=False)
     """
     try:
-        # Préparer les données pour le prompt
-        comp_trouvees = ", ".join(details["competences"]["trouvees"]) or "Aucune"
-        comp_manquantes = ", ".join(details["competences"]["manquantes"]) or "Aucune"
-        lang_trouvees = ", ".join(details["langues"]["trouvees"]) or "Aucune"
-        lang_manquantes = ", ".join(details["langues"]["manquantes"]) or "Aucune"
-        
-        # Créer la chaîne LangChain
-        parser = JsonOutputParser(pydantic_object=ExplicationRecruteur)
-        prompt = ChatPromptTemplate.from_template(PROMPT_RECRUTEUR)
-        llm = initialiser_llm()
-        chain = prompt | llm | parser
-        
-        # Invoquer le LLM
-        resultat = chain.invoke({
-            "score_final": score_final,
-            "recommandation": recommandation,
-            "similarite": details["similarite_semantique"],
-            "comp_score": details["competences"]["score"],
-            "comp_trouvees": comp_trouvees,
-            "comp_manquantes": comp_manquantes,
-            "exp_score": details["experience"]["score"],
-            "exp_candidat": details["experience"]["annees_candidat"],
-            "exp_requis": details["experience"]["annees_requises"],
-            "form_score": details["formation"]["score"],
-            "lang_score": details["langues"]["score"],
-            "lang_trouvees": lang_trouvees,
-            "lang_manquantes": lang_manquantes,
-            "titre_poste": titre_poste
-        })
+        chain = obtenir_chaine("explication_recruteur", creer_chaine_recruteur)
+        resultat = chain.invoke(entrees_recruteur(score_final, details, recommandation, titre_poste))
         
         print("✅ Explication recruteur générée")
         return resultat
     
     except Exception as e:
         print(f"❌ Erreur génération explication recruteur: {e}")
-        return explication_recruteur_fallback(score_final, recommandation)
+        return explication_recruteur_fallback(score_final, recommandation) if avec_fallback else None
 
 
 def generer_explication_candidat(
     score_final: float,
     details: Dict,
     recommandation: str,
-    titre_poste: str
-) -> Dict:
+    titre_poste: str,
+    avec_fallback: bool = True
+) -> Optional[Dict]:
     """
     Génère une explication pour le candidat.
     
@@ -201,40 +248,78 @@ def generer_explication_candidat(
         titre_poste: Titre du poste de l'offre
         
     Returns:
-        Dict avec l'explication structurée
+        Dict avec l'explication structurée (None en cas d'échec si avec_fallback=False)
     """
     try:
-        # Préparer les données pour le prompt
-        comp_trouvees = ", ".join(details["competences"]["trouvees"]) or "Aucune compétence technique identifiée"
-        comp_manquantes = ", ".join(details["competences"]["manquantes"]) or "Aucune"
-        lang_trouvees = ", ".join(details["langues"]["trouvees"]) or "Non précisé"
-        lang_manquantes = ", ".join(details["langues"]["manquantes"]) or "Aucune"
-        
-        # Créer la chaîne LangChain
-        parser = JsonOutputParser(pydantic_object=ExplicationCandidat)
-        prompt = ChatPromptTemplate.from_template(PROMPT_CANDIDAT)
-        llm = initialiser_llm()
-        chain = prompt | llm | parser
-        
-        # Invoquer le LLM
-        resultat = chain.invoke({
-            "score_final": score_final,
-            "recommandation": recommandation,
-            "comp_trouvees": comp_trouvees,
-            "comp_manquantes": comp_manquantes,
-            "exp_candidat": details["experience"]["annees_candidat"],
-            "exp_requis": details["experience"]["annees_requises"],
-            "lang_trouvees": lang_trouvees,
-            "lang_manquantes": lang_manquantes,
-            "titre_poste": titre_poste
-        })
+        chain = obtenir_chaine("explication_candidat", creer_chaine_candidat)
+        resultat = chain.invoke(entrees_candidat(score_final, details, recommandation, titre_poste))
         
         print("✅ Explication candidat générée")
         return resultat
     
     except Exception as e:
         print(f"❌ Erreur génération explication candidat: {e}")
-        return explication_candidat_fallback(score_final, details)
+        return explication_candidat_fallback(score_final, details) if avec_fallback else None
+
+
+# ============================================
+# GÉNÉRATION ASYNC (ainvoke, appels concurrents)
+# ============================================
+
+async def agenerer_explication_recruteur(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    timeout: float = EXPLICATION_TIMEOUT_S,
+    avec_fallback: bool = True
+) -> Optional[Dict]:
+    """
+    Version async de generer_explication_recruteur (chain.ainvoke).
+    Repli sur explication_recruteur_fallback en cas d'erreur ou de dépassement de `timeout`
+    (None si avec_fallback=False).
+    """
+    try:
+        chain = obtenir_chaine("explication_recruteur", creer_chaine_recruteur)
+        resultat = await asyncio.wait_for(
+            chain.ainvoke(entrees_recruteur(score_final, details, recommandation, titre_poste)),
+            timeout=timeout
+        )
+        print("✅ Explication recruteur générée")
+        return resultat
+    except asyncio.TimeoutError:
+        print(f"⏱️ Explication recruteur : délai de {timeout}s dépassé, fallback")
+    except Exception as e:
+        print(f"❌ Erreur génération explication recruteur: {e}")
+    return explication_recruteur_fallback(score_final, recommandation) if avec_fallback else None
+
+
+async def agenerer_explication_candidat(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    timeout: float = EXPLICATION_TIMEOUT_S,
+    avec_fallback: bool = True
+) -> Optional[Dict]:
+    """
+    Version async de generer_explication_candidat (chain.ainvoke).
+    Repli sur explication_candidat_fallback en cas d'erreur ou de dépassement de `timeout`
+    (None si avec_fallback=False).
+    """
+    try:
+        chain = obtenir_chaine("explication_candidat", creer_chaine_candidat)
+        resultat = await asyncio.wait_for(
+            chain.ainvoke(entrees_candidat(score_final, details, recommandation, titre_poste)),
+            timeout=timeout
+        )
+        print("✅ Explication candidat générée")
+        return resultat
+    except asyncio.TimeoutError:
+        print(f"⏱️ Explication candidat : délai de {timeout}s dépassé, fallback")
+    except Exception as e:
+        print(f"❌ Erreur génération explication candidat: {e}")
+    return explication_candidat_fallback(score_final, details) if avec_fallback else None
 
 
 # ============================================
@@ -271,41 +356,322 @@ def explication_candidat_fallback(score: float, details: Dict) -> Dict:
 # FONCTION PRINCIPALE
 # ============================================
 
+def _cle_cache(score_final: float, details: Dict, recommandation: str, titre_poste: str) -> str:
+    return cle_explication(score_final, details, recommandation, titre_poste, VERSION_PROMPTS, MODELE_LLM)
+
+
+def _assembler(
+    recruteur: Optional[Dict],
+    candidat: Optional[Dict],
+    cle: Optional[str],
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    mode: str = "llm"
+) -> Dict:
+    """
+    Met en cache si les 2 appels LLM ont réussi, sinon complète (sans mettre en cache) avec
+    les fallbacks (mode llm) ou les explications template (mode hybrid).
+    """
+    if recruteur is not None and candidat is not None:
+        explications = {"pour_recruteur": recruteur, "pour_candidat": candidat}
+        if cle is not None:
+            ecrire_explication(cle, explications)
+        return explications
+    if mode == "hybrid":
+        return {
+            "pour_recruteur": recruteur or explication_recruteur_template(score_final, details, recommandation, titre_poste),
+            "pour_candidat": candidat or explication_candidat_template(score_final, details, recommandation, titre_poste)
+        }
+    return {
+        "pour_recruteur": recruteur or explication_recruteur_fallback(score_final, recommandation),
+        "pour_candidat": candidat or explication_candidat_fallback(score_final, details)
+    }
+
+
+async def agenerer_explications_completes(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    timeout: float = EXPLICATION_TIMEOUT_S,
+    utiliser_cache: bool = True,
+    mode: str = "llm"
+) -> Dict:
+    """
+    Génère les explications recruteur et candidat en parallèle (2 appels LLM concurrents).
+    
+    Args:
+        score_final: Score de matching (0-100)
+        details: Détails du scoring
+        recommandation: EXCELLENT, BON, MOYEN, FAIBLE
+        titre_poste: Titre du poste
+        timeout: Délai max par appel LLM (secondes) avant fallback
+        utiliser_cache: Si False, ignore le cache en lecture et en écriture
+        mode: template (sans LLM), llm, ou hybrid (LLM avec repli sur le template)
+        
+    Returns:
+        Dict avec explications recruteur et candidat
+    """
+    if mode == "template":
+        return generer_explications_template(score_final, details, recommandation, titre_poste)
+    
+    cle = _cle_cache(score_final, details, recommandation, titre_poste) if utiliser_cache else None
+    if cle is not None:
+        en_cache = await asyncio.to_thread(lire_explication, cle)
+        if en_cache is not None:
+            print("♻️ Explications servies depuis le cache")
+            return en_cache
+    
+    print("\n🤖 Génération des explications IA (recruteur + candidat en parallèle)...")
+    
+    explication_recruteur, explication_candidat = await asyncio.gather(
+        agenerer_explication_recruteur(score_final, details, recommandation, titre_poste, timeout, avec_fallback=False),
+        agenerer_explication_candidat(score_final, details, recommandation, titre_poste, timeout, avec_fallback=False)
+    )
+    
+    return await asyncio.to_thread(
+        _assembler, explication_recruteur, explication_candidat, cle,
+        score_final, details, recommandation, titre_poste, mode
+    )
+
+
 def generer_explications_completes(
     score_final: float,
     details: Dict,
     recommandation: str,
-    titre_poste: str
+    titre_poste: str,
+    utiliser_cache: bool = True,
+    mode: str = "llm"
 ) -> Dict:
     """
     Génère les explications complètes pour recruteur et candidat.
+    Point d'entrée synchrone (threads du pool d'inférence, endpoints sync) :
+    les deux appels LLM sont lancés en parallèle dans des threads dédiés.
     
     Args:
         score_final: Score de matching (0-100)
         details: Détails du scoring
         recommandation: EXCELLENT, BON, MOYEN, FAIBLE
         titre_poste: Titre du poste
+        utiliser_cache: Si False, ignore le cache en lecture et en écriture
+        mode: template (sans LLM), llm, ou hybrid (LLM avec repli sur le template)
         
     Returns:
         Dict avec explications recruteur et candidat
     """
-    print("\n🤖 Génération des explications IA...")
+    if mode == "template":
+        return generer_explications_template(score_final, details, recommandation, titre_poste)
+    
+    cle = _cle_cache(score_final, details, recommandation, titre_poste) if utiliser_cache else None
+    if cle is not None:
+        en_cache = lire_explication(cle)
+        if en_cache is not None:
+            print("♻️ Explications servies depuis le cache")
+            return en_cache
     
-    explication_recruteur = generer_explication_recruteur(
-        score_final,
-        details,
-        recommandation,
-        titre_poste
+    print("\n🤖 Génération des explications IA (recruteur + candidat en parallèle)...")
+    
+    # Les 2 appels sync partagent le client HTTP du registre ; chacun est borné par le timeout du LLM
+    futur_recruteur = _executor_explications.submit(
+        generer_explication_recruteur, score_final, details, recommandation, titre_poste, False
+    )
+    futur_candidat = _executor_explications.submit(
+        generer_explication_candidat, score_final, details, recommandation, titre_poste, False
     )
     
-    explication_candidat = generer_explication_candidat(
-        score_final,
-        details,
-        recommandation,
-        titre_poste
+    return _assembler(
+        futur_recruteur.result(), futur_candidat.result(), cle,
+        score_final, details, recommandation, titre_poste, mode
     )
+
+
+# ============================================
+# EXPLICATIONS D'UNE LISTE CLASSÉE (top_k)
+# ============================================
+
+async def _abatch(nom: str, fabrique, entrees: List[Dict], concurrence: int, timeout: float) -> List[Optional[Dict]]:
+    """abatch plafonné à `concurrence` appels simultanés ; None pour chaque appel en échec."""
+    if not entrees:
+        return []
+    vagues = math.ceil(len(entrees) / max(1, concurrence))
+    try:
+        chain = obtenir_chaine(nom, fabrique)
+        resultats = await asyncio.wait_for(
+            chain.abatch(entrees, config={"max_concurrency": concurrence}, return_exceptions=True),
+            timeout=timeout * vagues
+        )
+    except asyncio.TimeoutError:
+        print(f"⏱️ Lot {nom} : délai de {timeout * vagues}s dépassé, fallback")
+        return [None] * len(entrees)
+    except Exception as e:
+        print(f"❌ Erreur lot {nom}: {e}")
+        return [None] * len(entrees)
     
-    return {
-        "pour_recruteur": explication_recruteur,
-        "pour_candidat": explication_candidat
-    }
\ No newline at end of file
+    echecs = sum(1 for r in resultats if isinstance(r, BaseException))
+    if echecs:
+        print(f"⚠️ Lot {nom} : {echecs}/{len(entrees)} appels en échec, fallback pour ceux-ci")
+    return [None if isinstance(r, BaseException) else r for r in resultats]
+
+
+async def agenerer_explications_lot(
+    elements: List[Dict],
+    concurrence: int = EXPLICATION_BATCH_CONCURRENCE,
+    timeout: float = EXPLICATION_TIMEOUT_S,
+    utiliser_cache: bool = True,
+    mode: str = "llm"
+) -> List[Dict]:
+    """
+    Explications recruteur + candidat pour une liste de résultats (le top_k d'un classement).
+    Les éléments déjà en cache sont servis directement ; les autres passent par un abatch
+    par chaîne (recruteur et candidat lancés en parallèle), soit au plus 2k appels LLM.
+    
+    Args:
+        elements: Dicts avec score_final, details, recommandation, titre_poste
+        concurrence: Nombre max d'appels LLM simultanés par chaîne
+        timeout: Délai max par vague d'appels (secondes) avant fallback
+        utiliser_cache: Si False, ignore le cache en lecture et en écriture
+        mode: template (aucun appel LLM), llm, ou hybrid (LLM pour les
+              EXPLICATION_HYBRIDE_TOP_LLM premiers, template pour les suivants et en repli)
+        
+    Returns:
+        List[Dict]: explications {pour_recruteur, pour_candidat}, dans l'ordre des éléments
+    """
+    explications: List[Optional[Dict]] = [None] * len(elements)
+    cles: List[Optional[str]] = [None] * len(elements)
+    
+    a_generer = []
+    for i, e in enumerate(elements):
+        if mode == "template" or (mode == "hybrid" and i >= EXPLICATION_HYBRIDE_TOP_LLM):
+            explications[i] = generer_explications_template(
+                e["score_final"], e["details"], e["recommandation"], e["titre_poste"]
+            )
+            continue
+        if utiliser_cache:
+            cles[i] = _cle_cache(e["score_final"], e["details"], e["recommandation"], e["titre_poste"])
+            explications[i] = await asyncio.to_thread(lire_explication, cles[i])
+        if explications[i] is None:
+            a_generer.append(i)
+    
+    if a_generer:
+        print(f"\n🤖 Génération des explications IA pour {len(a_generer)} résultat(s) "
+              f"({len(elements) - len(a_generer)} en cache ou template)...")
+        args = [
+            (elements[i]["score_final"], elements[i]["details"], elements[i]["recommandation"], elements[i]["titre_poste"])
+            for i in a_generer
+        ]
+        recruteurs, candidats = await asyncio.gather(
+            _abatch("explication_recruteur", creer_chaine_recruteur,
+                    [entrees_recruteur(*a) for a in args], concurrence, timeout),
+            _abatch("explication_candidat", creer_chaine_candidat,
+                    [entrees_candidat(*a) for a in args], concurrence, timeout)
+        )
+        for i, a, recruteur, candidat in zip(a_generer, args, recruteurs, candidats):
+            explications[i] = await asyncio.to_thread(
+                _assembler, recruteur, candidat, cles[i], *a, mode
+            )
+    
+    return explications
+
+
+# ============================================
+# STREAMING (SSE) : champs émis au fil des tokens
+# ============================================
+
+async def _streamer(
+    cible: str,
+    nom: str,
+    fabrique,
+    entrees: Dict,
+    file: "asyncio.Queue",
+    timeout: float
+) -> Optional[Dict]:
+    """
+    Consomme chain.astream (JsonOutputParser → JSON partiel de plus en plus complet)
+    et pousse dans `file` les champs modifiés depuis le dernier envoi, puis None en fin de flux.
+    Retourne le JSON final (None en cas d'échec).
+    """
+    dernier: Dict = {}
+    
+    async def _consommer():
+        chain = obtenir_chaine(nom, fabrique)
+        async for partiel in chain.astream(entrees):
+            if not isinstance(partiel, dict):
+                continue
+            champs = {k: v for k, v in partiel.items() if dernier.get(k) != v}
+            if champs:
+                dernier.update(champs)
+                await file.put({"cible": cible, "champs": champs})
+    
+    try:
+        await asyncio.wait_for(_consommer(), timeout=timeout)
+        print(f"✅ Explication {cible} streamée")
+        return dict(dernier)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Explication {cible} (stream) : délai de {timeout}s dépassé, fallback")
+    except Exception as e:
+        print(f"❌ Erreur streaming explication {cible}: {e}")
+    finally:
+        file.put_nowait(None)  # fin de ce flux
+    return None
+
+
+async def astream_explications(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    timeout: float = EXPLICATION_TIMEOUT_S,
+    mode: str = "llm"
+) -> AsyncIterator[Dict]:
+    """
+    Explications recruteur + candidat en streaming : les 2 chaînes sont lancées en parallèle
+    et chaque champ (synthese, message_principal, listes...) est émis dès qu'il progresse.
+    
+    Yields:
+        {"type": "partiel", "cible": "recruteur"|"candidat", "champs": {...}} au fil des tokens,
+        puis {"type": "final", "source": "cache"|"template"|"llm", "explications": {...}}
+    """
+    if mode == "template":
+        yield {"type": "final", "source": "template",
+               "explications": generer_explications_template(score_final, details, recommandation, titre_poste)}
+        return
+    
+    cle = _cle_cache(score_final, details, recommandation, titre_poste)
+    en_cache = await asyncio.to_thread(lire_explication, cle)
+    if en_cache is not None:
+        yield {"type": "final", "source": "cache", "explications": en_cache}
+        return
+    
+    file: asyncio.Queue = asyncio.Queue()
+    taches = [
+        asyncio.create_task(_streamer(
+            "recruteur", "explication_recruteur", creer_chaine_recruteur,
+            entrees_recruteur(score_final, details, recommandation, titre_poste), file, timeout
+        )),
+        asyncio.create_task(_streamer(
+            "candidat", "explication_candidat", creer_chaine_candidat,
+            entrees_candidat(score_final, details, recommandation, titre_poste), file, timeout
+        )),
+    ]
+    try:
+        # Relaie les morceaux des 2 flux jusqu'à leurs 2 marqueurs de fin
+        flux_actifs = len(taches)
+        while flux_actifs:
+            morceau = await file.get()
+            if morceau is None:
+                flux_actifs -= 1
+                continue
+            yield {"type": "partiel", **morceau}
+        
+        recruteur, candidat = [await t for t in taches]
+        explications = await asyncio.to_thread(
+            _assembler, recruteur, candidat, cle, score_final, details, recommandation, titre_poste, mode
+        )
+        yield {"type": "final", "source": "llm", "explications": explications}
+    finally:
+        # Client déconnecté : on n'attend pas la fin des appels LLM
+        for t in taches:
+            if not t.done():
+                t.cancel()
@@ -5,26 +5,37 @@ Membre 3 - Niveau 1 & 2
 - Stockage du JSON en base de données
 """
 
+import hashlib
 import os
 import json
 import shutil
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional, Union
 from dotenv import load_dotenv
-import PyPDF2
-from io import BytesIO
-from datetime import datetime
 from pathlib import Path
 
-# LangChain imports
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+# LangChain (fournisseur LLM / langchain_core) importé à la demande : pas de coût au démarrage
 from pydantic import BaseModel, Field
 
+from app.ai.cache_extractions import (
+    cle_extraction,
+    compter_contournement,
+    ecrire_extraction,
+    lire_extraction,
+    version_prompt,
+)
+from app.ai.compaction_texte import compacter_texte_cv
+from app.ai.extraction_pdf import extraire_pages_pdf
+from app.ai.fournisseurs_llm import creer_llm, nom_modele
+from app.ai.registre_chaines import obtenir_chaine
+
 
 # Charger les variables d'environnement
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# Variante du prompt d'extraction : "complet" (texte brut intégral) ou "compact"
+CV_PROMPT_MODE = os.getenv("CV_PROMPT_MODE", "complet")
+# Budget de tokens du texte du CV en mode compact
+CV_PROMPT_BUDGET_TOKENS = int(os.getenv("CV_PROMPT_BUDGET_TOKENS", "1500"))
 
 # Dossier pour stocker les PDF uploadés
 UPLOAD_DIR = Path("uploads/cvs")
@@ -90,55 +101,66 @@ CV À ANALYSER :
 Retourne uniquement le JSON structuré selon le schéma défini.
 """
 
+# Variante compacte : mêmes champs, consignes réduites, texte du CV compacté (compaction_texte)
+PROMPT_TEMPLATE_COMPACT = """
+Extrais ce CV en JSON avec les clés : nom, email, telephone, competences (liste),
+experiences (poste, entreprise, periode, description), formations (diplome, etablissement, annee),
+langues (avec niveau si indiqué). Valeur absente : null ou []. Réponds uniquement par le JSON.
+
+CV :
+{cv_text}
+"""
+
 
 # ============================================
 # CONFIGURATION LANGCHAIN
 # ============================================
 
 def initialiser_llm():
-    """Initialise le modèle LangChain avec Groq"""
-    if not GROQ_API_KEY:
-        raise ValueError("❌ GROQ_API_KEY absente du fichier .env")
-    
-    llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.1,
-        groq_api_key=GROQ_API_KEY,
-        max_tokens=2000
-    )
-    return llm
+    """Initialise le modèle LangChain du fournisseur configuré (LLM_PROVIDER : groq, openai, stub)"""
+    return creer_llm(temperature=0.1, max_tokens=2000)
 
 
-def creer_chaine_extraction():
+def creer_chaine_extraction(template: str = PROMPT_TEMPLATE):
     """Crée la chaîne LangChain pour l'extraction de CV"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
     parser = JsonOutputParser(pydantic_object=CVStructure)
-    prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+    prompt = ChatPromptTemplate.from_template(template)
     llm = initialiser_llm()
     chain = prompt | llm | parser
     return chain
 
 
+def creer_chaine_extraction_compacte():
+    """Chaîne d'extraction de CV avec le prompt compact"""
+    return creer_chaine_extraction(PROMPT_TEMPLATE_COMPACT)
+
+
 # ============================================
 # FONCTIONS D'EXTRACTION
 # ============================================
 
-def extraire_texte_pdf(fichier_pdf: bytes) -> str:
+def extraire_texte_pdf(fichier_pdf: Union[bytes, str, Path, BinaryIO]) -> str:
     """
-    Extrait le texte brut d'un fichier PDF.
+    Extrait le texte brut d'un fichier PDF (pages extraites en parallèle dans le pool de processus).
     
     Args:
-        fichier_pdf: Contenu binaire du PDF
+        fichier_pdf: Chemin du fichier (préféré : les processus lisent le disque),
+            contenu binaire du PDF ou fichier ouvert en binaire
         
     Returns:
         str: Texte extrait du PDF
     """
     try:
-        pdf_file = BytesIO(fichier_pdf)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        if isinstance(fichier_pdf, Path):
+            source = str(fichier_pdf)
+        elif isinstance(fichier_pdf, (str, bytes)):
+            source = fichier_pdf
+        else:
+            source = fichier_pdf.read()
         
-        texte_complet = ""
-        for page in pdf_reader.pages:
-            texte_complet += page.extract_text() + "\n"
+        texte_complet = "\n".join(extraire_pages_pdf(source))
         
         if not texte_complet.strip():
             raise ValueError("Le PDF ne contient pas de texte extractible")
@@ -151,34 +173,73 @@ def extraire_texte_pdf(fichier_pdf: bytes) -> str:
         raise
 
 
-def extraire_cv_texte(texte_cv: str) -> Dict:
+def _cle_cache(texte_cv: str, mode: str) -> str:
+    """Clé du cache d'extraction : texte normalisé + variante/version du prompt + modèle."""
+    schema = json.dumps(CVStructure.model_json_schema(), sort_keys=True)
+    if mode == "compact":
+        version = version_prompt(PROMPT_TEMPLATE_COMPACT, schema, str(CV_PROMPT_BUDGET_TOKENS))
+        return cle_extraction("cv_compact", texte_cv, version, nom_modele())
+    return cle_extraction("cv", texte_cv, version_prompt(PROMPT_TEMPLATE, schema), nom_modele())
+
+
+def extraire_cv_texte(
+    texte_cv: str,
+    mode: Optional[str] = None,
+    avec_fallback: bool = True,
+    utiliser_cache: bool = True,
+    rafraichir: bool = False
+) -> Dict:
     """
     Analyse un CV texte avec LangChain et retourne un JSON structuré.
+    Un texte identique (après normalisation) déjà analysé avec le même prompt et le même
+    modèle est servi par le cache d'extractions, sans appel LLM.
     
     Args:
         texte_cv: Contenu texte du CV
+        mode: "complet" ou "compact" (défaut : CV_PROMPT_MODE)
+        avec_fallback: Si False, l'erreur LLM est propagée au lieu d'un CV vide
+        utiliser_cache: Si False, ignore le cache en lecture et en écriture
+        rafraichir: Si True, rappelle le LLM et remplace l'entrée en cache
         
     Returns:
         dict: CV structuré selon CVStructure
     """
+    mode = mode or CV_PROMPT_MODE
+    cle = _cle_cache(texte_cv, mode) if utiliser_cache else None
+    if cle and not rafraichir:
+        en_cache = lire_extraction(cle)
+        if en_cache is not None:
+            print("♻️  CV déjà analysé : extraction servie par le cache")
+            return en_cache
+    else:
+        compter_contournement(rafraichir)
+
     try:
-        print("🔄 Création de la chaîne LangChain...")
-        chain = creer_chaine_extraction()
+        if mode == "compact":
+            texte_cv = compacter_texte_cv(texte_cv, CV_PROMPT_BUDGET_TOKENS)
+            chain = obtenir_chaine("extraction_cv_compact", creer_chaine_extraction_compacte)
+        else:
+            chain = obtenir_chaine("extraction_cv", creer_chaine_extraction)  # construite une seule fois par process
         
-        print("🤖 Envoi à Groq via LangChain...")
+        print("🤖 Envoi au LLM via LangChain...")
         resultat = chain.invoke({"cv_text": texte_cv})
         
         print("✅ Réponse reçue et parsée")
+        if cle and isinstance(resultat, dict):
+            ecrire_extraction(cle, resultat)
         return resultat
     
     except Exception as e:
         print(f"❌ Erreur lors de l'analyse LangChain: {str(e)}")
+        if not avec_fallback:
+            raise
         return structure_cv_vide()
 
 
 def sauvegarder_fichier_pdf(fichier_pdf: bytes, nom_fichier: str) -> str:
     """
-    Sauvegarde le fichier PDF dans le dossier uploads/cvs/.
+    Sauvegarde le fichier PDF dans le dossier uploads/cvs/, sous son empreinte SHA-256
+    (même stockage adressé par contenu que POST /cvs/upload : un PDF identique n'est écrit qu'une fois).
     
     Args:
         fichier_pdf: Contenu binaire du PDF
@@ -187,18 +248,14 @@ def sauvegarder_fichier_pdf(fichier_pdf: bytes, nom_fichier: str) -> str:
     Returns:
         str: Chemin relatif du fichier sauvegardé
     """
+    from app.services.upload_cv import chemin_par_empreinte
     try:
-        # Créer un nom unique avec timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nom_base = Path(nom_fichier).stem  # Nom sans extension
-        extension = Path(nom_fichier).suffix  # .pdf
-        
-        nom_unique = f"{nom_base}_{timestamp}{extension}"
-        chemin_complet = UPLOAD_DIR / nom_unique
+        chemin_complet = chemin_par_empreinte(hashlib.sha256(fichier_pdf).hexdigest(), UPLOAD_DIR)
         
-        # Sauvegarder le fichier
-        with open(chemin_complet, 'wb') as f:
-            f.write(fichier_pdf)
+        # Sauvegarder le fichier (déjà présent : contenu identique)
+        if not chemin_complet.exists():
+            with open(chemin_complet, 'wb') as f:
+                f.write(fichier_pdf)
         
         chemin_relatif = str(chemin_complet)
         print(f"💾 PDF sauvegardé : {chemin_relatif}")
@@ -10,16 +10,22 @@ import json
 from typing import Dict, Optional, List, Union
 from dotenv import load_dotenv
 
-# LangChain imports
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+# LangChain (fournisseur LLM / langchain_core) importé à la demande : pas de coût au démarrage
 from pydantic import BaseModel, Field
 
+from app.ai.cache_extractions import (
+    cle_extraction,
+    compter_contournement,
+    ecrire_extraction,
+    lire_extraction,
+    version_prompt,
+)
+from app.ai.fournisseurs_llm import creer_llm, nom_modele
+from app.ai.registre_chaines import obtenir_chaine
+
 
 # Charger les variables d'environnement
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 
 # ============================================
@@ -87,21 +93,14 @@ Retourne uniquement le JSON structuré selon le schéma défini.
 # ============================================
 
 def initialiser_llm():
-    """Initialise le modèle LangChain avec Groq"""
-    if not GROQ_API_KEY:
-        raise ValueError("❌ GROQ_API_KEY absente du fichier .env")
-    
-    llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.1,
-        groq_api_key=GROQ_API_KEY,
-        max_tokens=2000
-    )
-    return llm
+    """Initialise le modèle LangChain du fournisseur configuré (LLM_PROVIDER : groq, openai, stub)"""
+    return creer_llm(temperature=0.1, max_tokens=2000)
 
 
 def creer_chaine_extraction_offre():
     """Crée la chaîne LangChain pour l'extraction d'offre"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
     parser = JsonOutputParser(pydantic_object=OffreEmploiStructure)
     prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
     llm = initialiser_llm()
@@ -113,24 +112,41 @@ def creer_chaine_extraction_offre():
 # FONCTIONS D'EXTRACTION
 # ============================================
 
-def analyser_offre_texte(texte_offre: str) -> Dict:
+def analyser_offre_texte(texte_offre: str, utiliser_cache: bool = True, rafraichir: bool = False) -> Dict:
     """
     Analyse une offre d'emploi texte avec LangChain et retourne un JSON structuré.
+    Une offre au texte identique (après normalisation) déjà analysée avec le même prompt
+    et le même modèle est servie par le cache d'extractions, sans appel LLM.
     
     Args:
         texte_offre: Contenu texte de l'offre
+        utiliser_cache: Si False, ignore le cache en lecture et en écriture
+        rafraichir: Si True, rappelle le LLM et remplace l'entrée en cache
         
     Returns:
         dict: Offre structurée selon OffreEmploiStructure
     """
+    cle = None
+    if utiliser_cache:
+        schema = json.dumps(OffreEmploiStructure.model_json_schema(), sort_keys=True)
+        cle = cle_extraction("offre", texte_offre, version_prompt(PROMPT_TEMPLATE, schema), nom_modele())
+    if cle and not rafraichir:
+        en_cache = lire_extraction(cle)
+        if en_cache is not None:
+            print("♻️  Offre déjà analysée : extraction servie par le cache")
+            return en_cache
+    else:
+        compter_contournement(rafraichir)
+
     try:
-        print("🔄 Création de la chaîne LangChain pour offre...")
-        chain = creer_chaine_extraction_offre()
+        chain = obtenir_chaine("extraction_offre", creer_chaine_extraction_offre)  # construite une seule fois par process
         
         print("🤖 Envoi à Groq via LangChain...")
         resultat = chain.invoke({"offre_text": texte_offre})
         
         print("✅ Réponse reçue et parsée")
+        if cle and isinstance(resultat, dict):
+            ecrire_extraction(cle, resultat)
         return resultat
     
     except Exception as e:
@@ -141,6 +157,8 @@ def analyser_offre_texte(texte_offre: str) -> Dict:
 def analyser_offre_complete(
     titre: str,
     description: str,
+    utiliser_cache: bool = True,
+    rafraichir: bool = False,
     **kwargs
 ) -> Dict:
     """
@@ -149,6 +167,8 @@ def analyser_offre_complete(
     Args:
         titre: Titre du poste
         description: Description du poste
+        utiliser_cache: Si False, ignore le cache d'extractions
+        rafraichir: Si True, rappelle le LLM et remplace l'entrée en cache
         **kwargs: Autres informations optionnelles
         
     Returns:
@@ -182,7 +202,7 @@ DESCRIPTION :
             texte_offre += salaire_info
         
         print("📄 Analyse de l'offre d'emploi...")
-        offre_json = analyser_offre_texte(texte_offre)
+        offre_json = analyser_offre_texte(texte_offre, utiliser_cache=utiliser_cache, rafraichir=rafraichir)
         
         print("✅ Analyse terminée !")
         
@@ -0,0 +1,74 @@
+"""
+Cache des explications IA (recruteur + candidat).
+L'explication ne dépend que de score_final, recommandation, titre_poste et details :
+la clé est un hash canonique de ces entrées + version des prompts + modèle LLM.
+Stockage : CacheHierarchise (LRU mémoire par worker + SQLite partagé, TTL).
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from app.ai.cache_hierarchise import CacheHierarchise
+
+
+# Durée de vie d'une explication en cache (secondes, 0 = pas d'expiration)
+CACHE_TTL_S = int(os.getenv("EXPLICATION_CACHE_TTL_S", str(7 * 24 * 3600)))
+# Taille max du LRU mémoire (nb d'explications, 0 = désactivé)
+CACHE_TAILLE_MAX = int(os.getenv("EXPLICATION_CACHE_SIZE", "2000"))
+# Fichier SQLite partagé entre workers, désactivé si vide
+CACHE_DISQUE = os.getenv("EXPLICATION_CACHE_PATH", "cache/explications.sqlite")
+# Nombre max de lignes du tier disque (les moins récemment utilisées sont purgées)
+CACHE_DISQUE_MAX = int(os.getenv("EXPLICATION_CACHE_DISK_MAX", "50000"))
+
+cache = CacheHierarchise("explications", CACHE_TTL_S, CACHE_TAILLE_MAX, CACHE_DISQUE, CACHE_DISQUE_MAX)
+
+
+def cle_explication(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str,
+    version_prompt: str,
+    modele: str
+) -> str:
+    """Hash SHA-256 canonique (JSON trié, sans espaces) des entrées de l'explication."""
+    canonique = json.dumps(
+        {
+            "score_final": score_final,
+            "recommandation": recommandation,
+            "titre_poste": titre_poste,
+            "details": details,
+            "version_prompt": version_prompt,
+            "modele": modele,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonique.encode("utf-8")).hexdigest()
+
+
+def lire_explication(cle: str) -> Optional[Dict]:
+    """
+    Explication en cache (mémoire puis disque), None si absente ou expirée.
+    Renvoie une copie : l'appelant peut compléter le dict sans altérer le cache.
+    """
+    return cache.lire(cle)
+
+
+def ecrire_explication(cle: str, valeur: Dict) -> None:
+    """Mémorise une explication générée par le LLM (jamais un fallback)."""
+    cache.ecrire(cle, valeur)
+
+
+def stats_cache_explications() -> Dict:
+    """Compteurs hits (mémoire/disque), misses, évictions, expirations et hit rate."""
+    return cache.stats()
+
+
+def vider_cache_explications(disque: bool = False) -> None:
+    """Vide le cache mémoire (et le tier disque si `disque=True`)."""
+    cache.vider(disque)
@@ -0,0 +1,89 @@
+"""
+Cache des extractions LLM (CV et offres structurés en JSON).
+Le JSON extrait ne dépend que du texte envoyé, du prompt et du modèle :
+la clé est un hash du texte normalisé (espaces, lignes vides, Unicode NFC) + type
+d'extraction + version du prompt + modèle LLM. Une offre republiée ou un CV ré-exporté
+avec d'autres métadonnées ne repasse donc pas par le LLM.
+Stockage : CacheHierarchise (LRU mémoire par worker + SQLite partagé, TTL).
+"""
+
+import hashlib
+import json
+import os
+import unicodedata
+from typing import Dict, Optional
+
+from app.ai.cache_hierarchise import CacheHierarchise
+from app.ai.compaction_texte import normaliser_texte
+
+
+# Durée de vie d'une extraction en cache (secondes, 0 = pas d'expiration)
+CACHE_TTL_S = int(os.getenv("EXTRACTION_CACHE_TTL_S", str(30 * 24 * 3600)))
+# Taille max du LRU mémoire (nb d'extractions, 0 = désactivé)
+CACHE_TAILLE_MAX = int(os.getenv("EXTRACTION_CACHE_SIZE", "500"))
+# Fichier SQLite partagé entre workers, désactivé si vide
+CACHE_DISQUE = os.getenv("EXTRACTION_CACHE_PATH", "cache/extractions.sqlite")
+# Nombre max de lignes du tier disque (les moins récemment utilisées sont purgées)
+CACHE_DISQUE_MAX = int(os.getenv("EXTRACTION_CACHE_DISK_MAX", "20000"))
+
+cache = CacheHierarchise(
+    "extractions", CACHE_TTL_S, CACHE_TAILLE_MAX, CACHE_DISQUE, CACHE_DISQUE_MAX,
+    compteurs=("contournements", "rafraichissements"),
+)
+
+
+def version_prompt(*elements: str) -> str:
+    """Empreinte courte d'un prompt (template, schéma JSON, paramètres de préparation du texte)."""
+    return hashlib.sha256("\x1f".join(elements).encode("utf-8")).hexdigest()[:12]
+
+
+def cle_extraction(type_extraction: str, texte: str, version: str, modele: str) -> str:
+    """
+    Hash SHA-256 canonique d'une extraction.
+
+    Args:
+        type_extraction: "cv", "cv_compact", "offre"...
+        texte: Texte brut (normalisé ici : mise en forme et métadonnées d'export ignorées)
+        version: Version du prompt (version_prompt)
+        modele: Modèle LLM
+    """
+    texte_normalise = normaliser_texte(unicodedata.normalize("NFC", texte or ""))
+    canonique = json.dumps(
+        {
+            "type": type_extraction,
+            "texte": hashlib.sha256(texte_normalise.encode("utf-8")).hexdigest(),
+            "version_prompt": version,
+            "modele": modele,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonique.encode("utf-8")).hexdigest()
+
+
+def lire_extraction(cle: str) -> Optional[Dict]:
+    """
+    Extraction en cache (mémoire puis disque), None si absente ou expirée.
+    Renvoie une copie : l'appelant peut compléter le JSON sans altérer le cache.
+    """
+    return cache.lire(cle)
+
+
+def ecrire_extraction(cle: str, valeur: Dict) -> None:
+    """Mémorise un JSON extrait par le LLM (jamais une structure vide de fallback)."""
+    cache.ecrire(cle, valeur)
+
+
+def compter_contournement(rafraichir: bool) -> None:
+    """Appel LLM forcé : cache ignoré (utiliser_cache=False) ou rafraîchi (rafraichir=True)."""
+    cache.compter("rafraichissements" if rafraichir else "contournements")
+
+
+def stats_cache_extractions() -> Dict:
+    """Compteurs hits (mémoire/disque), misses, contournements, évictions, expirations et hit rate."""
+    return cache.stats()
+
+
+def vider_cache_extractions(disque: bool = False) -> None:
+    """Vide le cache mémoire (et le tier disque si `disque=True`)."""
+    cache.vider(disque)
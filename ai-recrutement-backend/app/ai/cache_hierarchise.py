@@ -0,0 +1,177 @@
+"""
+Cache à deux niveaux pour les résultats JSON du LLM (explications, extractions...).
+- Tier mémoire : LRU borné avec TTL (par worker)
+- Tier disque : SQLite partagé entre workers du même hôte (TTL + taille max)
+Les valeurs sont copiées en lecture et en écriture : l'appelant peut les compléter sans altérer le cache.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# Purge du tier disque toutes les N écritures
+PURGE_TOUTES_LES = 100
+
+
+class CacheHierarchise:
+    """
+    Cache LRU + TTL en mémoire, adossé à une table SQLite.
+
+    Args:
+        nom: Espace de noms (nom de la table SQLite et des messages de log)
+        ttl_s: Durée de vie d'une entrée en secondes (0 = pas d'expiration)
+        taille_max: Taille max du LRU mémoire (0 = désactivé)
+        chemin_disque: Fichier SQLite du tier disque (vide = désactivé)
+        disque_max: Nombre max de lignes du tier disque (les moins récemment utilisées sont purgées)
+        compteurs: Compteurs supplémentaires exposés dans stats() (cf. compter)
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        ttl_s: int,
+        taille_max: int,
+        chemin_disque: str,
+        disque_max: int,
+        compteurs: Iterable[str] = ()
+    ):
+        self.nom = nom
+        self.ttl_s = ttl_s
+        self.taille_max = taille_max
+        self.chemin_disque = chemin_disque
+        self.disque_max = disque_max
+        self._cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits_memoire": 0, "hits_disque": 0, "misses": 0, **{c: 0 for c in compteurs},
+                       "evictions": 0, "expirees": 0, "ecritures": 0}
+        self._disque: Optional[sqlite3.Connection] = None
+
+    # ---------- Internes (appelant détient _lock) ----------
+
+    def _connexion_disque(self) -> Optional[sqlite3.Connection]:
+        if not self.chemin_disque:
+            return None
+        if self._disque is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.chemin_disque)), exist_ok=True)
+            # timeout : attend le verrou si un autre worker écrit
+            self._disque = sqlite3.connect(self.chemin_disque, check_same_thread=False, timeout=5)
+            self._disque.execute("PRAGMA journal_mode=WAL")
+            self._disque.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.nom} ("
+                "cle TEXT PRIMARY KEY, valeur TEXT NOT NULL, expire_a REAL NOT NULL, utilise_a REAL NOT NULL)"
+            )
+            self._disque.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.nom}_utilise ON {self.nom} (utilise_a)")
+            self._disque.commit()
+        return self._disque
+
+    def _expiration(self) -> float:
+        return time.time() + self.ttl_s if self.ttl_s > 0 else float("inf")
+
+    def _memoriser(self, cle: str, expire_a: float, valeur: Dict) -> None:
+        """Ajoute en tête du LRU."""
+        if self.taille_max <= 0:
+            return
+        self._cache[cle] = (expire_a, valeur)
+        self._cache.move_to_end(cle)
+        while len(self._cache) > self.taille_max:
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _purger_disque(self, conn: sqlite3.Connection) -> None:
+        """Supprime les lignes expirées puis les moins récemment utilisées au-delà de disque_max."""
+        conn.execute(f"DELETE FROM {self.nom} WHERE expire_a < ?", (time.time(),))
+        if self.disque_max > 0:
+            conn.execute(
+                f"DELETE FROM {self.nom} WHERE cle IN ("
+                f"SELECT cle FROM {self.nom} ORDER BY utilise_a DESC LIMIT -1 OFFSET ?)",
+                (self.disque_max,),
+            )
+
+    # ---------- API ----------
+
+    def lire(self, cle: str) -> Optional[Dict]:
+        """Valeur en cache (mémoire puis disque), None si absente ou expirée. Renvoie une copie."""
+        maintenant = time.time()
+        with self._lock:
+            entree = self._cache.get(cle)
+            if entree is not None:
+                expire_a, valeur = entree
+                if expire_a >= maintenant:
+                    self._cache.move_to_end(cle)
+                    self._stats["hits_memoire"] += 1
+                    return copy.deepcopy(valeur)
+                del self._cache[cle]
+                self._stats["expirees"] += 1
+
+            conn = self._connexion_disque()
+            if conn is not None:
+                try:
+                    ligne = conn.execute(
+                        f"SELECT valeur, expire_a FROM {self.nom} WHERE cle = ?", (cle,)
+                    ).fetchone()
+                    if ligne is not None and ligne[1] >= maintenant:
+                        conn.execute(f"UPDATE {self.nom} SET utilise_a = ? WHERE cle = ?", (maintenant, cle))
+                        conn.commit()
+                        valeur = json.loads(ligne[0])
+                        self._memoriser(cle, ligne[1], valeur)
+                        self._stats["hits_disque"] += 1
+                        return copy.deepcopy(valeur)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Cache {self.nom} (disque) indisponible : {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def ecrire(self, cle: str, valeur: Dict) -> None:
+        """Mémorise une copie de `valeur` (mémoire + disque)."""
+        expire_a = self._expiration()
+        valeur = copy.deepcopy(valeur)
+        with self._lock:
+            self._memoriser(cle, expire_a, valeur)
+            self._stats["ecritures"] += 1
+            conn = self._connexion_disque()
+            if conn is not None:
+                try:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self.nom} (cle, valeur, expire_a, utilise_a) VALUES (?, ?, ?, ?)",
+                        (cle, json.dumps(valeur, ensure_ascii=False), expire_a, time.time()),
+                    )
+                    if self._stats["ecritures"] % PURGE_TOUTES_LES == 0:
+                        self._purger_disque(conn)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Cache {self.nom} (disque) indisponible : {e}")
+
+    def compter(self, compteur: str) -> None:
+        """Incrémente un compteur supplémentaire déclaré à la construction."""
+        with self._lock:
+            self._stats[compteur] += 1
+
+    def stats(self) -> Dict:
+        """Compteurs hits (mémoire/disque), misses, évictions, expirations et hit rate."""
+        with self._lock:
+            hits = self._stats["hits_memoire"] + self._stats["hits_disque"]
+            total = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "taille": len(self._cache),
+                "taille_max": self.taille_max,
+                "ttl_s": self.ttl_s,
+                "disque": self.chemin_disque or None,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+    def vider(self, disque: bool = False) -> None:
+        """Vide le cache mémoire (et le tier disque si `disque=True`)."""
+        with self._lock:
+            self._cache.clear()
+            conn = self._connexion_disque() if disque else None
+            if conn is not None:
+                conn.execute(f"DELETE FROM {self.nom}")
+                conn.commit()
@@ -0,0 +1,105 @@
+"""
+Compaction du texte brut d'un CV avant envoi au LLM (variante de prompt « compact »).
+1. Normalisation des espaces et lignes vides
+2. Découpage en sections (en-tête / compétences / expériences / formations / langues / secondaires)
+3. Sous un budget de tokens : abandon des sections secondaires (loisirs, références...),
+   puis troncature équitable des sections restantes, dans l'ordre d'origine du CV
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from app.ai.fournisseurs_llm import estimer_tokens
+
+
+# Mots-clés d'un titre de section (lignes courtes), CV français et anglais
+SECTIONS_CV: Dict[str, Tuple[str, ...]] = {
+    "competences": ("compétence", "competence", "skills", "technologies", "outils", "savoir-faire"),
+    "experiences": ("expérience", "experience", "parcours professionnel", "emplois", "stages", "internship"),
+    "formations": ("formation", "diplôme", "diplome", "education", "études", "etudes", "cursus"),
+    "langues": ("langue", "languages"),
+    "projets": ("projet", "projects", "réalisations"),
+    "secondaire": ("loisir", "intérêt", "interet", "hobbies", "interests", "références", "references", "activités", "bénévolat"),
+}
+LONGUEUR_MAX_TITRE = 40
+MARQUE_TRONCATURE = "[…]"
+
+
+def normaliser_texte(texte: str) -> str:
+    """Espaces multiples → un espace, lignes vides supprimées."""
+    lignes = (re.sub(r"[ \t\u00a0]+", " ", ligne).strip() for ligne in texte.splitlines())
+    return "\n".join(ligne for ligne in lignes if ligne)
+
+
+def _type_section(ligne: str) -> str:
+    if len(ligne) > LONGUEUR_MAX_TITRE:
+        return ""
+    minuscule = ligne.lower()
+    for section, mots in SECTIONS_CV.items():
+        if any(mot in minuscule for mot in mots):
+            return section
+    return ""
+
+
+def decouper_sections(texte: str) -> List[Tuple[str, List[str]]]:
+    """[(type_section, lignes)] dans l'ordre du CV ; le bloc avant le premier titre est l'« entete »."""
+    blocs: List[Tuple[str, List[str]]] = [("entete", [])]
+    for ligne in texte.splitlines():
+        section = _type_section(ligne)
+        if section:
+            blocs.append((section, [ligne]))
+        else:
+            blocs[-1][1].append(ligne)
+    return [(section, lignes) for section, lignes in blocs if lignes]
+
+
+def _tronquer(lignes: List[str], budget_caracteres: int) -> List[str]:
+    """Garde les premières lignes dans la limite du budget (au moins le titre)."""
+    gardees, taille = [], 0
+    for i, ligne in enumerate(lignes):
+        ajout = len(ligne) + (1 if i else 0)  # + saut de ligne
+        if i and taille + ajout > budget_caracteres:
+            gardees.append(MARQUE_TRONCATURE)
+            break
+        gardees.append(ligne if i or len(ligne) <= budget_caracteres else ligne[:budget_caracteres])
+        taille += ajout
+    return gardees
+
+
+def compacter_texte_cv(texte: str, budget_tokens: int) -> str:
+    """
+    Texte du CV réduit sous `budget_tokens` (estimation), sections utiles en priorité.
+
+    Args:
+        texte: Texte brut extrait du PDF
+        budget_tokens: Budget de tokens pour le texte du CV (0 = normalisation seule)
+
+    Returns:
+        str: Texte compacté
+    """
+    texte = normaliser_texte(texte)
+    if budget_tokens <= 0 or estimer_tokens(texte) <= budget_tokens:
+        return texte
+
+    blocs = decouper_sections(texte)
+    utiles = [(s, l) for s, l in blocs if s != "secondaire"] or blocs
+    texte_utile = "\n".join("\n".join(l) for _, l in utiles)
+    if estimer_tokens(texte_utile) <= budget_tokens:
+        return texte_utile
+
+    # Répartition équitable du budget : les petites sections sont gardées entières,
+    # le reliquat est partagé entre les plus longues
+    budget_caracteres = budget_tokens * 4
+    tailles = [len("\n".join(l)) for _, l in utiles]
+    allocations = [0] * len(utiles)
+    restant, a_servir = budget_caracteres, sorted(range(len(utiles)), key=lambda i: tailles[i])
+    while a_servir:
+        part = restant // len(a_servir)
+        i = a_servir.pop(0)
+        allocations[i] = min(tailles[i], part)
+        restant -= allocations[i]
+
+    return "\n".join(
+        "\n".join(_tronquer(lignes, allocations[i]))
+        for i, (_, lignes) in enumerate(utiles)
+    )
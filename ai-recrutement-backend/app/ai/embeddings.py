@@ -1,14 +1,14 @@
-from typing import List
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import Future
+import hashlib
 import os
-from sentence_transformers import SentenceTransformer
+import queue
+import sqlite3
+import threading
+import time
 
-# Réduire la verbosité des logs Transformers (évite warnings non critiques)
-try:
-    from transformers import logging as transformers_logging
-    transformers_logging.set_verbosity_error()
-except Exception:
-    # transformers peut ne pas être importé dans certains environnements
-    pass
+import numpy as np
 
 
 # Si l'utilisateur a fourni un token HF, l'utiliser pour les téléchargements
@@ -17,26 +17,315 @@ if _hf_token:
     # Assurer que huggingface_hub trouve le token via variable d'env standard
     os.environ.setdefault("HUGGINGFACEHUB_API_TOKEN", _hf_token)
 
-# Modèle local (1 seule instance)
-# On passe `use_auth_token` si disponible pour éviter l'avertissement HF Hub
-model_kwargs = {}
-if _hf_token:
-    model_kwargs["use_auth_token"] = _hf_token
+MODEL_NAME = os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
+
+# Modèle local (1 seule instance), chargé à la première utilisation ou par le warm-up :
+# importer ce module ne charge ni torch ni le modèle.
+_model = None
+_model_lock = threading.Lock()
+_chargement = {"charge": False, "duree_s": None}
+
+
+def get_model():
+    """Retourne l'instance SentenceTransformer, en la chargeant au premier appel."""
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            debut = time.perf_counter()
+            # Réduire la verbosité des logs Transformers (évite warnings non critiques)
+            try:
+                from transformers import logging as transformers_logging
+                transformers_logging.set_verbosity_error()
+            except Exception:
+                # transformers peut ne pas être importé dans certains environnements
+                pass
+            from sentence_transformers import SentenceTransformer
+
+            # On passe `use_auth_token` si disponible pour éviter l'avertissement HF Hub
+            model_kwargs = {}
+            if _hf_token:
+                model_kwargs["use_auth_token"] = _hf_token
+            _model = SentenceTransformer(MODEL_NAME, **model_kwargs)
+            _chargement["charge"] = True
+            _chargement["duree_s"] = round(time.perf_counter() - debut, 3)
+            print(f"✅ Modèle d'embedding {MODEL_NAME} chargé en {_chargement['duree_s']}s")
+    return _model
+
+
+def etat_modele() -> Dict:
+    """État de chargement du modèle (pour la readiness)."""
+    return {"modele": MODEL_NAME, **_chargement}
+
+
+def hash_texte(text: str) -> str:
+    """Empreinte SHA-256 du texte embeddé (sert de tampon de fraîcheur en BDD)"""
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+# ============================================
+# CACHE D'EMBEDDINGS (LRU mémoire + tier disque optionnel)
+# ============================================
+
+# Taille max du cache mémoire (nombre de vecteurs, 0 = désactivé)
+CACHE_TAILLE_MAX = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# Fichier SQLite du tier disque (survit aux redémarrages), désactivé si vide
+CACHE_DISQUE = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits_memoire": 0, "hits_disque": 0, "misses": 0, "evictions": 0}
+_disque: Optional[sqlite3.Connection] = None
+
+
+def _cle_cache(text: str) -> str:
+    """Clé (modèle, hash du texte normalisé) : espaces multiples/retours ignorés."""
+    normalise = " ".join(text.split())
+    return f"{MODEL_NAME}:{hashlib.sha256(normalise.encode('utf-8')).hexdigest()}"
+
+
+def _connexion_disque() -> Optional[sqlite3.Connection]:
+    global _disque
+    if not CACHE_DISQUE:
+        return None
+    if _disque is None:
+        os.makedirs(os.path.dirname(os.path.abspath(CACHE_DISQUE)), exist_ok=True)
+        _disque = sqlite3.connect(CACHE_DISQUE, check_same_thread=False)
+        _disque.execute("CREATE TABLE IF NOT EXISTS embeddings (cle TEXT PRIMARY KEY, vecteur BLOB NOT NULL)")
+        _disque.commit()
+    return _disque
+
+
+def _memoriser(cle: str, vecteur: List[float]) -> None:
+    """Ajoute en tête du LRU (appelant détient _cache_lock)."""
+    if CACHE_TAILLE_MAX <= 0:
+        return
+    _cache[cle] = vecteur
+    _cache.move_to_end(cle)
+    while len(_cache) > CACHE_TAILLE_MAX:
+        _cache.popitem(last=False)
+        _cache_stats["evictions"] += 1
+
+
+def _lire_cache(cles: List[str]) -> Dict[str, List[float]]:
+    trouves: Dict[str, List[float]] = {}
+    with _cache_lock:
+        for cle in cles:
+            if cle in _cache:
+                _cache.move_to_end(cle)
+                trouves[cle] = _cache[cle]
+                _cache_stats["hits_memoire"] += 1
+
+        restants = [c for c in dict.fromkeys(cles) if c not in trouves]
+        conn = _connexion_disque()
+        if conn is not None and restants:
+            marques = ",".join("?" * len(restants))
+            lignes = conn.execute(
+                f"SELECT cle, vecteur FROM embeddings WHERE cle IN ({marques})", restants
+            ).fetchall()
+            for cle, blob in lignes:
+                vecteur = np.frombuffer(blob, dtype=np.float32).tolist()
+                trouves[cle] = vecteur
+                _memoriser(cle, vecteur)
+                _cache_stats["hits_disque"] += 1
+    return trouves
+
+
+def _ecrire_cache(nouveaux: Dict[str, List[float]]) -> None:
+    with _cache_lock:
+        for cle, vecteur in nouveaux.items():
+            _memoriser(cle, vecteur)
+        conn = _connexion_disque()
+        if conn is not None and nouveaux:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (cle, vecteur) VALUES (?, ?)",
+                [(cle, np.asarray(v, dtype=np.float32).tobytes()) for cle, v in nouveaux.items()],
+            )
+            conn.commit()
+
+
+def stats_cache_embeddings() -> Dict:
+    """Compteurs hits (mémoire/disque), misses, évictions et taille du cache."""
+    with _cache_lock:
+        total = _cache_stats["hits_memoire"] + _cache_stats["hits_disque"] + _cache_stats["misses"]
+        hits = _cache_stats["hits_memoire"] + _cache_stats["hits_disque"]
+        return {
+            **_cache_stats,
+            "taille": len(_cache),
+            "taille_max": CACHE_TAILLE_MAX,
+            "disque": CACHE_DISQUE or None,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
 
-model = SentenceTransformer("all-MiniLM-L6-v2", **model_kwargs)
 
+def vider_cache_embeddings() -> None:
+    """Vide le cache mémoire (le tier disque est conservé)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+# ============================================
+# MICRO-BATCHING (regroupe les encodages concurrents)
+# ============================================
+
+# Taille max d'un lot (nb de textes) et attente max avant d'encoder un lot incomplet
+BATCH_TAILLE_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", "32"))
+BATCH_ATTENTE_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+_BUCKETS_HISTO = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _MicroBatcher:
+    """
+    Thread unique qui collecte les demandes d'encodage pendant BATCH_ATTENTE_MS
+    (ou jusqu'à BATCH_TAILLE_MAX textes), lance un seul model.encode sur le lot
+    puis redistribue les vecteurs aux appelants en attente.
+    Tous les encodages passent par ce thread : un seul lot borné à la fois.
+    """
+
+    def __init__(self, taille_max: int, attente_ms: float):
+        self.taille_max = max(1, taille_max)
+        self.attente_s = max(0.0, attente_ms) / 1000
+        self._file: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._histo = {f"<={b}": 0 for b in _BUCKETS_HISTO}
+        self._histo[f">{_BUCKETS_HISTO[-1]}"] = 0
+        self._lots = 0
+        self._textes = 0
+        self._demandes = 0
+
+    def _enregistrer_lot(self, taille: int, demandes: int) -> None:
+        with self._lock:
+            self._lots += 1
+            self._textes += taille
+            self._demandes += demandes
+            for b in _BUCKETS_HISTO:
+                if taille <= b:
+                    self._histo[f"<={b}"] += 1
+                    break
+            else:
+                self._histo[f">{_BUCKETS_HISTO[-1]}"] += 1
+
+    def _demarrer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def encoder(self, textes: List[str]) -> List[List[float]]:
+        """
+        Encode via le thread du batcher (seul appelant du modèle) ; une demande plus grosse
+        qu'un lot est découpée en morceaux de taille_max textes, mis en file à la suite.
+        """
+        self._demarrer()
+        futurs = []
+        for debut in range(0, len(textes), self.taille_max):
+            futur: Future = Future()
+            self._file.put((textes[debut:debut + self.taille_max], futur))
+            futurs.append(futur)
+        return [vecteur for futur in futurs for vecteur in futur.result()]
+
+    def _boucle(self) -> None:
+        # Demande qui aurait fait déborder le lot précédent : elle ouvre le lot suivant
+        reportee = None
+        while True:
+            premier = reportee if reportee is not None else self._file.get()
+            reportee = None
+            lot = [premier]
+            nb = len(premier[0])
+            limite = time.monotonic() + self.attente_s
+            while nb < self.taille_max:
+                reste = limite - time.monotonic()
+                if reste <= 0:
+                    break
+                try:
+                    demande = self._file.get(timeout=reste)
+                except queue.Empty:
+                    break
+                if nb + len(demande[0]) > self.taille_max:
+                    reportee = demande
+                    break
+                lot.append(demande)
+                nb += len(demande[0])
+
+            textes = [t for demande_textes, _ in lot for t in demande_textes]
+            try:
+                vecteurs = get_model().encode(textes).tolist()
+            except Exception as e:
+                for _, futur in lot:
+                    futur.set_exception(e)
+                continue
+
+            self._enregistrer_lot(len(textes), len(lot))
+            debut = 0
+            for demande_textes, futur in lot:
+                futur.set_result(vecteurs[debut:debut + len(demande_textes)])
+                debut += len(demande_textes)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "taille_max": self.taille_max,
+                "attente_ms": self.attente_s * 1000,
+                "lots": self._lots,
+                "textes": self._textes,
+                "demandes": self._demandes,
+                "taille_moyenne": round(self._textes / self._lots, 2) if self._lots else 0.0,
+                "histogramme_tailles": dict(self._histo),
+            }
+
+
+_batcher = _MicroBatcher(BATCH_TAILLE_MAX, BATCH_ATTENTE_MS)
+
+
+def prechauffer_modele() -> None:
+    """Charge le modèle et lance un encodage à blanc (hors cache, via le batcher)."""
+    _batcher.encoder(["warm-up"])
+
+
+def stats_micro_batching() -> Dict:
+    """Nombre de lots, taille moyenne et histogramme des tailles de lots encodés."""
+    return _batcher.stats()
+
+
+# ============================================
+# EMBEDDINGS
+# ============================================
 
 def embed_text(text: str) -> List[float]:
-    """Génère l'embedding d'un seul texte (LOCAL)"""
+    """Génère l'embedding d'un seul texte (LOCAL, avec cache)"""
     if not text or not text.strip():
         raise ValueError("Texte vide pour embedding")
 
-    return model.encode(text).tolist()
+    return embed_texts([text])[0]
 
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
-    """Génère les embeddings pour plusieurs textes (LOCAL)"""
+    """
+    Génère les embeddings pour plusieurs textes (LOCAL, avec cache).
+    Seuls les textes absents du cache sont encodés, en un seul batch, regroupé
+    avec les demandes concurrentes par le micro-batcher.
+    """
     if not texts:
         return []
 
-    return model.encode(texts).tolist()
+    cles = [_cle_cache(t) for t in texts]
+    trouves = _lire_cache(cles)
+
+    # Un seul encodage par texte distinct manquant
+    manquants: Dict[str, str] = {}
+    for cle, texte in zip(cles, texts):
+        if cle not in trouves and cle not in manquants:
+            manquants[cle] = texte
+
+    if manquants:
+        with _cache_lock:
+            _cache_stats["misses"] += len(manquants)
+        vecteurs = _batcher.encoder(list(manquants.values()))
+        nouveaux = dict(zip(manquants.keys(), vecteurs))
+        _ecrire_cache(nouveaux)
+        trouves.update(nouveaux)
+
+    return [trouves[cle] for cle in cles]
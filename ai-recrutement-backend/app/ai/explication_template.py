@@ -0,0 +1,194 @@
+"""
+Explications déterministes (sans LLM) construites à partir des détails du scoring.
+Même structure que les explications LangChain (ExplicationRecruteur / ExplicationCandidat),
+pour un coût de l'ordre de la microseconde : classements en masse, dashboards, repli du mode hybride.
+Membre 5 - Niveau 2
+"""
+
+from typing import Dict, List
+
+
+NIVEAUX_FORMATION = {
+    0: "non précisé",
+    1: "Bac",
+    2: "Bac+2",
+    3: "Licence (Bac+3)",
+    4: "Master / Ingénieur (Bac+5)",
+    5: "Doctorat",
+}
+
+# Seuils (en %) d'un critère jugé fort / faible
+SEUIL_FORT = 80
+SEUIL_FAIBLE = 50
+
+
+def _liste(elements: List[str], max_elements: int = 5) -> str:
+    if len(elements) <= max_elements:
+        return ", ".join(elements)
+    return ", ".join(elements[:max_elements]) + f" (+{len(elements) - max_elements})"
+
+
+def _decision(score_final: float) -> str:
+    """Même barème que PROMPT_RECRUTEUR : > 80 RECRUTER, 50-80 ENTRETIEN, < 50 REJETER."""
+    if score_final > 80:
+        return "RECRUTER"
+    if score_final >= 50:
+        return "ENTRETIEN"
+    return "REJETER"
+
+
+# ============================================
+# RECRUTEUR
+# ============================================
+
+def explication_recruteur_template(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str
+) -> Dict:
+    """
+    Explication recruteur déterministe (points forts/faibles, décision, synthèse).
+
+    Args:
+        score_final: Score de matching (0-100)
+        details: Détails du scoring (calculer_score_final)
+        recommandation: EXCELLENT, BON, MOYEN, FAIBLE
+        titre_poste: Titre du poste de l'offre
+
+    Returns:
+        Dict au format ExplicationRecruteur
+    """
+    comp = details["competences"]
+    exp = details["experience"]
+    form = details["formation"]
+    lang = details["langues"]
+    forts: List[str] = []
+    faibles: List[str] = []
+
+    if comp["trouvees"]:
+        forts.append(f"Compétences attendues maîtrisées : {_liste(comp['trouvees'])} ({comp['score']:.0f}%)")
+    if comp["manquantes"]:
+        faibles.append(f"Compétences requises absentes du CV : {_liste(comp['manquantes'])}")
+
+    if exp["annees_requises"] and exp["annees_candidat"] >= exp["annees_requises"]:
+        forts.append(f"Expérience suffisante : {exp['annees_candidat']} ans pour {exp['annees_requises']} requis")
+    elif exp["annees_requises"]:
+        faibles.append(f"Expérience inférieure au besoin : {exp['annees_candidat']} ans pour {exp['annees_requises']} requis")
+    elif exp["annees_candidat"]:
+        forts.append(f"{exp['annees_candidat']} ans d'expérience professionnelle")
+
+    niveau_candidat = NIVEAUX_FORMATION.get(form.get("niveau_candidat", 0), "non précisé")
+    niveau_requis = NIVEAUX_FORMATION.get(form.get("niveau_requis", 0), "non précisé")
+    if form["score"] >= SEUIL_FORT and form.get("niveau_candidat"):
+        forts.append(f"Formation adaptée : {niveau_candidat}")
+    elif form["score"] < SEUIL_FORT:
+        faibles.append(f"Formation en deçà du niveau demandé : {niveau_candidat} pour {niveau_requis}")
+
+    if lang["trouvees"]:
+        forts.append(f"Langues demandées maîtrisées : {_liste(lang['trouvees'])}")
+    if lang["manquantes"]:
+        faibles.append(f"Langues requises non mentionnées : {_liste(lang['manquantes'])}")
+
+    if details["similarite_semantique"] >= SEUIL_FORT:
+        forts.append(f"Profil globalement très proche de l'offre ({details['similarite_semantique']:.0f}% de similarité)")
+    elif details["similarite_semantique"] < SEUIL_FAIBLE:
+        faibles.append(f"Profil éloigné du descriptif de poste ({details['similarite_semantique']:.0f}% de similarité)")
+
+    if not forts:
+        forts.append("Aucun critère de l'offre pleinement satisfait")
+    if not faibles:
+        faibles.append("Aucun manque identifié sur les critères de l'offre")
+
+    decision = _decision(score_final)
+    synthese = (
+        f"Score de {score_final}% ({recommandation}) pour le poste « {titre_poste} ». "
+        f"{len(comp['trouvees'])} compétence(s) requise(s) sur {len(comp['trouvees']) + len(comp['manquantes'])} "
+        f"et {exp['annees_candidat']} an(s) d'expérience. Décision suggérée : {decision}."
+    )
+
+    return {
+        "recommandation": decision,
+        "points_forts": forts[:5],
+        "points_faibles": faibles[:4],
+        "synthese": synthese,
+    }
+
+
+# ============================================
+# CANDIDAT
+# ============================================
+
+def explication_candidat_template(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str
+) -> Dict:
+    """
+    Explication candidat déterministe (message, compétences valorisées, axes, conseils).
+
+    Args:
+        score_final: Score de matching (0-100)
+        details: Détails du scoring (calculer_score_final)
+        recommandation: EXCELLENT, BON, MOYEN, FAIBLE
+        titre_poste: Titre du poste visé
+
+    Returns:
+        Dict au format ExplicationCandidat
+    """
+    comp = details["competences"]
+    exp = details["experience"]
+    form = details["formation"]
+    lang = details["langues"]
+
+    if score_final >= 80:
+        message = f"Excellent ! Votre profil correspond très bien au poste « {titre_poste} » ({score_final}%)."
+    elif score_final >= 65:
+        message = f"Bon profil pour le poste « {titre_poste} » ({score_final}%) : quelques points restent à renforcer."
+    elif score_final >= 50:
+        message = f"Votre profil correspond en partie au poste « {titre_poste} » ({score_final}%). Des axes de progression sont identifiés ci-dessous."
+    else:
+        message = f"Votre profil est encore éloigné du poste « {titre_poste} » ({score_final}%), mais chaque axe ci-dessous vous en rapproche."
+
+    valorisees = list(comp["trouvees"]) + [f"Langue : {l}" for l in lang["trouvees"]]
+
+    axes: List[str] = [f"Développer la compétence {c}" for c in comp["manquantes"][:3]]
+    conseils: List[str] = []
+    if comp["manquantes"]:
+        conseils.append(f"Formez-vous en priorité sur {_liste(comp['manquantes'], 2)} (projets personnels, certifications)")
+    if exp["annees_requises"] and exp["annees_candidat"] < exp["annees_requises"]:
+        ecart = exp["annees_requises"] - exp["annees_candidat"]
+        axes.append(f"Acquérir environ {ecart} an(s) d'expérience supplémentaire")
+        conseils.append("Mettez en avant stages, missions et projets concrets pour compenser l'expérience manquante")
+    if form["score"] < SEUIL_FORT:
+        axes.append(f"Viser le niveau de formation demandé ({NIVEAUX_FORMATION.get(form.get('niveau_requis', 0), 'non précisé')})")
+    if lang["manquantes"]:
+        axes.append(f"Renforcer les langues : {_liste(lang['manquantes'], 3)}")
+        conseils.append(f"Précisez votre niveau en {_liste(lang['manquantes'], 2)} sur votre CV, ou certifiez-le")
+    if details["similarite_semantique"] < SEUIL_FAIBLE:
+        conseils.append("Reprenez le vocabulaire de l'offre dans votre CV pour décrire vos expériences")
+
+    if not axes:
+        axes.append("Continuez à développer vos compétences")
+    conseils.append("Valorisez vos expériences les plus pertinentes pour ce poste en tête de CV")
+
+    return {
+        "message_principal": message,
+        "competences_valorisees": valorisees[:8],
+        "axes_amelioration": axes[:5],
+        "conseils": conseils[:3],
+    }
+
+
+def generer_explications_template(
+    score_final: float,
+    details: Dict,
+    recommandation: str,
+    titre_poste: str
+) -> Dict:
+    """Explications recruteur + candidat déterministes (aucun appel LLM)."""
+    return {
+        "pour_recruteur": explication_recruteur_template(score_final, details, recommandation, titre_poste),
+        "pour_candidat": explication_candidat_template(score_final, details, recommandation, titre_poste),
+    }
@@ -0,0 +1,143 @@
+"""
+Extraction du texte des PDF dans un pool de processus.
+PyPDF2 est du Python pur (le GIL sérialise les extractions en threads) : les pages sont
+découpées en plages traitées en parallèle par des processus, puis le texte est assemblé en une fois.
+Temps d'extraction par page exporté dans GET /health/inference.
+
+Module volontairement léger (PyPDF2 seul) : il est ré-importé par chaque processus du pool.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple, Union
+
+import PyPDF2
+
+
+# Processus d'extraction (0 = extraction dans le thread appelant)
+PDF_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages min par tâche : chaque processus ré-ouvre le PDF, inutile de découper plus fin
+PDF_PAGES_PAR_TACHE = int(os.getenv("PDF_PAGES_PER_TASK", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {
+    "documents": 0,
+    "pages": 0,
+    "duree_pages_ms": 0.0,
+    "duree_page_max_ms": 0.0,
+    "duree_documents_ms": 0.0,
+    "replis_sans_pool": 0,
+}
+
+
+# ============================================
+# TRAVAIL (exécuté dans les processus du pool)
+# ============================================
+
+def _ouvrir(source: Union[str, bytes]) -> PyPDF2.PdfReader:
+    return PyPDF2.PdfReader(source if isinstance(source, str) else BytesIO(source))
+
+
+def _extraire_plage(source: Union[str, bytes], debut: int, fin: int) -> List[Tuple[str, float]]:
+    """Texte et durée (s) des pages [debut, fin[ du PDF."""
+    lecteur = _ouvrir(source)
+    resultats = []
+    for i in range(debut, fin):
+        t0 = time.perf_counter()
+        texte = lecteur.pages[i].extract_text() or ""
+        resultats.append((texte, time.perf_counter() - t0))
+    return resultats
+
+
+# ============================================
+# POOL
+# ============================================
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if PDF_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # spawn : pas de fork d'un process qui a des threads (pools, torch)
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def arreter_pool_pdf() -> None:
+    """Arrête les processus d'extraction (arrêt de l'application)."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _plages(nb_pages: int) -> List[Tuple[int, int]]:
+    """Découpe [0, nb_pages[ en au plus PDF_WORKERS plages d'au moins PDF_PAGES_PAR_TACHE pages."""
+    nb_taches = max(1, min(PDF_WORKERS, nb_pages // max(1, PDF_PAGES_PAR_TACHE)))
+    # Plages équilibrées (tailles à une page près) : pas de dernière plage réduite à une page
+    taille, reste = divmod(nb_pages, nb_taches)
+    bornes = [i * taille + min(i, reste) for i in range(nb_taches + 1)]
+    return [(bornes[i], bornes[i + 1]) for i in range(nb_taches) if bornes[i] < bornes[i + 1]]
+
+
+def extraire_pages_pdf(source: Union[str, bytes]) -> List[str]:
+    """
+    Texte de chaque page d'un PDF, extrait en parallèle dans le pool de processus.
+
+    Args:
+        source: Chemin du PDF (préféré : rien à copier vers les processus) ou contenu binaire
+
+    Returns:
+        list: Texte de chaque page, dans l'ordre
+    """
+    debut = time.perf_counter()
+    nb_pages = len(_ouvrir(source).pages)
+    pool = _get_pool()
+    resultats: List[Tuple[str, float]] = []
+
+    if pool is None or nb_pages == 0:
+        resultats = _extraire_plage(source, 0, nb_pages)
+    else:
+        try:
+            futures = [pool.submit(_extraire_plage, source, d, f) for d, f in _plages(nb_pages)]
+            for future in futures:
+                resultats.extend(future.result())
+        except BrokenProcessPool:
+            # Processus tué (OOM...) : on recrée le pool au prochain appel, extraction locale ici
+            arreter_pool_pdf()
+            with _lock:
+                _stats["replis_sans_pool"] += 1
+            resultats = _extraire_plage(source, 0, nb_pages)
+
+    with _lock:
+        _stats["documents"] += 1
+        _stats["pages"] += len(resultats)
+        _stats["duree_documents_ms"] += (time.perf_counter() - debut) * 1000
+        for _, duree in resultats:
+            _stats["duree_pages_ms"] += duree * 1000
+            _stats["duree_page_max_ms"] = max(_stats["duree_page_max_ms"], duree * 1000)
+    return [texte for texte, _ in resultats]
+
+
+def stats_extraction_pdf() -> Dict:
+    """Documents/pages extraits, durée moyenne et max par page, durée moyenne par document."""
+    with _lock:
+        return {
+            "workers": PDF_WORKERS,
+            "pool_demarre": _pool is not None,
+            "documents": _stats["documents"],
+            "pages": _stats["pages"],
+            "duree_page_moyenne_ms": round(_stats["duree_pages_ms"] / _stats["pages"], 2) if _stats["pages"] else None,
+            "duree_page_max_ms": round(_stats["duree_page_max_ms"], 2),
+            "duree_document_moyenne_ms": round(_stats["duree_documents_ms"] / _stats["documents"], 1) if _stats["documents"] else None,
+            "replis_sans_pool": _stats["replis_sans_pool"],
+        }
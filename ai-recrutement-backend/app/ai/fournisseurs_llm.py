@@ -0,0 +1,167 @@
+"""
+Fournisseurs LLM interchangeables derrière initialiser_llm() (analyse CV, analyse offre, explications).
+Choix via LLM_PROVIDER :
+- groq   : ChatGroq distant (par défaut)
+- openai : endpoint compatible OpenAI (vLLM, llama.cpp server, Ollama, LM Studio...) via LLM_BASE_URL
+- stub   : réponses JSON déterministes en process, latence fixe : tests et benchmarks hors ligne
+"""
+
+import os
+import time
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+MODELE_GROQ = "llama-3.3-70b-versatile"
+# Endpoint compatible OpenAI (ex. http://localhost:8000/v1 pour vLLM, http://localhost:11434/v1 pour Ollama)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:8000/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "local")
+LLM_MODELE_LOCAL = os.getenv("LLM_MODEL", "qwen2.5-7b-instruct")
+# Latence simulée du stub (ms), fixe pour des mesures reproductibles
+LLM_STUB_LATENCE_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+
+FOURNISSEURS = ("groq", "openai", "stub")
+# Module chargé par creer_llm() pour chaque fournisseur (importé par le warm-up)
+MODULES_FOURNISSEURS = {
+    "groq": "langchain_groq",
+    "openai": "langchain_openai",
+    "stub": "app.ai.serveur_llm_factice",
+}
+
+
+def nom_modele() -> str:
+    """Identifiant du modèle actif (entre dans les clés de cache des explications)."""
+    if LLM_PROVIDER == "openai":
+        return f"openai:{LLM_MODELE_LOCAL}"
+    if LLM_PROVIDER == "stub":
+        return "stub"
+    return MODELE_GROQ
+
+
+def estimer_tokens(texte: str) -> int:
+    """Estimation rapide du nombre de tokens (~4 caractères par token pour les modèles type Llama)."""
+    return (len(texte) + 3) // 4
+
+
+# ============================================
+# STUB DÉTERMINISTE
+# ============================================
+
+def _texte_prompt(entree: Any) -> str:
+    """Texte d'un PromptValue / liste de messages / chaîne."""
+    if hasattr(entree, "to_string"):
+        return entree.to_string()
+    if isinstance(entree, list):
+        return " ".join(str(getattr(m, "content", m)) for m in entree)
+    return str(entree)
+
+
+def _creer_stub():
+    import json
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    from app.ai.registre_chaines import enregistrer_usage
+    from app.ai.serveur_llm_factice import choisir_reponse
+
+    def repondre(entree: Any) -> AIMessage:
+        prompt = _texte_prompt(entree)
+        contenu = json.dumps(choisir_reponse(prompt), ensure_ascii=False)
+        tokens_prompt, tokens_completion = estimer_tokens(prompt), estimer_tokens(contenu)
+        enregistrer_usage("stub", tokens_prompt, tokens_completion)
+        return AIMessage(
+            content=contenu,
+            response_metadata={"model_name": "stub"},
+            usage_metadata={
+                "input_tokens": tokens_prompt,
+                "output_tokens": tokens_completion,
+                "total_tokens": tokens_prompt + tokens_completion,
+            },
+        )
+
+    def invoquer(entree: Any) -> AIMessage:
+        if LLM_STUB_LATENCE_MS:
+            time.sleep(LLM_STUB_LATENCE_MS / 1000)
+        return repondre(entree)
+
+    async def ainvoquer(entree: Any) -> AIMessage:
+        if LLM_STUB_LATENCE_MS:
+            import asyncio
+            await asyncio.sleep(LLM_STUB_LATENCE_MS / 1000)
+        return repondre(entree)
+
+    return RunnableLambda(invoquer, afunc=ainvoquer, name="llm_stub")
+
+
+# ============================================
+# FABRIQUE
+# ============================================
+
+def creer_llm(temperature: float, max_tokens: int, timeout: float = None):
+    """
+    Modèle de chat du fournisseur configuré (LLM_PROVIDER), branché sur le pool HTTP partagé.
+    Les relances sont désactivées côté client : la passerelle LLM les gère.
+    """
+    if LLM_PROVIDER == "stub":
+        return _creer_stub()
+
+    from app.ai.registre_chaines import client_http, client_http_async, gestionnaire_tokens
+
+    if LLM_PROVIDER == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=LLM_MODELE_LOCAL,
+            base_url=LLM_BASE_URL,
+            api_key=LLM_API_KEY,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            max_retries=0,                          # relances gérées par la passerelle LLM
+            http_client=client_http(),              # pool de connexions partagé (keep-alive)
+            http_async_client=client_http_async(),
+            callbacks=[gestionnaire_tokens()],      # comptage des tokens par appel de chaîne
+            stream_usage=True
+        )
+
+    if LLM_PROVIDER != "groq":
+        raise ValueError(f"❌ LLM_PROVIDER inconnu : {LLM_PROVIDER} (attendu : {', '.join(FOURNISSEURS)})")
+    if not GROQ_API_KEY:
+        raise ValueError("❌ GROQ_API_KEY absente du fichier .env")
+
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model=MODELE_GROQ,
+        temperature=temperature,
+        groq_api_key=GROQ_API_KEY,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        max_retries=0,                          # relances gérées par la passerelle LLM
+        http_client=client_http(),              # pool de connexions partagé (keep-alive)
+        http_async_client=client_http_async(),
+        callbacks=[gestionnaire_tokens()]       # comptage des tokens par appel de chaîne
+    )
+
+
+def importer_fournisseur() -> str:
+    """Importe le module du fournisseur configuré (warm-up) et retourne son nom."""
+    import importlib
+
+    if LLM_PROVIDER not in MODULES_FOURNISSEURS:
+        raise ValueError(f"❌ LLM_PROVIDER inconnu : {LLM_PROVIDER} (attendu : {', '.join(FOURNISSEURS)})")
+    module = MODULES_FOURNISSEURS[LLM_PROVIDER]
+    importlib.import_module(module)
+    return module
+
+
+def infos_fournisseur() -> Dict[str, Any]:
+    """Fournisseur et modèle actifs (GET /health/llm)."""
+    infos: Dict[str, Any] = {"fournisseur": LLM_PROVIDER, "modele": nom_modele()}
+    if LLM_PROVIDER == "openai":
+        infos["base_url"] = LLM_BASE_URL
+    if LLM_PROVIDER == "stub":
+        infos["latence_simulee_ms"] = LLM_STUB_LATENCE_MS
+    return infos
@@ -0,0 +1,276 @@
+"""
+Moteur de matching vectorisé : 1 requête vs N documents
+Membre 5 - Niveau 2
+- Similarités cosinus calculées en un seul produit matriciel
+- Critères (compétences, expérience, formation, langues) évalués sur des
+  caractéristiques pré-calculées une fois par document
+- Top-k par sélection partielle (argpartition), détails complets seulement pour le top-k
+"""
+
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from app.utils.scoring import (
+    PONDERATIONS,
+    calculer_score_final,
+    calculer_score_formation,
+    determiner_recommandation,
+    extraire_annees_experience,
+    extraire_niveau_formation,
+    normaliser_competence,
+)
+from app.ai.embeddings import embed_texts
+from app.ai.moteur_matching import preparer_texte_cv, preparer_texte_offre
+
+
+# ============================================
+# CARACTÉRISTIQUES PRÉ-CALCULÉES PAR DOCUMENT
+# ============================================
+
+def _normaliser_langues(langues: List[str]) -> Dict[str, str]:
+    return {normaliser_competence(l.split()[0]): l for l in langues}
+
+
+def caracteristiques_cv(cv_json: Dict) -> Dict:
+    """
+    Pré-calcule les critères d'un CV (une seule fois par document).
+
+    Returns:
+        Dict: compétences normalisées, années d'expérience, niveau de formation, langues
+    """
+    competences = cv_json.get("competences", [])
+    langues = cv_json.get("langues", [])
+    return {
+        "competences": {normaliser_competence(c): c for c in competences},
+        "annees": extraire_annees_experience(cv_json.get("experiences", [])),
+        "niveau": extraire_niveau_formation(cv_json.get("formations", [])),
+        "langues": _normaliser_langues(langues) if langues else {},
+    }
+
+
+def caracteristiques_offre(offre_json: Dict) -> Dict:
+    """
+    Pré-calcule les exigences d'une offre (une seule fois par document).
+
+    Returns:
+        Dict: compétences/langues requises normalisées et leurs effectifs, seuils requis
+    """
+    competences = offre_json.get("competences_requises", [])
+    langues = offre_json.get("langues_requises", [])
+    return {
+        "competences": {normaliser_competence(c): c for c in competences},
+        "nb_competences": len(competences),
+        "annees_requises": offre_json.get("experience_requise_ans", 0),
+        "niveau_requis": offre_json.get("niveau_etudes_requis", 0),
+        "langues": _normaliser_langues(langues) if langues else {},
+        "nb_langues": len(langues),
+    }
+
+
+# ============================================
+# CRITÈRES SUR CARACTÉRISTIQUES (mêmes règles que scoring.py)
+# ============================================
+
+def _score_competences(cv_f: Dict, offre_f: Dict) -> float:
+    if not offre_f["nb_competences"]:
+        return 1.0
+    cv_comp = cv_f["competences"]
+    if not cv_comp:
+        return 0.0
+
+    trouvees = 0
+    for comp_norm in offre_f["competences"]:
+        if comp_norm in cv_comp:
+            trouvees += 1
+            continue
+        for cv_comp_norm in cv_comp:
+            if comp_norm in cv_comp_norm or cv_comp_norm in comp_norm:
+                trouvees += 1
+                break
+    return trouvees / offre_f["nb_competences"]
+
+
+def _score_experience(annees_cv: int, annees_requises: int) -> float:
+    if annees_requises == 0 or annees_cv >= annees_requises:
+        return 1.0
+    if annees_cv >= annees_requises * 0.7:
+        return 0.8
+    if annees_cv >= annees_requises * 0.5:
+        return 0.5
+    return max(0.2, annees_cv / annees_requises)
+
+
+def _score_langues(cv_f: Dict, offre_f: Dict) -> float:
+    if not offre_f["nb_langues"]:
+        return 1.0
+    if not cv_f["langues"]:
+        return 0.0
+    trouvees = sum(1 for l in offre_f["langues"] if l in cv_f["langues"])
+    return trouvees / offre_f["nb_langues"]
+
+
+def _scores_criteres(paires: Sequence[tuple]) -> np.ndarray:
+    """
+    Évalue les 4 critères règles pour chaque paire (cv_f, offre_f).
+
+    Returns:
+        np.ndarray: matrice (N, 4) compétences / expérience / formation / langues
+    """
+    scores = np.empty((len(paires), 4), dtype=np.float64)
+    for i, (cv_f, offre_f) in enumerate(paires):
+        scores[i, 0] = _score_competences(cv_f, offre_f)
+        scores[i, 1] = _score_experience(cv_f["annees"], offre_f["annees_requises"])
+        scores[i, 2] = calculer_score_formation(cv_f["niveau"], offre_f["niveau_requis"])
+        scores[i, 3] = _score_langues(cv_f, offre_f)
+    return scores
+
+
+# ============================================
+# SIMILARITÉ VECTORISÉE
+# ============================================
+
+def calculer_similarites_cosinus(requete: Sequence[float], matrice: np.ndarray) -> np.ndarray:
+    """
+    Similarités cosinus entre un vecteur requête et N vecteurs (un produit matriciel).
+
+    Returns:
+        np.ndarray: N similarités normalisées entre 0 et 1 (0 si vecteur nul)
+    """
+    q = np.asarray(requete, dtype=np.float64)
+    m = np.asarray(matrice, dtype=np.float64)
+    norme_q = np.linalg.norm(q)
+    normes = np.linalg.norm(m, axis=1)
+
+    sims = np.zeros(m.shape[0], dtype=np.float64)
+    if norme_q == 0:
+        return sims
+    valides = normes > 0
+    sims[valides] = (m[valides] @ q) / (normes[valides] * norme_q)
+    sims[valides] = (sims[valides] + 1) / 2
+    return sims
+
+
+def _empiler_embeddings(
+    embeddings: Sequence[Optional[Sequence[float]]],
+    textes: Sequence[str]
+) -> np.ndarray:
+    """Empile les embeddings en matrice ; les manquants sont encodés en un seul batch."""
+    manquants = [i for i, e in enumerate(embeddings) if e is None]
+    calcules = embed_texts([textes[i] for i in manquants]) if manquants else []
+    remplis = list(embeddings)
+    for i, e in zip(manquants, calcules):
+        remplis[i] = e
+    return np.asarray(remplis, dtype=np.float64)
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices des top_k meilleurs scores, triés par score décroissant."""
+    k = min(top_k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(scores.shape[0])
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+
+# ============================================
+# CLASSEMENT 1 vs N
+# ============================================
+
+def _classer(
+    similarites: np.ndarray,
+    criteres: np.ndarray,
+    paires_json: Sequence[tuple],
+    top_k: int
+) -> List[Dict]:
+    scores = (
+        PONDERATIONS["similarite_semantique"] * similarites +
+        PONDERATIONS["competences_techniques"] * criteres[:, 0] +
+        PONDERATIONS["experience"] * criteres[:, 1] +
+        PONDERATIONS["formation"] * criteres[:, 2] +
+        PONDERATIONS["langues"] * criteres[:, 3]
+    )
+
+    resultats = []
+    for i in _top_k(scores, top_k):
+        # Détails complets (listes trouvées/manquantes) uniquement pour le top-k
+        cv_json, offre_json = paires_json[i]
+        resultat_scoring = calculer_score_final(float(similarites[i]), cv_json, offre_json)
+        resultats.append({
+            "index": int(i),
+            "score_final": resultat_scoring["score_final"],
+            "recommandation": determiner_recommandation(resultat_scoring["score_final"]),
+            "details": resultat_scoring["details"],
+            "explications": None,
+        })
+    return resultats
+
+
+def classer_offres_pour_cv(
+    cv_json: Dict,
+    cv_embedding: Optional[Sequence[float]],
+    offres_json: Sequence[Dict],
+    offres_embeddings: Sequence[Optional[Sequence[float]]],
+    top_k: int = 10
+) -> List[Dict]:
+    """
+    Classe N offres pour un CV en une passe vectorisée.
+
+    Args:
+        cv_json: Structure JSON du CV
+        cv_embedding: Embedding du CV (calculé si absent)
+        offres_json: Structures JSON des offres
+        offres_embeddings: Embeddings des offres (None = calculé en batch)
+        top_k: Nombre de résultats à retourner
+
+    Returns:
+        List[Dict]: top_k résultats (index dans offres_json, score, recommandation, détails)
+    """
+    if not offres_json:
+        return []
+
+    if cv_embedding is None:
+        cv_embedding = embed_texts([preparer_texte_cv(cv_json)])[0]
+    matrice = _empiler_embeddings(offres_embeddings, [preparer_texte_offre(o) for o in offres_json])
+    similarites = calculer_similarites_cosinus(cv_embedding, matrice)
+
+    cv_f = caracteristiques_cv(cv_json)
+    criteres = _scores_criteres([(cv_f, caracteristiques_offre(o)) for o in offres_json])
+
+    return _classer(similarites, criteres, [(cv_json, o) for o in offres_json], top_k)
+
+
+def classer_cvs_pour_offre(
+    offre_json: Dict,
+    offre_embedding: Optional[Sequence[float]],
+    cvs_json: Sequence[Dict],
+    cvs_embeddings: Sequence[Optional[Sequence[float]]],
+    top_k: int = 10
+) -> List[Dict]:
+    """
+    Classe N CV pour une offre en une passe vectorisée.
+
+    Args:
+        offre_json: Structure JSON de l'offre
+        offre_embedding: Embedding de l'offre (calculé si absent)
+        cvs_json: Structures JSON des CV
+        cvs_embeddings: Embeddings des CV (None = calculé en batch)
+        top_k: Nombre de résultats à retourner
+
+    Returns:
+        List[Dict]: top_k résultats (index dans cvs_json, score, recommandation, détails)
+    """
+    if not cvs_json:
+        return []
+
+    if offre_embedding is None:
+        offre_embedding = embed_texts([preparer_texte_offre(offre_json)])[0]
+    matrice = _empiler_embeddings(cvs_embeddings, [preparer_texte_cv(c) for c in cvs_json])
+    similarites = calculer_similarites_cosinus(offre_embedding, matrice)
+
+    offre_f = caracteristiques_offre(offre_json)
+    criteres = _scores_criteres([(caracteristiques_cv(c), offre_f) for c in cvs_json])
+
+    return _classer(similarites, criteres, [(c, offre_json) for c in cvs_json], top_k)
@@ -0,0 +1,578 @@
+"""
+Passerelle commune à tous les appels LLM (extraction CV/offre, explications).
+- Seau à jetons : débit max de requêtes vers le fournisseur
+- Concurrence bornée : nombre max d'appels simultanés
+- Relances à backoff exponentiel (429, timeouts, erreurs réseau/5xx) dans la limite d'un budget
+- Disjoncteur : après N échecs consécutifs, les appels échouent immédiatement
+  (les agents basculent aussitôt sur leurs fallbacks) jusqu'au prochain essai
+
+Seau à jetons et disjoncteur sont partagés entre les workers uvicorn du même hôte via un
+fichier SQLite (WAL, transactions IMMEDIATE) : un seul débit global, un seul disjoncteur,
+un seul appel d'essai en demi-ouvert. Sans fichier (LLM_SHARED_STATE_PATH vide ou illisible),
+l'état est propre à chaque process et le débit est réparti entre LLM_WORKERS_PROCESS process.
+La concurrence max et les compteurs de GET /health/llm restent par process.
+Côté async (aappeler, aadmettre, aliberer), les transactions SQLite tournent dans un thread
+(asyncio.to_thread) : un verrou tenu par un autre worker ne bloque pas la boucle d'événements.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+# Débit total autorisé vers le fournisseur (requêtes/s) et rafale max
+LLM_DEBIT_PAR_SECONDE = float(os.getenv("LLM_RATE_PER_SECOND", "5"))
+LLM_RAFALE = int(os.getenv("LLM_BURST", "10"))
+# État partagé entre workers (seau + disjoncteur), désactivé si vide
+LLM_ETAT_PARTAGE = os.getenv("LLM_SHARED_STATE_PATH", "cache/passerelle_llm.sqlite")
+# Sans état partagé : nombre de process (workers uvicorn) qui se répartissent ce débit
+LLM_WORKERS_PROCESS = max(1, int(os.getenv("LLM_WORKERS_PROCESS", os.getenv("WEB_CONCURRENCY", "1"))))
+# Appels simultanés max par process
+LLM_CONCURRENCE_MAX = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Attente max d'un jeton ou d'un créneau avant rejet (fallback)
+LLM_ATTENTE_MAX_S = float(os.getenv("LLM_MAX_WAIT_S", "5"))
+# Relances : nombre max par appel, délai initial, et budget (relances / appels sur la fenêtre)
+LLM_RELANCES_MAX = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_INITIAL_S = float(os.getenv("LLM_BACKOFF_INITIAL_S", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))
+LLM_BUDGET_RELANCES = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+# Disjoncteur : échecs consécutifs avant ouverture, durée d'ouverture
+LLM_SEUIL_DISJONCTEUR = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_DISJONCTEUR_PAUSE_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+# Durée max d'un appel d'essai en demi-ouvert (au-delà : process mort, un autre essai est permis)
+LLM_ESSAI_MAX_S = float(os.getenv("LLM_BREAKER_TRIAL_TIMEOUT_S", "60"))
+
+
+class LLMIndisponible(Exception):
+    """Appel refusé par la passerelle (disjoncteur ouvert, débit ou concurrence saturés)."""
+
+
+class DisjoncteurOuvert(LLMIndisponible):
+    pass
+
+
+class DebitDepasse(LLMIndisponible):
+    pass
+
+
+def est_erreur_transitoire(e: BaseException) -> bool:
+    """429, 5xx, timeouts et erreurs réseau : relançables et comptés par le disjoncteur."""
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    nom = type(e).__name__
+    return any(m in nom for m in ("RateLimit", "Timeout", "Connection", "InternalServer", "ServiceUnavailable"))
+
+
+# ============================================
+# ÉTAT PARTAGÉ ENTRE PROCESS
+# ============================================
+
+class EtatPartage:
+    """
+    État JSON nommé (seau, disjoncteur), lu et réécrit dans une transaction : SQLite IMMEDIATE
+    (partagé entre process) ou verrou local si le fichier est désactivé / indisponible.
+    """
+
+    def __init__(self, cle: str, defauts: Dict[str, Any], chemin: str = LLM_ETAT_PARTAGE):
+        self.cle = cle
+        self.chemin = chemin
+        self._local = dict(defauts)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if chemin:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+                # isolation_level=None : transactions explicites (BEGIN IMMEDIATE)
+                self._conn = sqlite3.connect(chemin, check_same_thread=False, timeout=5, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS passerelle (cle TEXT PRIMARY KEY, valeur TEXT NOT NULL)")
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO passerelle (cle, valeur) VALUES (?, ?)", (cle, json.dumps(defauts))
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️ État partagé de la passerelle LLM indisponible ({e}) : état par process")
+                self._conn = None
+
+    @property
+    def partage(self) -> bool:
+        return self._conn is not None
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Dict d'état modifiable : les changements sont écrits à la sortie du bloc."""
+        with self._lock:
+            if self._conn is None:
+                yield self._local
+                return
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                ligne = self._conn.execute("SELECT valeur FROM passerelle WHERE cle = ?", (self.cle,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ État partagé de la passerelle LLM illisible ({e}) : état local pour cet appel")
+                self._annuler()
+                yield self._local
+                return
+            etat = json.loads(ligne[0]) if ligne else dict(self._local)
+            try:
+                yield etat
+            except BaseException:
+                self._annuler()
+                raise
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO passerelle (cle, valeur) VALUES (?, ?)", (self.cle, json.dumps(etat))
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"⚠️ État partagé de la passerelle LLM non écrit : {e}")
+                self._annuler()
+            self._local = dict(etat)  # dernier état connu (repli si le fichier devient indisponible)
+
+    def _annuler(self) -> None:
+        try:
+            self._conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass  # pas de transaction ouverte
+
+
+# ============================================
+# SEAU À JETONS
+# ============================================
+
+class SeauJetons:
+    """Token bucket thread-safe (et multi-process si l'état est partagé) : `debit` jetons/s, capacité `rafale`."""
+
+    def __init__(self, debit: float, rafale: int, chemin_partage: str = LLM_ETAT_PARTAGE):
+        self.capacite = max(1, rafale)
+        self._etat = EtatPartage("seau", {"jetons": float(self.capacite), "maj": time.time()}, chemin_partage)
+        if not self._etat.partage:
+            # Chaque process applique sa part du débit global
+            debit, self.capacite = debit / LLM_WORKERS_PROCESS, max(1, self.capacite // LLM_WORKERS_PROCESS)
+        self.debit = debit
+
+    def _remplir(self, etat: Dict[str, Any]) -> None:
+        maintenant = time.time()
+        etat["jetons"] = min(self.capacite, etat["jetons"] + max(0.0, maintenant - etat["maj"]) * self.debit)
+        etat["maj"] = maintenant
+
+    def prendre(self, attente_max: float) -> Optional[float]:
+        """
+        Réserve un jeton : retourne l'attente nécessaire (0 si disponible tout de suite),
+        ou None (sans rien réserver) si elle dépasserait `attente_max`.
+        """
+        if self.debit <= 0:
+            return 0.0
+        with self._etat.transaction() as etat:
+            self._remplir(etat)
+            attente = max(0.0, (1 - etat["jetons"]) / self.debit)
+            if attente > attente_max:
+                return None
+            etat["jetons"] -= 1  # peut devenir négatif : jeton réservé pour dans `attente` s
+            return attente
+
+    def rendre(self) -> None:
+        """Restitue un jeton réservé mais non utilisé (créneau non obtenu, appel annulé)."""
+        if self.debit <= 0:
+            return
+        with self._etat.transaction() as etat:
+            self._remplir(etat)
+            etat["jetons"] = min(self.capacite, etat["jetons"] + 1)
+
+    def disponibles(self) -> float:
+        with self._etat.transaction() as etat:
+            self._remplir(etat)
+            return round(etat["jetons"], 2)
+
+
+# ============================================
+# DISJONCTEUR
+# ============================================
+
+FERME, OUVERT, DEMI_OUVERT = "ferme", "ouvert", "demi_ouvert"
+
+
+class Disjoncteur:
+    """
+    fermé → (N échecs transitoires consécutifs) → ouvert → (pause écoulée) → demi-ouvert :
+    un seul appel d'essai (tous process confondus si l'état est partagé) ; succès → fermé, échec → ouvert.
+    """
+
+    def __init__(self, seuil: int, pause_s: float, chemin_partage: str = LLM_ETAT_PARTAGE):
+        self.seuil = max(1, seuil)
+        self.pause_s = pause_s
+        self._etat = EtatPartage(
+            "disjoncteur",
+            {"etat": FERME, "echecs": 0, "ouvert_a": 0.0, "essai_jusqu_a": 0.0, "ouvertures": 0},
+            chemin_partage,
+        )
+
+    @property
+    def etat(self) -> str:
+        with self._etat.transaction() as etat:
+            return etat["etat"]
+
+    def autoriser(self) -> Optional[str]:
+        """État dans lequel l'appel est admis (fermé, ou demi-ouvert pour l'essai), None si refusé."""
+        with self._etat.transaction() as etat:
+            if etat["etat"] == FERME:
+                return FERME
+            maintenant = time.time()
+            if etat["etat"] == OUVERT and maintenant - etat["ouvert_a"] >= self.pause_s:
+                etat["etat"] = DEMI_OUVERT
+                etat["essai_jusqu_a"] = 0.0
+            if etat["etat"] == DEMI_OUVERT and etat["essai_jusqu_a"] < maintenant:
+                etat["essai_jusqu_a"] = maintenant + LLM_ESSAI_MAX_S
+                return DEMI_OUVERT
+            return None
+
+    def succes(self) -> None:
+        with self._etat.transaction() as etat:
+            etat["echecs"] = 0
+            etat["essai_jusqu_a"] = 0.0
+            if etat["etat"] != FERME:
+                print("🟢 Disjoncteur LLM refermé")
+            etat["etat"] = FERME
+
+    def abandon(self) -> None:
+        """Appel d'essai annulé (ex. client SSE déconnecté) : ni succès ni échec, libère l'essai."""
+        with self._etat.transaction() as etat:
+            if etat["etat"] == DEMI_OUVERT:
+                etat["essai_jusqu_a"] = 0.0
+
+    def echec(self) -> None:
+        with self._etat.transaction() as etat:
+            etat["echecs"] += 1
+            etat["essai_jusqu_a"] = 0.0
+            if etat["etat"] == DEMI_OUVERT or etat["echecs"] >= self.seuil:
+                if etat["etat"] != OUVERT:
+                    etat["ouvertures"] += 1
+                    print(f"🔴 Disjoncteur LLM ouvert pour {self.pause_s}s ({etat['echecs']} échecs consécutifs)")
+                etat["etat"] = OUVERT
+                etat["ouvert_a"] = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._etat.transaction() as etat:
+            ouvert = etat["etat"] == OUVERT
+            restant = max(0.0, self.pause_s - (time.time() - etat["ouvert_a"])) if ouvert else 0.0
+            return {
+                "etat": etat["etat"],
+                "echecs_consecutifs": etat["echecs"],
+                "ouvertures": etat["ouvertures"],
+                "reouverture_dans_s": round(restant, 1),
+                "partage_entre_process": self._etat.partage,
+            }
+
+
+# ============================================
+# PASSERELLE
+# ============================================
+
+def _reveiller(reveil: "asyncio.Future[None]") -> None:
+    if not reveil.done():
+        reveil.set_result(None)
+
+
+class PasserelleLLM:
+    def __init__(self):
+        self.seau = SeauJetons(LLM_DEBIT_PAR_SECONDE, LLM_RAFALE)
+        self.disjoncteur = Disjoncteur(LLM_SEUIL_DISJONCTEUR, LLM_DISJONCTEUR_PAUSE_S)
+        self._creneaux = threading.BoundedSemaphore(max(1, LLM_CONCURRENCE_MAX))
+        # Appels async en attente d'un créneau : réveillés par _rendre_creneau (depuis n'importe quel thread)
+        self._attentes: Deque[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = deque()
+        self._lock = threading.Lock()
+        self._stats = {
+            "appels": 0,
+            "succes": 0,
+            "echecs": 0,
+            "relances": 0,
+            "relances_refusees_budget": 0,
+            "rejets_disjoncteur": 0,
+            "rejets_debit": 0,
+            "rejets_concurrence": 0,
+            "abandons": 0,
+            "en_cours": 0,
+        }
+
+    def _compter(self, cle: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[cle] += n
+
+    # --- admission ---
+
+    def _verifier_disjoncteur(self) -> str:
+        admis = self.disjoncteur.autoriser()
+        if admis is None:
+            self._compter("rejets_disjoncteur")
+            raise DisjoncteurOuvert("Disjoncteur LLM ouvert : appel court-circuité")
+        return admis
+
+    def _attente_jeton(self, echeance: float) -> float:
+        """Réserve un jeton et retourne l'attente avant de l'utiliser ; DebitDepasse si trop longue."""
+        attente = self.seau.prendre(max(0.0, echeance - time.monotonic()))
+        if attente is None:
+            self._compter("rejets_debit")
+            raise DebitDepasse("Débit LLM max atteint")
+        return attente
+
+    def _budget_relance(self) -> bool:
+        """Relance autorisée si relances <= ratio x appels (+ une petite franchise)."""
+        with self._lock:
+            if self._stats["relances"] + 1 > LLM_BUDGET_RELANCES * self._stats["appels"] + 3:
+                self._stats["relances_refusees_budget"] += 1
+                return False
+            return True
+
+    def _backoff(self, tentative: int) -> float:
+        delai = min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_INITIAL_S * (2 ** tentative))
+        return delai * random.uniform(0.5, 1.0)  # jitter
+
+    def _prendre_creneau(self, echeance: float) -> None:
+        if not self._creneaux.acquire(timeout=max(0.0, echeance - time.monotonic())):
+            self._compter("rejets_concurrence")
+            raise LLMIndisponible("Trop d'appels LLM simultanés")
+        self._compter("en_cours")
+
+    def _rendre_creneau(self) -> None:
+        self._compter("en_cours", -1)
+        self._creneaux.release()
+        with self._lock:
+            attentes, self._attentes = self._attentes, deque()
+        for boucle, reveil in attentes:  # chacun retente d'acquérir ; les perdants se réinscrivent
+            try:
+                boucle.call_soon_threadsafe(_reveiller, reveil)
+            except RuntimeError:
+                pass  # boucle d'événements fermée
+
+    async def _aprendre_creneau(self, echeance: float) -> None:
+        boucle = asyncio.get_running_loop()
+        while not self._creneaux.acquire(blocking=False):
+            restant = echeance - time.monotonic()
+            if restant <= 0:
+                self._compter("rejets_concurrence")
+                raise LLMIndisponible("Trop d'appels LLM simultanés")
+            reveil = boucle.create_future()
+            entree = (boucle, reveil)
+            with self._lock:
+                self._attentes.append(entree)
+            try:
+                if self._creneaux.acquire(blocking=False):  # libéré avant l'inscription
+                    break
+                await asyncio.wait_for(reveil, restant)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if entree in self._attentes:
+                        self._attentes.remove(entree)
+        self._compter("en_cours")
+
+    def _reserver(self) -> Tuple[str, float, float]:
+        """
+        Disjoncteur puis jeton de débit (transactions sur l'état partagé) :
+        retourne (état d'admission, attente avant d'utiliser le jeton, échéance pour le créneau).
+        """
+        admis = self._verifier_disjoncteur()
+        echeance = time.monotonic() + LLM_ATTENTE_MAX_S
+        try:
+            attente = self._attente_jeton(echeance)
+        except BaseException:
+            self._abandon_essai(admis)
+            raise
+        return admis, attente, echeance
+
+    def _annuler_reservation(self, admis: str) -> None:
+        """Rend le jeton (et l'essai du disjoncteur) d'une admission qui n'a pas obtenu de créneau."""
+        self.seau.rendre()
+        self._abandon_essai(admis)
+
+    def _annuler_reservation_orpheline(self, reservation: "asyncio.Future[Tuple[str, float, float]]") -> None:
+        """Réservation aboutie après l'annulation de l'appelant : rendue depuis un thread."""
+        if reservation.cancelled() or reservation.exception() is not None:
+            return
+        admis = reservation.result()[0]
+        reservation.get_loop().run_in_executor(None, self._annuler_reservation, admis)
+
+    def _entrer(self) -> str:
+        """
+        Admission synchrone : disjoncteur, jeton de débit, créneau de concurrence.
+        Le jeton (et l'essai du disjoncteur) est rendu si le créneau n'est pas obtenu.
+        """
+        admis, attente, echeance = self._reserver()
+        try:
+            if attente:
+                time.sleep(attente)
+            self._prendre_creneau(echeance)
+        except BaseException:
+            self._annuler_reservation(admis)
+            raise
+        return admis
+
+    async def _aentrer(self) -> str:
+        """
+        Admission async (même contrat que _entrer). Les transactions SQLite de l'état partagé
+        (jusqu'à 5 s d'attente du verrou) tournent dans un thread, jamais sur la boucle d'événements.
+        """
+        reservation = asyncio.ensure_future(asyncio.to_thread(self._reserver))
+        try:
+            admis, attente, echeance = await asyncio.shield(reservation)
+        except asyncio.CancelledError:
+            reservation.add_done_callback(self._annuler_reservation_orpheline)
+            raise
+        try:
+            if attente:
+                await asyncio.sleep(attente)
+            await self._aprendre_creneau(echeance)
+        except BaseException:
+            await asyncio.to_thread(self._annuler_reservation, admis)
+            raise
+        return admis
+
+    def _abandon_essai(self, admis: str) -> None:
+        if admis == DEMI_OUVERT:
+            self.disjoncteur.abandon()
+
+    def _resultat(self, e: Optional[BaseException]) -> None:
+        if e is None:
+            self.disjoncteur.succes()
+            self._compter("succes")
+        elif est_erreur_transitoire(e):
+            self.disjoncteur.echec()
+            self._compter("echecs")
+        else:
+            # Erreur applicative (ex. JSON invalide) : le fournisseur a bien répondu
+            self.disjoncteur.succes()
+            self._compter("echecs")
+
+    def _relancer(self, e: BaseException, tentative: int) -> bool:
+        return (
+            est_erreur_transitoire(e)
+            and tentative < LLM_RELANCES_MAX
+            and self.disjoncteur.etat == FERME
+            and self._budget_relance()
+        )
+
+    def _conclure(self, erreur: Optional[BaseException], tentative: int) -> bool:
+        """Reporte le résultat au disjoncteur ; True si l'appel en échec doit être relancé."""
+        self._resultat(erreur)
+        return erreur is not None and self._relancer(erreur, tentative)
+
+    # --- appels ---
+
+    def appeler(self, fn: Callable[[], Any]) -> Any:
+        """Exécute `fn` (appel LLM bloquant) sous contrôle de la passerelle."""
+        self._compter("appels")
+        tentative = 0
+        while True:
+            admis = self._entrer()
+            erreur = None
+            try:
+                resultat = fn()
+            except Exception as e:
+                erreur = e
+            except BaseException:
+                self._abandon_essai(admis)
+                raise
+            finally:
+                self._rendre_creneau()
+            if not self._conclure(erreur, tentative):
+                if erreur is None:
+                    return resultat
+                raise erreur
+            self._compter("relances")
+            time.sleep(self._backoff(tentative))
+            tentative += 1
+
+    async def aappeler(self, fabrique: Callable[[], Awaitable[Any]]) -> Any:
+        """Version async : `fabrique()` crée la coroutine d'appel (recréée à chaque relance)."""
+        self._compter("appels")
+        tentative = 0
+        while True:
+            admis = await self._aentrer()
+            erreur = None
+            try:
+                resultat = await fabrique()
+            except Exception as e:
+                erreur = e
+            except BaseException:
+                await asyncio.to_thread(self._abandon_essai, admis)
+                raise
+            finally:
+                self._rendre_creneau()
+            if not await asyncio.to_thread(self._conclure, erreur, tentative):
+                if erreur is None:
+                    return resultat
+                raise erreur
+            self._compter("relances")
+            await asyncio.sleep(self._backoff(tentative))
+            tentative += 1
+
+    async def aadmettre(self) -> None:
+        """Admission d'un flux (astream) : disjoncteur + jeton + créneau, sans relance."""
+        self._compter("appels")
+        await self._aentrer()
+
+    def admettre(self) -> None:
+        """Admission d'un flux sync (stream) : disjoncteur + jeton + créneau, sans relance."""
+        self._compter("appels")
+        self._entrer()
+
+    def liberer(self, erreur: Optional[BaseException] = None) -> None:
+        """Fin d'un flux admis par admettre/aadmettre (succès, ou échec si `erreur`)."""
+        if erreur is not None and not isinstance(erreur, Exception):
+            self.abandonner()  # annulation / arrêt du process
+            return
+        self._rendre_creneau()
+        self._resultat(erreur)
+
+    def abandonner(self) -> None:
+        """
+        Flux interrompu par le consommateur (client SSE déconnecté, annulation) : libère le créneau
+        et l'éventuel essai du disjoncteur sans compter ni succès ni échec.
+        """
+        self._rendre_creneau()
+        self.disjoncteur.abandon()
+        self._compter("abandons")
+
+    async def aliberer(self, erreur: Optional[BaseException] = None) -> None:
+        """Version async de liberer : le disjoncteur est mis à jour hors de la boucle d'événements."""
+        if erreur is not None and not isinstance(erreur, Exception):
+            await self.aabandonner()
+            return
+        self._rendre_creneau()
+        await asyncio.to_thread(self._resultat, erreur)
+
+    async def aabandonner(self) -> None:
+        """Version async de abandonner (créneau rendu avant de quitter la boucle)."""
+        self._rendre_creneau()
+        self._compter("abandons")
+        await asyncio.to_thread(self.disjoncteur.abandon)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            compteurs = dict(self._stats)
+        return {
+            **compteurs,
+            "disjoncteur": self.disjoncteur.stats(),
+            "debit_par_seconde": round(self.seau.debit, 2),
+            "jetons_disponibles": self.seau.disponibles(),
+            "concurrence_max": LLM_CONCURRENCE_MAX,
+            "etat_partage": LLM_ETAT_PARTAGE or None,
+            "workers_process": LLM_WORKERS_PROCESS,
+        }
+
+
+passerelle = PasserelleLLM()
+
+
+def stats_passerelle() -> Dict[str, Any]:
+    return passerelle.stats()
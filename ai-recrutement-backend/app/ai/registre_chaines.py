@@ -0,0 +1,340 @@
+"""
+Registre des chaînes LangChain et clients HTTP LLM partagés.
+- Chaque chaîne (prompt | llm | parser) est construite une seule fois par process
+- Tous les LLM partagent un pool de connexions HTTP persistant (keep-alive TCP/TLS)
+- Compteurs d'appels, d'erreurs, latences et tokens (prompt/complétion) par chaîne (GET /health/llm)
+- Journal des derniers appels : chaîne, modèle, tokens, latence
+- Chaque appel passe par la passerelle LLM (débit, concurrence, relances, disjoncteur)
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from app.ai.passerelle_llm import passerelle
+
+
+# Taille du pool de connexions HTTP vers le fournisseur LLM
+LLM_MAX_CONNEXIONS = int(os.getenv("LLM_MAX_CONNEXIONS", "20"))
+LLM_KEEPALIVE_S = float(os.getenv("LLM_KEEPALIVE_S", "60"))
+# Nombre d'appels conservés dans le journal de consommation de tokens
+LLM_JOURNAL_TAILLE = int(os.getenv("LLM_JOURNAL_SIZE", "200"))
+
+_lock = threading.RLock()  # réentrant : une fabrique de chaîne crée les clients HTTP
+_client_http = None
+_client_http_async = None
+_chaines: Dict[str, "ChaineEnregistree"] = {}
+_journal: "deque[Dict[str, Any]]" = deque(maxlen=max(1, LLM_JOURNAL_TAILLE))
+# Usage de l'appel de chaîne en cours, alimenté par le callback LangChain du LLM
+_usage_courant: "contextvars.ContextVar[Optional[Dict[str, Any]]]" = contextvars.ContextVar("usage_llm", default=None)
+_gestionnaire_tokens = None
+
+
+# ============================================
+# CLIENTS HTTP PARTAGÉS
+# ============================================
+
+def _limites():
+    import httpx
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNEXIONS,
+        max_keepalive_connections=LLM_MAX_CONNEXIONS,
+        keepalive_expiry=LLM_KEEPALIVE_S,
+    )
+
+
+def client_http():
+    """Client httpx synchrone partagé (thread-safe) pour les appels invoke/batch."""
+    global _client_http
+    if _client_http is None:
+        with _lock:
+            if _client_http is None:
+                import httpx
+                _client_http = httpx.Client(limits=_limites())
+    return _client_http
+
+
+def client_http_async():
+    """
+    Client httpx async partagé pour ainvoke/abatch.
+    Ses connexions sont liées à la boucle d'événements de l'application :
+    ne l'utiliser que depuis la boucle uvicorn (pas via asyncio.run dans un thread).
+    """
+    global _client_http_async
+    if _client_http_async is None:
+        with _lock:
+            if _client_http_async is None:
+                import httpx
+                _client_http_async = httpx.AsyncClient(limits=_limites())
+    return _client_http_async
+
+
+async def fermer_clients_llm() -> None:
+    """Ferme les clients HTTP partagés (arrêt de l'application)."""
+    global _client_http, _client_http_async
+    with _lock:
+        client, client_async = _client_http, _client_http_async
+        _client_http = _client_http_async = None
+    if client is not None:
+        client.close()
+    if client_async is not None:
+        await client_async.aclose()
+
+
+# ============================================
+# COMPTAGE DES TOKENS
+# ============================================
+
+def enregistrer_usage(modele: Optional[str], tokens_prompt: int, tokens_completion: int) -> None:
+    """Ajoute la consommation d'une réponse LLM à l'appel de chaîne en cours (relances comprises)."""
+    usage = _usage_courant.get()
+    if usage is None:
+        return
+    usage["modele"] = modele or usage["modele"]
+    usage["tokens_prompt"] += tokens_prompt or 0
+    usage["tokens_completion"] += tokens_completion or 0
+
+
+def _usage_reponse(reponse: Any) -> tuple:
+    """(modèle, tokens prompt, tokens complétion) d'un LLMResult LangChain."""
+    llm_output = reponse.llm_output or {}
+    compte = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    modele = llm_output.get("model_name")
+    prompt = compte.get("prompt_tokens")
+    completion = compte.get("completion_tokens")
+    if prompt is None:
+        # streaming : usage porté par le message de la génération
+        for generations in reponse.generations:
+            for generation in generations:
+                meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt = (prompt or 0) + meta.get("input_tokens", 0)
+                completion = (completion or 0) + meta.get("output_tokens", 0)
+                modele = modele or generation.message.response_metadata.get("model_name")
+    return modele, prompt or 0, completion or 0
+
+
+def gestionnaire_tokens():
+    """Callback LangChain (partagé) qui relève l'usage de chaque réponse LLM."""
+    global _gestionnaire_tokens
+    if _gestionnaire_tokens is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class GestionnaireTokens(BaseCallbackHandler):
+            def on_llm_end(self, response, **kwargs) -> None:
+                enregistrer_usage(*_usage_reponse(response))
+
+        _gestionnaire_tokens = GestionnaireTokens()
+    return _gestionnaire_tokens
+
+
+def _nouvel_usage() -> tuple:
+    usage = {"modele": None, "tokens_prompt": 0, "tokens_completion": 0}
+    return usage, _usage_courant.set(usage)
+
+
+def _fin_usage(jeton: contextvars.Token) -> None:
+    try:
+        _usage_courant.reset(jeton)
+    except ValueError:
+        pass  # flux terminé depuis un autre contexte que celui qui l'a ouvert
+
+
+def journal_appels(n: int = 20) -> List[Dict[str, Any]]:
+    """Les `n` derniers appels de chaîne (du plus récent au plus ancien)."""
+    with _lock:
+        return list(_journal)[-n:][::-1]
+
+
+# ============================================
+# CHAÎNES INSTRUMENTÉES
+# ============================================
+
+class ChaineEnregistree:
+    """Enveloppe d'une chaîne LangChain : mêmes méthodes d'appel, avec compteurs et latences."""
+
+    def __init__(self, nom: str, chaine: Any):
+        self.nom = nom
+        self.chaine = chaine
+        self._lock = threading.Lock()
+        self._appels = 0
+        self._erreurs = 0
+        self._latence_totale = 0.0
+        self._latence_max = 0.0
+        self._tokens_prompt = 0
+        self._tokens_completion = 0
+        self._interruptions = 0
+
+    def _enregistrer(self, debut: float, usage: Dict[str, Any], erreur: bool = False, interrompu: bool = False) -> None:
+        duree = time.perf_counter() - debut
+        with self._lock:
+            self._appels += 1
+            self._erreurs += 1 if erreur else 0
+            self._interruptions += 1 if interrompu else 0
+            self._latence_totale += duree
+            self._latence_max = max(self._latence_max, duree)
+            self._tokens_prompt += usage["tokens_prompt"]
+            self._tokens_completion += usage["tokens_completion"]
+        with _lock:
+            _journal.append({
+                "chaine": self.nom,
+                "modele": usage["modele"],
+                "tokens_prompt": usage["tokens_prompt"],
+                "tokens_completion": usage["tokens_completion"],
+                "latence_ms": round(duree * 1000, 1),
+                "erreur": erreur,
+                "interrompu": interrompu,
+                "horodatage": time.time(),
+            })
+
+    def invoke(self, entrees: Dict, **kwargs) -> Any:
+        usage, jeton = _nouvel_usage()
+        debut = time.perf_counter()
+        try:
+            resultat = passerelle.appeler(lambda: self.chaine.invoke(entrees, **kwargs))
+        except BaseException:
+            self._enregistrer(debut, usage, erreur=True)
+            raise
+        finally:
+            _fin_usage(jeton)
+        self._enregistrer(debut, usage)
+        return resultat
+
+    async def ainvoke(self, entrees: Dict, **kwargs) -> Any:
+        usage, jeton = _nouvel_usage()
+        debut = time.perf_counter()
+        try:
+            resultat = await passerelle.aappeler(lambda: self.chaine.ainvoke(entrees, **kwargs))
+        except BaseException:
+            self._enregistrer(debut, usage, erreur=True)
+            raise
+        finally:
+            _fin_usage(jeton)
+        self._enregistrer(debut, usage)
+        return resultat
+
+    # batch/abatch : un appel passerelle par élément (relances et disjoncteur individuels),
+    # concurrence bornée par config["max_concurrency"] comme dans LangChain
+
+    def batch(
+        self, entrees: List[Dict], config: Optional[Dict] = None, *, return_exceptions: bool = False, **kwargs
+    ) -> List[Any]:
+        if not entrees:
+            return []
+
+        def un(e: Dict) -> Any:
+            try:
+                return self.invoke(e, config=config, **kwargs)
+            except Exception as erreur:
+                if return_exceptions:
+                    return erreur
+                raise
+
+        with ThreadPoolExecutor(max_workers=(config or {}).get("max_concurrency") or len(entrees)) as pool:
+            return list(pool.map(un, entrees))
+
+    async def abatch(
+        self, entrees: List[Dict], config: Optional[Dict] = None, *, return_exceptions: bool = False, **kwargs
+    ) -> List[Any]:
+        semaphore = asyncio.Semaphore((config or {}).get("max_concurrency") or max(1, len(entrees)))
+
+        async def un(e: Dict) -> Any:
+            async with semaphore:
+                return await self.ainvoke(e, config=config, **kwargs)
+
+        return await asyncio.gather(*(un(e) for e in entrees), return_exceptions=return_exceptions)
+
+    def stream(self, entrees: Dict, **kwargs) -> Iterator[Any]:
+        passerelle.admettre()
+        usage, jeton = _nouvel_usage()
+        debut = time.perf_counter()
+        try:
+            yield from self.chaine.stream(entrees, **kwargs)
+        except GeneratorExit:
+            # Consommateur arrêté avant la fin : ni succès ni échec pour le disjoncteur
+            self._enregistrer(debut, usage, interrompu=True)
+            passerelle.abandonner()
+            raise
+        except BaseException as e:
+            self._enregistrer(debut, usage, erreur=True)
+            passerelle.liberer(e)
+            raise
+        finally:
+            _fin_usage(jeton)
+        self._enregistrer(debut, usage)
+        passerelle.liberer()
+
+    async def astream(self, entrees: Dict, **kwargs) -> AsyncIterator[Any]:
+        await passerelle.aadmettre()
+        usage, jeton = _nouvel_usage()
+        debut = time.perf_counter()
+        try:
+            async for morceau in self.chaine.astream(entrees, **kwargs):
+                yield morceau
+        except (GeneratorExit, asyncio.CancelledError):
+            # Consommateur arrêté avant la fin : ni succès ni échec pour le disjoncteur
+            self._enregistrer(debut, usage, interrompu=True)
+            await passerelle.aabandonner()
+            raise
+        except BaseException as e:
+            self._enregistrer(debut, usage, erreur=True)
+            await passerelle.aliberer(e)
+            raise
+        finally:
+            _fin_usage(jeton)
+        self._enregistrer(debut, usage)
+        await passerelle.aliberer()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "appels": self._appels,
+                "erreurs": self._erreurs,
+                "interruptions": self._interruptions,
+                "latence_moyenne_ms": round(self._latence_totale / self._appels * 1000, 1) if self._appels else None,
+                "latence_max_ms": round(self._latence_max * 1000, 1),
+                "tokens_prompt": self._tokens_prompt,
+                "tokens_completion": self._tokens_completion,
+                "tokens_prompt_moyen": round(self._tokens_prompt / self._appels) if self._appels else None,
+                "tokens_completion_moyen": round(self._tokens_completion / self._appels) if self._appels else None,
+            }
+
+
+def obtenir_chaine(nom: str, fabrique: Callable[[], Any]) -> ChaineEnregistree:
+    """
+    Retourne la chaîne `nom`, construite une seule fois par process via `fabrique()`.
+    Une fabrique qui échoue (ex. clé API absente) n'est pas mémorisée : nouvel essai au prochain appel.
+    """
+    chaine = _chaines.get(nom)
+    if chaine is None:
+        with _lock:
+            chaine = _chaines.get(nom)
+            if chaine is None:
+                chaine = ChaineEnregistree(nom, fabrique())
+                _chaines[nom] = chaine
+                print(f"🔗 Chaîne LangChain '{nom}' construite")
+    return chaine
+
+
+def stats_chaines() -> Dict[str, Any]:
+    """Compteurs par chaîne, derniers appels + état du pool HTTP partagé."""
+    return {
+        "chaines": {nom: chaine.stats() for nom, chaine in list(_chaines.items())},
+        "derniers_appels": journal_appels(),
+        "pool_http": {
+            "max_connexions": LLM_MAX_CONNEXIONS,
+            "keepalive_s": LLM_KEEPALIVE_S,
+            "client_sync_ouvert": _client_http is not None,
+            "client_async_ouvert": _client_http_async is not None,
+        },
+    }
+
+
+def vider_registre() -> None:
+    """Oublie les chaînes construites (ex. après changement de configuration LLM)."""
+    with _lock:
+        _chaines.clear()
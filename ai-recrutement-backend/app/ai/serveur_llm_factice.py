@@ -0,0 +1,181 @@
+"""
+Faux serveur LLM (API chat/completions compatible OpenAI/Groq) pour tester la passerelle LLM
+sans quota : latence, taux de 429 et de 500 configurables, réponses JSON valides pour chaque chaîne.
+
+Usage :
+    python -m app.ai.serveur_llm_factice --port 8099 --latence-ms 200 --taux-429 0.2
+    GROQ_API_BASE=http://localhost:8099 GROQ_API_KEY=factice uvicorn app.main:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+REPONSES: Dict[str, Dict] = {
+    "recruteur": {
+        "recommandation": "ENTRETIEN",
+        "points_forts": ["Compétences techniques alignées avec le poste"],
+        "points_faibles": ["Expérience à confirmer en entretien"],
+        "synthese": "Profil intéressant, à rencontrer en entretien.",
+    },
+    "candidat": {
+        "message_principal": "Votre profil correspond en partie au poste.",
+        "competences_valorisees": ["Python"],
+        "axes_amelioration": ["Développer la compétence Docker"],
+        "conseils": ["Mettez en avant vos projets les plus pertinents"],
+    },
+    "cv": {
+        "nom": "Candidat Factice",
+        "email": "candidat@example.com",
+        "telephone": None,
+        "competences": ["Python", "SQL"],
+        "experiences": [{"poste": "Développeur", "entreprise": "Exemple", "periode": "2021-2024", "description": None}],
+        "formations": [{"diplome": "Master Informatique", "etablissement": None, "annee": "2021"}],
+        "langues": ["Français", "Anglais"],
+    },
+    "offre": {
+        "titre": "Développeur Python",
+        "description": "Offre factice",
+        "competences_requises": ["Python", "SQL", "Docker"],
+        "experience_requise_ans": 2,
+        "niveau_etudes_requis": 4,
+        "langues_requises": ["Français"],
+        "missions": None,
+        "localisation": None,
+        "type_contrat": "CDI",
+        "salaire_min": None,
+        "salaire_max": None,
+    },
+}
+
+_stats_lock = threading.Lock()
+_stats = {"requetes": 0, "reponses_429": 0, "reponses_500": 0}
+
+
+def choisir_reponse(prompt: str) -> Dict:
+    """Réponse selon la chaîne appelante (reconnue au début de son prompt)."""
+    if "consultant RH" in prompt:
+        return REPONSES["recruteur"]
+    if "coach de carrière" in prompt:
+        return REPONSES["candidat"]
+    if "analyse de CV" in prompt or "Extrais ce CV" in prompt:
+        return REPONSES["cv"]
+    return REPONSES["offre"]
+
+
+def creer_handler(latence_ms: float, taux_429: float, taux_500: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, comme le vrai fournisseur
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, code: int, corps: Dict, entetes: Dict = None) -> None:
+            donnees = json.dumps(corps).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(donnees)))
+            for cle, valeur in (entetes or {}).items():
+                self.send_header(cle, valeur)
+            self.end_headers()
+            self.wfile.write(donnees)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                with _stats_lock:
+                    self._json(200, dict(_stats))
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            longueur = int(self.headers.get("Content-Length", 0))
+            requete = json.loads(self.rfile.read(longueur) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+
+            with _stats_lock:
+                _stats["requetes"] += 1
+            tirage = random.random()
+            if tirage < taux_429:
+                with _stats_lock:
+                    _stats["reponses_429"] += 1
+                self._json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}}, {"Retry-After": "1"})
+                return
+            if tirage < taux_429 + taux_500:
+                with _stats_lock:
+                    _stats["reponses_500"] += 1
+                self._json(500, {"error": {"message": "Internal server error"}})
+                return
+
+            time.sleep(latence_ms / 1000)
+            prompt = " ".join(str(m.get("content", "")) for m in requete.get("messages", []))
+            contenu = json.dumps(choisir_reponse(prompt), ensure_ascii=False)
+            modele = requete.get("model", "factice")
+            ident = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(contenu) // 4}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if requete.get("stream"):
+                self._streamer(ident, modele, contenu)
+                return
+            self._json(200, {
+                "id": ident,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": modele,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": contenu}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def _streamer(self, ident: str, modele: str, contenu: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            morceaux = [contenu[i:i + 16] for i in range(0, len(contenu), 16)]
+            for i, morceau in enumerate(morceaux + [""]):
+                fin = i == len(morceaux)
+                delta = {} if fin else {"content": morceau}
+                evenement = {
+                    "id": ident,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": modele,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if fin else None}],
+                }
+                self.wfile.write(f"data: {json.dumps(evenement, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+def demarrer(port: int = 8099, latence_ms: float = 200, taux_429: float = 0.0, taux_500: float = 0.0) -> ThreadingHTTPServer:
+    """Démarre le serveur dans un thread (utilisable depuis un script de test)."""
+    serveur = ThreadingHTTPServer(("127.0.0.1", port), creer_handler(latence_ms, taux_429, taux_500))
+    threading.Thread(target=serveur.serve_forever, name="llm-factice", daemon=True).start()
+    return serveur
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur LLM compatible OpenAI/Groq")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latence-ms", type=float, default=200)
+    parser.add_argument("--taux-429", type=float, default=0.0, help="Proportion de réponses 429 (0-1)")
+    parser.add_argument("--taux-500", type=float, default=0.0, help="Proportion de réponses 500 (0-1)")
+    args = parser.parse_args()
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", args.port), creer_handler(args.latence_ms, args.taux_429, args.taux_500))
+    print(f"🧪 Faux LLM sur http://127.0.0.1:{args.port} (latence {args.latence_ms} ms, 429 {args.taux_429:.0%}, 500 {args.taux_500:.0%})")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
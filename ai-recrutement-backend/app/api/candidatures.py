@@ -1,13 +1,17 @@
 """
 API Candidatures : postuler, lister, détail.
 """
+import asyncio
+import json
+import time
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.dependencies import get_current_user, require_roles
 from app.models.user import User
 from app.models.candidature import Candidature
@@ -15,6 +19,9 @@ from app.models.cv import CV
 from app.models.offre_emploi import OffreEmploi
 from app.services.auth_service import get_candidat_by_user_id, get_recruteur_by_user_id
 from app.ai.moteur_matching import executer_matching
+from app.services.embedding_service import obtenir_embedding_cv, obtenir_embedding_offre
+from app.services.explication_jobs import EN_ATTENTE, STATUTS_TERMINAUX, soumettre_explication
+from app.services.ingestion_cv import est_ingere
 
 
 router = APIRouter(prefix="/candidatures", tags=["Candidatures"])
@@ -34,13 +41,33 @@ def _candidature_to_response(c: Candidature) -> dict:
         "id": c.id,
         "candidat_id": c.candidat_id,
         "offre_id": c.offre_id,
+        "cv_id": c.cv_id,
         "statut": c.statut,
         "score_matching": float(c.score_matching) if c.score_matching is not None else None,
         "explication": c.explication,
+        "explication_statut": c.explication_statut,
         "date_candidature": c.date_candidature.isoformat() if c.date_candidature else "",
     }
 
 
+def _candidature_autorisee(db: Session, candidature_id: str, current_user: User) -> Candidature:
+    """Candidature visible par l'utilisateur (candidat : les siennes, recruteur : celles de ses offres)."""
+    c = db.query(Candidature).filter(Candidature.id == candidature_id).first()
+    if not c:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Candidature introuvable")
+
+    if current_user.role.value == "candidat":
+        candidat = get_candidat_by_user_id(db, current_user.id)
+        if not candidat or c.candidat_id != candidat.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
+    else:
+        offre = db.query(OffreEmploi).filter(OffreEmploi.id == c.offre_id).first()
+        recruteur = get_recruteur_by_user_id(db, current_user.id)
+        if not recruteur or not offre or offre.recruteur_id != recruteur.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
+    return c
+
+
 # ---------- Créer une candidature (candidat) ----------
 @router.post("", response_model=dict, status_code=status.HTTP_201_CREATED)
 def create_candidature(
@@ -48,7 +75,10 @@ def create_candidature(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles("candidat")),
 ):
-    """Postuler à une offre avec un CV. Calcule le score de matching et l'explication IA."""
+    """
+    Postuler à une offre avec un CV. Calcule le score de matching immédiatement ;
+    l'explication IA est générée en différé (explication_statut, cf. GET /candidatures/{id}/explication).
+    """
     candidat = get_candidat_by_user_id(db, current_user.id)
     if not candidat:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profil candidat introuvable")
@@ -58,6 +88,8 @@ def create_candidature(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CV introuvable")
     if cv.candidat_id != candidat.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="CV non autorisé")
+    if not est_ingere(cv):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="CV pas encore analysé (ingestion en cours ou en échec)")
 
     offre = db.query(OffreEmploi).filter(OffreEmploi.id == body.offre_id).first()
     if not offre:
@@ -75,33 +107,39 @@ def create_candidature(
     cv_json = cv.json_structure or {}
     offre_json = offre.json_structure or {"titre": offre.titre, "description": offre.description, "competences_requises": []}
 
+    # Score calculé tout de suite ; les explications IA sont générées en tâche de fond
     try:
-        resultat = executer_matching(cv_json, offre_json, cv_embedding=None, offre_embedding=None, generer_explications=True)
+        resultat = executer_matching(
+            cv_json,
+            offre_json,
+            cv_embedding=obtenir_embedding_cv(db, cv),
+            offre_embedding=obtenir_embedding_offre(db, offre),
+            generer_explications=False,
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur matching : {str(e)}")
 
-    explication_text = None
-    if resultat.get("explications"):
-        ex = resultat["explications"]
-        if isinstance(ex, dict):
-            rec = ex.get("pour_recruteur", {})
-            cand = ex.get("pour_candidat", {})
-            explication_text = f"Recruteur: {rec.get('synthese', '')} | Candidat: {cand.get('message_principal', '')}"
-        elif hasattr(ex, "pour_recruteur"):
-            explication_text = getattr(ex.pour_recruteur, "synthese", "") or getattr(ex.pour_candidat, "message_principal", "")
-
     candidature = Candidature(
         id=str(uuid.uuid4()),
         candidat_id=candidat.id,
         offre_id=body.offre_id,
+        cv_id=cv.id,
         statut="pending",
         score_matching=resultat.get("score_final"),
-        explication=explication_text,
+        explication=None,
+        explication_statut=EN_ATTENTE,
     )
     db.add(candidature)
     db.commit()
     db.refresh(candidature)
 
+    soumettre_explication(candidature.id, {
+        "score_final": resultat["score_final"],
+        "details": resultat["details"],
+        "recommandation": resultat["recommandation"],
+        "titre_poste": offre_json.get("titre", "Poste sans titre"),
+    })
+
     return _candidature_to_response(candidature)
 
 
@@ -142,21 +180,71 @@ def get_candidature(
     current_user: User = Depends(get_current_user),
 ):
     """Détail d'une candidature (candidat : les siennes, recruteur : celles de ses offres)."""
-    c = db.query(Candidature).filter(Candidature.id == candidature_id).first()
-    if not c:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Candidature introuvable")
+    return _candidature_to_response(_candidature_autorisee(db, candidature_id, current_user))
 
-    if current_user.role.value == "candidat":
-        candidat = get_candidat_by_user_id(db, current_user.id)
-        if not candidat or c.candidat_id != candidat.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
-    else:
-        offre = db.query(OffreEmploi).filter(OffreEmploi.id == c.offre_id).first()
-        recruteur = get_recruteur_by_user_id(db, current_user.id)
-        if not recruteur or not offre or offre.recruteur_id != recruteur.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
 
-    return _candidature_to_response(c)
+# ---------- Explication différée : polling / SSE ----------
+def _etat_explication(c: Candidature) -> dict:
+    return {
+        "candidature_id": c.id,
+        "explication_statut": c.explication_statut,
+        "explication": c.explication,
+    }
+
+
+@router.get("/{candidature_id}/explication", response_model=dict)
+def get_explication(
+    candidature_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Statut et texte de l'explication IA d'une candidature (polling)."""
+    return _etat_explication(_candidature_autorisee(db, candidature_id, current_user))
+
+
+def _lire_etat_explication(candidature_id: str) -> dict | None:
+    db = SessionLocal()
+    try:
+        c = db.query(Candidature).filter(Candidature.id == candidature_id).first()
+        return _etat_explication(c) if c else None
+    finally:
+        db.close()
+
+
+@router.get("/{candidature_id}/explication/stream")
+async def stream_explication(
+    candidature_id: str,
+    timeout_s: float = Query(60, ge=1, le=300, description="Durée max du flux"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Server-Sent Events : envoie un événement `statut` à chaque changement,
+    puis `explication` quand elle est prête (ou en échec) et ferme le flux.
+    """
+    await asyncio.to_thread(_candidature_autorisee, db, candidature_id, current_user)
+
+    async def evenements():
+        dernier_statut = None
+        fin = time.monotonic() + timeout_s
+        while time.monotonic() < fin:
+            etat = await asyncio.to_thread(_lire_etat_explication, candidature_id)
+            if etat is None:
+                return
+            if etat["explication_statut"] in STATUTS_TERMINAUX or etat["explication_statut"] is None:
+                yield f"event: explication\ndata: {json.dumps(etat, ensure_ascii=False)}\n\n"
+                return
+            if etat["explication_statut"] != dernier_statut:
+                dernier_statut = etat["explication_statut"]
+                yield f"event: statut\ndata: {json.dumps(etat, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(1)
+        yield "event: timeout\ndata: {}\n\n"
+
+    return StreamingResponse(
+        evenements(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ---------- Changer le statut d'une candidature (recruteur) ----------
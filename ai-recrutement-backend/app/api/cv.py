@@ -4,7 +4,7 @@ API CV : upload PDF, liste mes CVs, détail, suppression, indexation Chroma.
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
@@ -13,7 +13,14 @@ from app.core.dependencies import get_current_user, require_roles
 from app.models.user import User
 from app.models.cv import CV
 from app.services.auth_service import get_candidat_by_user_id
-from app.ai.analyse_cv import analyser_cv_pdf, creer_cv_en_base
+from app.ai.analyse_cv import UPLOAD_DIR
+from app.services.upload_cv import (
+    FichierTropVolumineux,
+    recevoir_pdf,
+    stocker_par_empreinte,
+    supprimer_fichier_temporaire,
+)
+from app.services.ingestion_cv import EN_COURS, creer_cv_a_ingerer, etat_ingestion, relancer_ingestion
 from app.vector_store.indexing import index_cv_from_json, search_offres_for_cv
 
 
@@ -54,17 +61,36 @@ def _cv_to_response(cv: CV) -> dict:
         "extracted_data": cv.json_structure,
         "json_structure": cv.json_structure,
         "date_upload": cv.date_upload.isoformat() if cv.date_upload else "",
+        "ingestion_statut": etat_ingestion(cv)["statut"],
     }
 
 
-# ---------- Upload PDF (analyse + sauvegarde BDD + index Chroma) ----------
-@router.post("/upload", response_model=dict)
+def _cv_autorise(db: Session, cv_id: str, current_user: User, proprietaire_seulement: bool = False) -> CV:
+    """CV `cv_id` si l'utilisateur y a accès (candidat : uniquement les siens), sinon 404/403."""
+    cv = db.query(CV).filter(CV.id == cv_id).first()
+    if not cv:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CV introuvable")
+
+    candidat = get_candidat_by_user_id(db, current_user.id)
+    if (proprietaire_seulement or current_user.role.value == "candidat") and (
+        not candidat or cv.candidat_id != candidat.id
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
+    return cv
+
+
+# ---------- Upload PDF (stockage puis ingestion asynchrone) ----------
+@router.post("/upload", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def upload_cv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles("candidat")),
 ):
-    """Upload un CV PDF : extraction IA, sauvegarde en BDD, indexation Chroma."""
+    """
+    Upload un CV PDF : le fichier est stocké (par empreinte) et le CV créé immédiatement ;
+    extraction IA, embedding et indexation Chroma sont faits en tâche de fond
+    (suivi : GET /cvs/{id}/ingestion), ou repris d'un PDF identique déjà analysé.
+    """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Fichier PDF requis")
 
@@ -72,44 +98,71 @@ async def upload_cv(
     if not candidat:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profil candidat introuvable")
 
-    content = await file.read()
-    if len(content) > 10 * 1024 * 1024:  # 10 Mo
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Fichier trop volumineux (max 10 Mo)")
-
+    # Lecture par blocs : taille max vérifiée au fil de l'eau, jamais de copie complète en mémoire
     try:
-        cv_json, texte_brut, _ = analyser_cv_pdf(content, file.filename or "cv.pdf", sauvegarder_pdf=True)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Erreur lors de l'analyse du CV : {str(e)}",
-        )
+        recu = await recevoir_pdf(file, UPLOAD_DIR)
+    except FichierTropVolumineux as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    json_dict = cv_json if isinstance(cv_json, dict) else (cv_json.model_dump() if hasattr(cv_json, "model_dump") else {})
     try:
-        nouveau_cv = creer_cv_en_base(
-            db, candidat.id, file.filename or "cv.pdf", texte_brut, json_dict, fichier_chemin=None
-        )
+        # Stockage adressé par contenu : un PDF déjà reçu (même candidat ou non) n'est ni
+        # réécrit, ni ré-extrait, ni renvoyé au LLM
+        chemin_pdf, deja_stocke = stocker_par_empreinte(recu["chemin"], recu["sha256"], UPLOAD_DIR)
     except Exception as e:
+        supprimer_fichier_temporaire(recu["chemin"])
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
     try:
-        index_cv_from_json(
-            str(nouveau_cv.id),
-            json_dict,
-            metadata={"candidat_id": candidat.id, "nom_fichier": file.filename},
+        nouveau_cv = creer_cv_a_ingerer(
+            db, candidat.id, file.filename, chemin_pdf,
+            fichier_hash=recu["sha256"], pdf_deja_stocke=deja_stocke,
         )
-    except Exception:
-        pass  # indexation non bloquante
+    except Exception as e:
+        db.rollback()
+        # PDF rangé par cette requête et référencé par aucun CV : ne pas le laisser orphelin
+        if not deja_stocke and not db.query(CV.id).filter(CV.fichier_chemin == chemin_pdf).first():
+            supprimer_fichier_temporaire(chemin_pdf)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
     return {
         "id": nouveau_cv.id,
+        "job_id": nouveau_cv.id,
         "candidat_id": nouveau_cv.candidat_id,
         "nom_fichier": nouveau_cv.fichier_nom,
-        "extracted_data": nouveau_cv.json_structure,
-        "json_structure": nouveau_cv.json_structure,
+        "extracted_data": None,
+        "json_structure": None,
+        "ingestion": etat_ingestion(nouveau_cv),
     }
 
 
+# ---------- Suivi de l'ingestion ----------
+@router.get("/{cv_id}/ingestion", response_model=dict)
+def get_ingestion(
+    cv_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Statut global et par étape (stockage, extraction, structuration, embedding, indexation)."""
+    return etat_ingestion(_cv_autorise(db, cv_id, current_user))
+
+
+@router.post("/{cv_id}/ingestion/relancer", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def relancer_ingestion_cv(
+    cv_id: str,
+    depuis: str | None = Query(default=None, description="Rejouer toutes les étapes à partir de celle-ci"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("candidat")),
+):
+    """Relance les étapes en échec (ou toutes à partir de `depuis`)."""
+    cv = _cv_autorise(db, cv_id, current_user, proprietaire_seulement=True)
+    if cv.ingestion_statut == EN_COURS:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ingestion en cours")
+    try:
+        return relancer_ingestion(db, cv, depuis)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 # ---------- Liste des CVs du candidat connecté ----------
 @router.get("/my-cvs", response_model=list)
 def my_cvs(
@@ -133,15 +186,7 @@ def get_cv(
     current_user: User = Depends(get_current_user),
 ):
     """Retourne un CV par ID (candidat : uniquement les siens)."""
-    cv = db.query(CV).filter(CV.id == cv_id).first()
-    if not cv:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CV introuvable")
-
-    candidat = get_candidat_by_user_id(db, current_user.id)
-    if current_user.role.value == "candidat" and (not candidat or cv.candidat_id != candidat.id):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
-
-    return _cv_to_response(cv)
+    return _cv_to_response(_cv_autorise(db, cv_id, current_user))
 
 
 # ---------- Suppression ----------
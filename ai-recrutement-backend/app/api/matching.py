@@ -4,25 +4,104 @@ API Endpoints pour le matching CV-Offre
 Membre 5 - Niveau 2
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.inference import executer_inference
 from app.schemas.matching import (
+    EtapesRecherche,
     MatchingRequest,
+    ModeExplication,
     MatchingResponse,
     SearchMatchingRequest,
     MatchingListResponse,
 )
 from pydantic import BaseModel, Field
 from app.ai.moteur_matching import executer_matching, executer_matching_avec_recherche
-from app.ai.embeddings import embed_text
+from app.ai.moteur_matching_batch import classer_cvs_pour_offre, classer_offres_pour_cv
+from app.ai.agent_explication import agenerer_explications_completes, agenerer_explications_lot, astream_explications
+from app.ai.embeddings import embed_text, embed_texts
+from app.vector_store.indexing import search_cvs_for_offer
+from app.services.embedding_service import (
+    appliquer_embedding,
+    embedding_perime,
+    offre_json_de,
+    texte_embedding_cv,
+    texte_embedding_offre,
+    vecteur_stocke,
+)
+from app.services.ingestion_cv import cv_ingere, est_ingere
 
 
 router = APIRouter(prefix="/matching", tags=["Matching"])
 
 
+def _shortlist_cvs(offre_json: dict, taille: int, offre_embedding: Optional[List[float]] = None) -> List[str]:
+    """IDs des CV les plus proches de l'offre dans Chroma ([] si indisponible)."""
+    try:
+        res = search_cvs_for_offer(offre_json, top_k=taille, query_embedding=offre_embedding)
+    except Exception as e:
+        print(f"⚠️ Présélection Chroma indisponible : {e}")
+        return []
+    ids = res.get("ids") or [[]]
+    return list(ids[0])
+
+
+async def _embeddings(db: Session, docs: list, texte_de) -> List[Optional[List[float]]]:
+    """
+    Embeddings stockés des CV/offres ; les absents ou périmés sont encodés dans le pool
+    d'inférence (textes seuls) puis persistés ici : la session reste sur le thread de la requête.
+    """
+    textes = [texte_de(doc) for doc in docs]
+    perimes = [i for i, (doc, texte) in enumerate(zip(docs, textes)) if embedding_perime(doc, texte)]
+    if perimes:
+        vecteurs = await executer_inference(embed_texts, [textes[i] for i in perimes])
+        for i, vecteur in zip(perimes, vecteurs):
+            appliquer_embedding(docs[i], textes[i], vecteur)
+        db.commit()
+    return [vecteur_stocke(doc) if texte is not None else None for doc, texte in zip(docs, textes)]
+
+
+async def _embedding_cv(db: Session, cv) -> Optional[List[float]]:
+    return (await _embeddings(db, [cv], texte_embedding_cv))[0]
+
+
+async def _embedding_offre(db: Session, offre) -> Optional[List[float]]:
+    return (await _embeddings(db, [offre], texte_embedding_offre))[0]
+
+
+async def _expliquer(resultat: dict, offre_json: dict, mode: str = "llm") -> None:
+    """Explications recruteur + candidat (appels LLM async concurrents, sans thread du pool)."""
+    resultat["explications"] = await agenerer_explications_completes(
+        resultat["score_final"],
+        resultat["details"],
+        resultat["recommandation"],
+        offre_json.get("titre", "Poste sans titre"),
+        mode=mode
+    )
+
+
+async def _ajouter_explications(resultats: List[dict], offres_json: List[dict], mode: str = "llm") -> None:
+    """Génère les explications IA pour les résultats retenus (top_k) uniquement, en un lot."""
+    explications = await agenerer_explications_lot([
+        {
+            "score_final": resultat["score_final"],
+            "details": resultat["details"],
+            "recommandation": resultat["recommandation"],
+            "titre_poste": offre_json.get("titre", "Poste sans titre"),
+        }
+        for resultat, offre_json in zip(resultats, offres_json)
+    ], mode=mode)
+    for resultat, explication in zip(resultats, explications):
+        resultat["explications"] = explication
+
+
 # ============================================
 # MATCHING SIMPLE : 1 CV vs 1 OFFRE
 # ============================================
@@ -50,6 +129,11 @@ async def calculer_matching(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"CV {request.cv_id} introuvable"
             )
+        if not est_ingere(cv):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"CV {request.cv_id} pas encore analysé (ingestion : {cv.ingestion_statut})"
+            )
         
         # Récupérer l'offre depuis la base
         from app.models.offre_emploi import OffreEmploi
@@ -61,17 +145,24 @@ async def calculer_matching(
                 detail=f"Offre {request.offre_id} introuvable"
             )
         
-        # Exécuter le matching (embeddings calculés à la volée si non stockés en BDD)
-        cv_embedding = getattr(cv, "embedding", None)
-        offre_embedding = getattr(offre, "embedding", None)
-        resultat = executer_matching(
+        # Exécuter le matching (embeddings lus en BDD, calculés une seule fois si absents/périmés)
+        # dans le pool d'inférence : la boucle d'événements reste libre
+        offre_json = offre_json_de(offre)
+        cv_embedding = await _embedding_cv(db, cv)
+        offre_embedding = await _embedding_offre(db, offre)
+        resultat = await executer_inference(
+            executer_matching,
             cv_json=cv.json_structure or {},
-            offre_json=offre.json_structure or {"titre": offre.titre, "description": offre.description},
+            offre_json=offre_json,
             cv_embedding=cv_embedding,
             offre_embedding=offre_embedding,
-            generer_explications=request.generer_explications
+            generer_explications=False
         )
         
+        # Explications recruteur + candidat en parallèle (async, hors pool)
+        if request.generer_explications:
+            await _expliquer(resultat, offre_json, request.mode)
+        
         return MatchingResponse(**resultat)
     
     except HTTPException:
@@ -83,6 +174,78 @@ async def calculer_matching(
         )
 
 
+@router.post("/score/stream")
+async def calculer_matching_stream(
+    request: MatchingRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Variante streaming de /score (Server-Sent Events).
+    
+    Événements :
+    - `score` : score final, recommandation et détails (dès la fin du scoring)
+    - `partiel` : champs des explications recruteur/candidat au fil des tokens du LLM
+    - `final` : explications complètes (source llm, cache ou template)
+    """
+    from app.models.cv import CV
+    from app.models.offre_emploi import OffreEmploi
+    cv = db.query(CV).filter(CV.id == request.cv_id).first()
+    if not cv:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"CV {request.cv_id} introuvable"
+        )
+    if not est_ingere(cv):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"CV {request.cv_id} pas encore analysé (ingestion : {cv.ingestion_statut})"
+        )
+    offre = db.query(OffreEmploi).filter(OffreEmploi.id == request.offre_id).first()
+    if not offre:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Offre {request.offre_id} introuvable"
+        )
+    
+    offre_json = offre_json_de(offre)
+    cv_embedding = await _embedding_cv(db, cv)
+    offre_embedding = await _embedding_offre(db, offre)
+    resultat = await executer_inference(
+        executer_matching,
+        cv_json=cv.json_structure or {},
+        offre_json=offre_json,
+        cv_embedding=cv_embedding,
+        offre_embedding=offre_embedding,
+        generer_explications=False
+    )
+    
+    def _sse(evenement: str, donnees: dict) -> str:
+        return f"event: {evenement}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+    
+    async def evenements():
+        yield _sse("score", {
+            "score_final": resultat["score_final"],
+            "recommandation": resultat["recommandation"],
+            "details": resultat["details"],
+        })
+        if not request.generer_explications:
+            return
+        async for morceau in astream_explications(
+            resultat["score_final"],
+            resultat["details"],
+            resultat["recommandation"],
+            offre_json.get("titre", "Poste sans titre"),
+            mode=request.mode
+        ):
+            yield _sse(morceau.pop("type"), morceau)
+    
+    return StreamingResponse(
+        evenements(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ============================================
 # MATCHING AVANCÉ : 1 CV vs TOUTES LES OFFRES
 # ============================================
@@ -107,6 +270,11 @@ async def rechercher_meilleures_offres(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"CV {request.cv_id} introuvable"
             )
+        if not est_ingere(cv):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"CV {request.cv_id} pas encore analysé (ingestion : {cv.ingestion_statut})"
+            )
         
         # Récupérer toutes les offres actives
         from app.models.offre_emploi import OffreEmploi
@@ -119,25 +287,23 @@ async def rechercher_meilleures_offres(
                 total_results=0
             )
         
-        # Exécuter le matching pour chaque offre, puis trier et garder top_k
-        matches = []
-        for offre in offres:
-            resultat = executer_matching(
-                cv_json=cv.json_structure or {},
-                offre_json=offre.json_structure or {"titre": offre.titre, "description": offre.description},
-                cv_embedding=getattr(cv, "embedding", None),
-                offre_embedding=getattr(offre, "embedding", None),
-                generer_explications=request.generer_explications
-            )
-            matches.append(MatchingResponse(**resultat))
-        
-        matches.sort(key=lambda x: x.score_final, reverse=True)
-        top_matches = matches[: request.top_k]
+        # Classement vectorisé de toutes les offres, détails/explications pour le top_k seulement
+        offres_json = [offre_json_de(o) for o in offres]
+        resultats = await executer_inference(
+            classer_offres_pour_cv,
+            cv_json=cv.json_structure or {},
+            cv_embedding=await _embedding_cv(db, cv),
+            offres_json=offres_json,
+            offres_embeddings=await _embeddings(db, offres, texte_embedding_offre),
+            top_k=request.top_k
+        )
+        if request.generer_explications:
+            await _ajouter_explications(resultats, [offres_json[r["index"]] for r in resultats], request.mode)
         
         return MatchingListResponse(
             cv_id=request.cv_id,
-            matches=top_matches,
-            total_results=len(matches)
+            matches=[MatchingResponse(**r) for r in resultats],
+            total_results=len(offres)
         )
     
     except HTTPException:
@@ -158,11 +324,18 @@ async def rechercher_meilleurs_candidats(
     offre_id: str,
     top_k: int = 10,
     generer_explications: bool = True,
+    shortlist_size: Optional[int] = None,
+    mode: ModeExplication = Query("llm", description="Moteur d'explication : template, llm ou hybrid"),
     db: Session = Depends(get_db)
 ):
     """
     Trouve les meilleurs candidats pour une offre donnée.
     
+    Pipeline en 3 étapes :
+    1. Présélection vectorielle de `shortlist_size` CV dans Chroma
+    2. Rescoring exact (calculer_score_final) de la présélection
+    3. Explications IA pour le top_k final uniquement
+    
     Utile pour les recruteurs qui veulent voir les CV les plus pertinents.
     """
     try:
@@ -176,38 +349,58 @@ async def rechercher_meilleurs_candidats(
                 detail=f"Offre {offre_id} introuvable"
             )
         
-        # Récupérer tous les CV
+        offre_json = offre_json_de(offre)
+        offre_embedding = await _embedding_offre(db, offre)
+        taille_shortlist = max(shortlist_size or settings.MATCHING_SHORTLIST_SIZE, top_k)
+        
+        # Étape 1 : présélection vectorielle (repli sur tous les CV si Chroma indisponible/vide)
         from app.models.cv import CV
-        cvs = db.query(CV).all()
+        cv_ids = await executer_inference(_shortlist_cvs, offre_json, taille_shortlist, offre_embedding)
+        if cv_ids:
+            source = "chroma"
+            cvs = db.query(CV).filter(CV.id.in_(cv_ids), cv_ingere()).all()
+        else:
+            source = "base"
+            print("⚠️ Présélection Chroma vide ou indisponible : scan complet des CV (index à reconstruire ?)")
+            cvs = db.query(CV).filter(cv_ingere()).all()  # CV en cours d'ingestion ou en échec : pas de contenu
         
         if not cvs:
             return MatchingListResponse(
                 offre_id=offre_id,
                 matches=[],
-                total_results=0
+                total_results=0,
+                etapes=EtapesRecherche(
+                    source_shortlist=source,
+                    taille_shortlist=taille_shortlist,
+                    candidats_rescores=0,
+                    explications_generees=0
+                )
             )
         
-        # Exécuter le matching pour chaque CV
-        matches = []
-        
-        for cv in cvs:
-            resultat = executer_matching(
-                cv_json=cv.json_structure or {},
-                offre_json=offre.json_structure or {"titre": offre.titre, "description": offre.description},
-                cv_embedding=getattr(cv, "embedding", None),
-                offre_embedding=getattr(offre, "embedding", None),
-                generer_explications=generer_explications
-            )
-            
-            matches.append(MatchingResponse(**resultat))
+        # Étape 2 : rescoring exact de la présélection, top_k conservé
+        resultats = await executer_inference(
+            classer_cvs_pour_offre,
+            offre_json=offre_json,
+            offre_embedding=offre_embedding,
+            cvs_json=[cv.json_structure or {} for cv in cvs],
+            cvs_embeddings=await _embeddings(db, cvs, texte_embedding_cv),
+            top_k=top_k
+        )
         
-        # Trier par score décroissant
-        matches.sort(key=lambda x: x.score_final, reverse=True)
+        # Étape 3 : explications IA pour le top_k final
+        if generer_explications:
+            await _ajouter_explications(resultats, [offre_json] * len(resultats), mode)
         
         return MatchingListResponse(
             offre_id=offre_id,
-            matches=matches[:top_k],
-            total_results=len(matches)
+            matches=[MatchingResponse(**r) for r in resultats],
+            total_results=len(cvs),
+            etapes=EtapesRecherche(
+                source_shortlist=source,
+                taille_shortlist=taille_shortlist,
+                candidats_rescores=len(cvs),
+                explications_generees=len(resultats) if generer_explications else 0
+            )
         )
     
     except HTTPException:
@@ -252,7 +445,10 @@ async def match_candidate_to_offer(request: MatchCompatRequest):
         "niveau_etude": j.get("education", ""),
     }
     try:
-        resultat = executer_matching(cv_json, offre_json, cv_embedding=None, offre_embedding=None, generer_explications=True)
+        resultat = await executer_inference(
+            executer_matching, cv_json, offre_json, cv_embedding=None, offre_embedding=None, generer_explications=False
+        )
+        await _expliquer(resultat, offre_json)
         return MatchingResponse(**resultat)
     except Exception as e:
         raise HTTPException(
@@ -269,7 +465,8 @@ async def match_candidate_to_offer(request: MatchCompatRequest):
 async def tester_matching(
     cv_json: dict,
     offre_json: dict,
-    generer_explications: bool = True
+    generer_explications: bool = True,
+    mode: ModeExplication = Query("llm", description="Moteur d'explication : template, llm ou hybrid")
 ):
     """
     Endpoint de test pour le matching sans accès à la base de données.
@@ -277,11 +474,14 @@ async def tester_matching(
     Permet de tester le moteur de matching avec des données JSON directes.
     """
     try:
-        resultat = executer_matching(
+        resultat = await executer_inference(
+            executer_matching,
             cv_json=cv_json,
             offre_json=offre_json,
-            generer_explications=generer_explications
+            generer_explications=False
         )
+        if generer_explications:
+            await _expliquer(resultat, offre_json, mode)
         
         return MatchingResponse(**resultat)
     
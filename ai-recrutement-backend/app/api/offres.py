@@ -6,13 +6,14 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, get_current_user_optional, require_roles
 from app.models.user import User
 from app.models.offre_emploi import OffreEmploi
 from app.services.auth_service import get_recruteur_by_user_id
+from app.services.embedding_service import rafraichir_embedding_offre, vecteur_stocke
 from app.vector_store.indexing import index_offer, search_cvs_for_offer
 
 
@@ -41,6 +42,14 @@ class OffreUpdate(BaseModel):
     experience_requise: int | None = None
     statut: str | None = None
 
+    @field_validator("titre", "description", "statut")
+    @classmethod
+    def _non_null(cls, valeur):
+        # Colonnes NOT NULL : omettre le champ pour le laisser inchangé, null est refusé (422)
+        if valeur is None:
+            raise ValueError("ne peut pas être null")
+        return valeur
+
 
 class OffreResponse(BaseModel):
     id: str
@@ -169,14 +178,75 @@ def create_offre(
         statut="ouverte",
         json_structure=json_structure,
     )
+    try:
+        rafraichir_embedding_offre(offre)
+    except Exception:
+        pass  # embedding non bloquant (recalculé au premier matching)
     db.add(offre)
     db.commit()
     db.refresh(offre)
 
     try:
-        index_offer(offre_id, json_structure, metadata={"recruteur_id": recruteur.id, "titre": body.titre})
+        index_offer(
+            offre_id,
+            json_structure,
+            metadata={"recruteur_id": recruteur.id, "titre": body.titre},
+            embedding=vecteur_stocke(offre),
+        )
+    except Exception:
+        pass
+
+    return _offre_to_response(offre)
+
+
+# ---------- Mise à jour d'une offre (recruteur) ----------
+@router.patch("/{offre_id}", response_model=dict)
+def update_offre(
+    offre_id: str,
+    body: OffreUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("recruteur")),
+):
+    """Met à jour une offre (recruteur propriétaire). Embedding et index Chroma rafraîchis si le texte change."""
+    offre = db.query(OffreEmploi).filter(OffreEmploi.id == offre_id).first()
+    if not offre:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Offre introuvable")
+
+    recruteur = get_recruteur_by_user_id(db, current_user.id)
+    if not recruteur or offre.recruteur_id != recruteur.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès non autorisé")
+
+    champs = body.model_dump(exclude_unset=True)
+    if "statut" in champs and champs["statut"] not in ("ouverte", "fermee"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Statut invalide (ouverte | fermee)")
+    for champ, valeur in champs.items():
+        setattr(offre, champ, valeur)
+
+    # Garder json_structure aligné sur les colonnes éditées (source du matching)
+    json_structure = dict(offre.json_structure or {})
+    for champ in ("titre", "description", "localisation", "type_contrat"):
+        if champ in champs:
+            json_structure[champ] = champs[champ] or ""
+    offre.json_structure = json_structure
+
+    texte_modifie = False
+    try:
+        texte_modifie = rafraichir_embedding_offre(offre)
     except Exception:
         pass
+    db.commit()
+    db.refresh(offre)
+
+    if texte_modifie:
+        try:
+            index_offer(
+                offre.id,
+                json_structure,
+                metadata={"recruteur_id": recruteur.id, "titre": offre.titre},
+                embedding=vecteur_stocke(offre),
+            )
+        except Exception:
+            pass
 
     return _offre_to_response(offre)
 
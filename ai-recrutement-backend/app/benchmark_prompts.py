@@ -0,0 +1,109 @@
+"""
+Benchmark des variantes du prompt d'extraction de CV : complet vs compact.
+Mesure par CV : tokens prompt/complétion, latence, et complétude du JSON extrait
+(champs renseignés, et rappel des compétences / expériences / formations / langues
+par rapport à la variante complète).
+
+Lance avec : python app/benchmark_prompts.py cv1.pdf cv2.pdf cv3.txt [--budget 800]
+Hors ligne : LLM_PROVIDER=stub LLM_STUB_LATENCY_MS=300 python app/benchmark_prompts.py ...
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+# Ajouter le dossier parent au path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai import analyse_cv
+from app.ai.analyse_cv import extraire_cv_texte, extraire_texte_pdf
+from app.ai.registre_chaines import journal_appels
+
+
+CHAMPS_SIMPLES = ("nom", "email", "telephone")
+CHAMPS_LISTES = ("competences", "experiences", "formations", "langues")
+
+
+def lire_texte(chemin: str) -> str:
+    if chemin.lower().endswith(".pdf"):
+        with open(chemin, "rb") as f:
+            return extraire_texte_pdf(f.read())
+    with open(chemin, encoding="utf-8") as f:
+        return f.read()
+
+
+def completude(cv_json: Dict) -> float:
+    """Part des champs du schéma renseignés (0-1)."""
+    remplis = sum(1 for c in CHAMPS_SIMPLES if cv_json.get(c)) + sum(1 for c in CHAMPS_LISTES if cv_json.get(c))
+    return remplis / (len(CHAMPS_SIMPLES) + len(CHAMPS_LISTES))
+
+
+def rappel(reference: Dict, candidat: Dict) -> float:
+    """Nombre d'éléments extraits par la variante compacte / variante complète, par liste (plafonné à 1)."""
+    ratios = []
+    for champ in CHAMPS_LISTES:
+        n_ref = len(reference.get(champ) or [])
+        if n_ref:
+            ratios.append(min(1.0, len(candidat.get(champ) or []) / n_ref))
+    return statistics.mean(ratios) if ratios else 1.0
+
+
+def mesurer(texte: str, mode: str) -> Dict:
+    precedent = (journal_appels(1) or [None])[0]
+    debut = time.perf_counter()
+    # Cache d'extractions contourné : chaque mesure est un vrai appel LLM
+    cv_json = extraire_cv_texte(texte, mode=mode, utiliser_cache=False)
+    latence_ms = (time.perf_counter() - debut) * 1000
+    dernier = (journal_appels(1) or [None])[0]
+    appel = dernier if dernier is not None and dernier is not precedent else {}  # {} : aucun appel journalisé
+    return {
+        "json": cv_json,
+        "latence_ms": latence_ms,
+        "tokens_prompt": appel.get("tokens_prompt", 0),
+        "tokens_completion": appel.get("tokens_completion", 0),
+        "completude": completude(cv_json),
+    }
+
+
+def afficher(resultats: Dict[str, List[Dict]]) -> None:
+    print()
+    print(f"{'variante':<10} {'latence ms (méd.)':>18} {'tokens prompt':>14} {'tokens compl.':>14} {'complétude':>11} {'rappel':>7}")
+    for mode, mesures in resultats.items():
+        print(
+            f"{mode:<10} "
+            f"{statistics.median(m['latence_ms'] for m in mesures):>18.0f} "
+            f"{statistics.mean(m['tokens_prompt'] for m in mesures):>14.0f} "
+            f"{statistics.mean(m['tokens_completion'] for m in mesures):>14.0f} "
+            f"{statistics.mean(m['completude'] for m in mesures):>11.0%} "
+            f"{statistics.mean(m.get('rappel', 1.0) for m in mesures):>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prompt CV complet vs compact")
+    parser.add_argument("fichiers", nargs="+", help="CV au format PDF ou texte")
+    parser.add_argument("--budget", type=int, default=analyse_cv.CV_PROMPT_BUDGET_TOKENS, help="Budget de tokens du mode compact")
+    args = parser.parse_args()
+    analyse_cv.CV_PROMPT_BUDGET_TOKENS = args.budget
+
+    print("=" * 70)
+    print(f"🧪 BENCHMARK PROMPT CV - complet vs compact (budget {args.budget} tokens)")
+    print("=" * 70)
+
+    resultats: Dict[str, List[Dict]] = {"complet": [], "compact": []}
+    for chemin in args.fichiers:
+        texte = lire_texte(chemin)
+        complet = mesurer(texte, "complet")
+        compact = mesurer(texte, "compact")
+        compact["rappel"] = rappel(complet["json"], compact["json"])
+        resultats["complet"].append(complet)
+        resultats["compact"].append(compact)
+        print(
+            f"📄 {os.path.basename(chemin)} : {complet['tokens_prompt']} → {compact['tokens_prompt']} tokens prompt, "
+            f"{complet['latence_ms']:.0f} → {compact['latence_ms']:.0f} ms, rappel {compact['rappel']:.0%}"
+        )
+
+    afficher(resultats)
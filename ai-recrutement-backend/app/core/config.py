@@ -33,6 +33,28 @@ class Settings(BaseSettings):
     CHROMA_COLLECTION_CVS: str = Field(default="cvs")
     CHROMA_COLLECTION_OFFRES: str = Field(default="offres")
 
+    # --- DÉMARRAGE ---
+    # Charge le modèle d'embedding et LangChain en tâche de fond au démarrage (sinon : à la 1re requête)
+    WARMUP_AU_DEMARRAGE: bool = Field(default=True)
+
+    # --- POOL D'INFÉRENCE (embeddings / scoring / LLM hors boucle d'événements) ---
+    INFERENCE_WORKERS: int = Field(default=4)
+    INFERENCE_FILE_MAX: int = Field(default=64)
+
+    # --- MATCHING ---
+    # Taille de la présélection vectorielle (Chroma) avant rescoring exact
+    MATCHING_SHORTLIST_SIZE: int = Field(default=100)
+
+    # --- EXPLICATIONS DIFFÉRÉES (candidatures) ---
+    EXPLICATION_JOBS_WORKERS: int = Field(default=2)
+    # Bail d'un job réservé par un worker (s) : au-delà, un process qui démarre peut le reprendre
+    EXPLICATION_JOBS_BAIL_S: int = Field(default=900)
+
+    # --- INGESTION ASYNCHRONE DES CV (upload → texte → LLM → embedding → index) ---
+    INGESTION_CV_WORKERS: int = Field(default=2)
+    # Bail d'une ingestion réservée par un worker (s) : au-delà, un process qui démarre peut la reprendre
+    INGESTION_CV_BAIL_S: int = Field(default=1800)
+
 
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Pool d'inférence dédié (embeddings, scoring, appels LLM bloquants).
+Les endpoints async y délèguent le travail CPU/bloquant via `await executer_inference(...)`
+pour ne jamais geler la boucle d'événements uvicorn (/health, auth...).
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class FileInferencePleine(Exception):
+    """Levée quand la file d'attente du pool d'inférence est saturée."""
+
+
+class PoolInference:
+    """
+    ThreadPoolExecutor à file bornée + jauges (en attente / en cours).
+    Threads plutôt que processus : model.encode (torch) et les appels HTTP Groq libèrent le GIL.
+    """
+
+    def __init__(self, workers: int, file_max: int):
+        self.workers = workers
+        self.file_max = file_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._en_attente = 0
+        self._en_cours = 0
+        self._termines = 0
+        self._rejets = 0
+
+    def _executer(self, demarre: list, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if not demarre[0]:
+                demarre[0] = True
+                self._en_attente -= 1
+            self._en_cours += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._en_cours -= 1
+                self._termines += 1
+
+    async def executer(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self._en_attente >= self.file_max:
+                self._rejets += 1
+                raise FileInferencePleine(
+                    f"File d'inférence saturée ({self._en_attente} tâches en attente)"
+                )
+            self._en_attente += 1
+        demarre = [False]
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor, functools.partial(self._executer, demarre, fn, *args, **kwargs)
+            )
+        except (asyncio.CancelledError, RuntimeError):
+            # Requête annulée (client parti) ou pool arrêté avant le démarrage de la tâche
+            with self._lock:
+                if not demarre[0]:
+                    demarre[0] = True
+                    self._en_attente -= 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "file_max": self.file_max,
+                "en_attente": self._en_attente,
+                "en_cours": self._en_cours,
+                "termines": self._termines,
+                "rejets": self._rejets,
+            }
+
+    def arreter(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[PoolInference] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PoolInference:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolInference(settings.INFERENCE_WORKERS, settings.INFERENCE_FILE_MAX)
+    return _pool
+
+
+async def executer_inference(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Exécute `fn` dans le pool d'inférence et attend son résultat.
+    Lève une HTTPException 503 si la file est saturée.
+    """
+    try:
+        return await get_pool().executer(fn, *args, **kwargs)
+    except FileInferencePleine as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+def stats_inference() -> Dict[str, int]:
+    return get_pool().stats()
+
+
+def arreter_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.arreter()
+            _pool = None
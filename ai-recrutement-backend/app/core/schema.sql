@@ -157,11 +157,49 @@ CREATE TRIGGER trg_validate_email
 BEFORE INSERT OR UPDATE ON utilisateurs
 FOR EACH ROW
 EXECUTE FUNCTION validate_email();
--- Ajouter json_structure à cvs (si pas déjà fait)
+-- Ajouter embedding à cvs (si pas déjà fait)
+-- Dimension libre : elle dépend du modèle SentenceTransformer (384 pour all-MiniLM-L6-v2)
+CREATE EXTENSION IF NOT EXISTS vector;
+
 ALTER TABLE cvs 
-ADD COLUMN IF NOT EXISTS embedding vector(1536);
+ADD COLUMN IF NOT EXISTS embedding vector,
+ADD COLUMN IF NOT EXISTS embedding_modele VARCHAR(100),
+ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(64);
 
 -- Ajouter json_structure et embedding à offres_emploi
 ALTER TABLE offres_emploi 
 ADD COLUMN IF NOT EXISTS json_structure JSONB,
-ADD COLUMN IF NOT EXISTS embedding vector(1536);
\ No newline at end of file
+ADD COLUMN IF NOT EXISTS embedding vector,
+ADD COLUMN IF NOT EXISTS embedding_modele VARCHAR(100),
+ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(64);
+
+-- Bases créées avec vector(1536) : lever la contrainte de dimension
+ALTER TABLE cvs ALTER COLUMN embedding TYPE vector;
+ALTER TABLE offres_emploi ALTER COLUMN embedding TYPE vector;
+
+-- Statut de génération différée de l'explication IA des candidatures
+ALTER TABLE candidatures
+ADD COLUMN IF NOT EXISTS explication_statut VARCHAR(20);
+
+-- Ingestion asynchrone des CV : chemin du PDF stocké et statut par étape
+ALTER TABLE cvs
+ADD COLUMN IF NOT EXISTS fichier_chemin VARCHAR(500),
+ADD COLUMN IF NOT EXISTS ingestion_statut VARCHAR(20),
+ADD COLUMN IF NOT EXISTS ingestion_etapes JSONB;
+
+-- Déduplication des CV : empreinte SHA-256 du PDF
+ALTER TABLE cvs
+ADD COLUMN IF NOT EXISTS fichier_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS idx_cvs_fichier_hash ON cvs(fichier_hash);
+
+-- Réservation atomique des jobs d'explication (bail : un seul worker par candidature)
+ALTER TABLE candidatures
+ADD COLUMN IF NOT EXISTS explication_reserve_a TIMESTAMP;
+
+-- Réservation atomique des ingestions de CV (bail : un seul worker par CV)
+ALTER TABLE cvs
+ADD COLUMN IF NOT EXISTS ingestion_reserve_a TIMESTAMP;
+
+-- CV utilisé pour chaque candidature (reprise des explications sur le bon CV)
+ALTER TABLE candidatures
+ADD COLUMN IF NOT EXISTS cv_id UUID REFERENCES cvs(id) ON DELETE SET NULL;
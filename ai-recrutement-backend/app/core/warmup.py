@@ -0,0 +1,81 @@
+"""
+Warm-up des ressources IA et mesures de démarrage.
+- /health répond dès que le process écoute (liveness)
+- /ready ne répond 200 qu'une fois le modèle d'embedding et LangChain chargés (readiness)
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+# Horodatage de l'import du module (≈ début du démarrage du worker)
+_debut_process = time.perf_counter()
+
+_etat: Dict = {
+    "demarrage_s": None,            # import → application prête à servir (/health)
+    "warmup_en_cours": False,
+    "warmup_termine": False,
+    "warmup_s": None,
+    "warmup_erreur": None,
+    "premieres_requetes": {},       # chemin → {"duree_ms", "apres_demarrage_s"}
+}
+_MAX_CHEMINS = 50
+_tache: Optional[asyncio.Task] = None
+
+
+def marquer_demarrage() -> None:
+    """À appeler quand l'application commence à servir."""
+    _etat["demarrage_s"] = round(time.perf_counter() - _debut_process, 3)
+
+
+def enregistrer_requete(chemin: str, duree_ms: float) -> None:
+    """Mémorise la latence de la première requête servie sur chaque chemin."""
+    premieres = _etat["premieres_requetes"]
+    if chemin not in premieres and len(premieres) < _MAX_CHEMINS:
+        premieres[chemin] = {
+            "duree_ms": round(duree_ms, 1),
+            "apres_demarrage_s": round(time.perf_counter() - _debut_process, 3),
+        }
+
+
+def _warmup_sync() -> None:
+    """Charge le modèle d'embedding (1 encodage à blanc), LangChain et le client du fournisseur LLM configuré."""
+    from app.ai.embeddings import prechauffer_modele
+    prechauffer_modele()
+
+    import langchain_core.prompts  # noqa: F401
+    import langchain_core.output_parsers  # noqa: F401
+    from app.ai.fournisseurs_llm import importer_fournisseur
+    importer_fournisseur()
+
+
+async def _warmup() -> None:
+    _etat["warmup_en_cours"] = True
+    debut = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warmup_sync)
+        _etat["warmup_termine"] = True
+    except Exception as e:
+        _etat["warmup_erreur"] = str(e)
+        print(f"⚠️ Warm-up IA échoué : {e}")
+    finally:
+        _etat["warmup_en_cours"] = False
+        _etat["warmup_s"] = round(time.perf_counter() - debut, 3)
+
+
+def lancer_warmup() -> None:
+    """Démarre le warm-up en tâche de fond (n'empêche pas /health de répondre)."""
+    global _tache
+    if _tache is None:
+        _tache = asyncio.get_running_loop().create_task(_warmup())
+
+
+def etat_readiness() -> Dict:
+    """Prêt si le modèle d'embedding est chargé (par le warm-up ou une première requête)."""
+    from app.ai.embeddings import etat_modele
+
+    modele = etat_modele()
+    return {
+        "pret": bool(modele["charge"]),
+        "modele_embedding": modele,
+        **_etat,
+    }
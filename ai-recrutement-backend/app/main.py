@@ -1,5 +1,12 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+# Importé en premier : son horodatage sert de référence au temps de démarrage
+from app.core.warmup import lancer_warmup, marquer_demarrage, enregistrer_requete, etat_readiness
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.utils.logger import setup_logging
@@ -11,18 +18,67 @@ from app.api.candidats import router as candidats_router
 from app.api.candidatures import router as candidatures_router
 from app.api.matching import router as matching_router
 from app.api.dashboard_api import router as dashboard_router
+from app.vector_store.chroma_client import ouvrir_client, fermer_client, stats_chroma
+from app.ai.embeddings import stats_cache_embeddings, stats_micro_batching
+from app.core.inference import stats_inference, arreter_pool
+from app.ai.extraction_pdf import stats_extraction_pdf, arreter_pool_pdf
+from app.ai.registre_chaines import stats_chaines, fermer_clients_llm
+from app.ai.cache_explications import stats_cache_explications
+from app.ai.cache_extractions import stats_cache_extractions
+from app.ai.passerelle_llm import stats_passerelle
+from app.ai.fournisseurs_llm import infos_fournisseur
+from app.services.upload_cv import LimiteTailleUpload
+from app.services.explication_jobs import demarrer_workers, arreter_workers, reprendre_jobs_en_suspens, stats_jobs
+from app.services.ingestion_cv import (
+    arreter_workers_ingestion,
+    demarrer_workers_ingestion,
+    reprendre_ingestions_en_suspens,
+    stats_ingestion,
+)
 # -------------------------------------------------
 # Setup logging
 # -------------------------------------------------
 setup_logging()
 
+# -------------------------------------------------
+# Lifespan : ressources partagées du process
+# -------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        ouvrir_client()  # client Chroma ouvert une seule fois par worker
+    except Exception as e:
+        print(f"⚠️ Chroma indisponible au démarrage : {e}")
+    demarrer_workers()  # explications différées des candidatures
+    try:
+        reprendre_jobs_en_suspens()
+    except Exception as e:
+        print(f"⚠️ Reprise des explications en suspens impossible : {e}")
+    demarrer_workers_ingestion()  # ingestion asynchrone des CV uploadés
+    try:
+        reprendre_ingestions_en_suspens()
+    except Exception as e:
+        print(f"⚠️ Reprise des ingestions de CV en suspens impossible : {e}")
+    if settings.WARMUP_AU_DEMARRAGE:
+        lancer_warmup()  # modèle + LangChain chargés en tâche de fond, /health répond déjà
+    marquer_demarrage()
+    yield
+    arreter_workers_ingestion()
+    arreter_workers()
+    arreter_pool()
+    arreter_pool_pdf()
+    await fermer_clients_llm()
+    fermer_client()
+
+
 # -------------------------------------------------
 # Create FastAPI app
 # -------------------------------------------------
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
-    description="AI-powered recruitment platform API"
+    description="AI-powered recruitment platform API",
+    lifespan=lifespan,
 )
 
 # -------------------------------------------------
@@ -36,6 +92,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -------------------------------------------------
+# Taille max des uploads de CV, vérifiée avant le parsing multipart
+# -------------------------------------------------
+app.add_middleware(LimiteTailleUpload, chemins=["/cvs/upload"])
+
+# -------------------------------------------------
+# Mesure de la latence de la première requête (par chemin)
+# -------------------------------------------------
+@app.middleware("http")
+async def mesurer_premiere_requete(request: Request, call_next):
+    debut = time.perf_counter()
+    response = await call_next(request)
+    enregistrer_requete(request.url.path, (time.perf_counter() - debut) * 1000)
+    return response
+
 # -------------------------------------------------
 # Root route (pour éviter le 404 sur /)
 # -------------------------------------------------
@@ -51,6 +122,48 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/ready", tags=["Health"])
+def ready():
+    """Readiness : 503 tant que le modèle d'embedding n'est pas chargé."""
+    etat = etat_readiness()
+    return JSONResponse(status_code=200 if etat["pret"] else 503, content=etat)
+
+
+@app.get("/health/vector-store", tags=["Health"])
+def health_vector_store():
+    return stats_chroma()
+
+
+@app.get("/health/embeddings", tags=["Health"])
+def health_embeddings():
+    return {
+        "cache": stats_cache_embeddings(),
+        "micro_batching": stats_micro_batching(),
+    }
+
+
+@app.get("/health/inference", tags=["Health"])
+def health_inference():
+    return {**stats_inference(), "extraction_pdf": stats_extraction_pdf()}
+
+
+@app.get("/health/ingestion", tags=["Health"])
+def health_ingestion():
+    return stats_ingestion()
+
+
+@app.get("/health/llm", tags=["Health"])
+def health_llm():
+    return {
+        **infos_fournisseur(),
+        **stats_chaines(),
+        "cache_explications": stats_cache_explications(),
+        "cache_extractions": stats_cache_extractions(),
+        "jobs_candidatures": stats_jobs(),
+        "passerelle": stats_passerelle(),
+    }
+
+
 # -------------------------------------------------
 # API Routers
 # -------------------------------------------------
@@ -12,7 +12,13 @@ class Candidature(Base):
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     candidat_id: Mapped[str] = mapped_column(String(36), ForeignKey("candidats.id", ondelete="CASCADE"), nullable=False)
     offre_id: Mapped[str] = mapped_column(String(36), ForeignKey("offres_emploi.id", ondelete="CASCADE"), nullable=False)
+    # CV utilisé pour postuler (reprise des jobs d'explication sur le même CV)
+    cv_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("cvs.id", ondelete="SET NULL"), nullable=True)
     statut: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
     score_matching: Mapped[float | None] = mapped_column(Numeric(5, 2), nullable=True)
     explication: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Génération différée de l'explication : en_attente, en_cours, pret, echec
+    explication_statut: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # Réservation du job par un worker (bail : EXPLICATION_JOBS_BAIL_S)
+    explication_reserve_a: Mapped[object | None] = mapped_column(DateTime(timezone=True), nullable=True)
     date_candidature: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
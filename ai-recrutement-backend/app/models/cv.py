@@ -1,6 +1,7 @@
 from sqlalchemy import String, DateTime, ForeignKey, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
+from pgvector.sqlalchemy import Vector
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -16,3 +17,16 @@ class CV(Base):
     texte_brut: Mapped[str | None] = mapped_column(Text, nullable=True)
     json_structure: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     date_upload: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Embedding persisté + tampon (modèle, hash du texte) pour éviter de ré-encoder
+    embedding: Mapped[list[float] | None] = mapped_column(Vector(), nullable=True)
+    embedding_modele: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    embedding_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Ingestion asynchrone : PDF stocké, statut global (en_attente, en_cours, pret, echec)
+    # et statut par étape {etape: {statut, duree_ms, erreur}}
+    fichier_chemin: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # SHA-256 du PDF : stockage adressé par contenu et réutilisation des extractions d'un doublon
+    fichier_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    ingestion_statut: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    ingestion_etapes: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Réservation de l'ingestion par un worker, renouvelée à chaque étape (bail : INGESTION_CV_BAIL_S)
+    ingestion_reserve_a: Mapped[object | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,7 @@
 from sqlalchemy import String, DateTime, ForeignKey, Text, Numeric, Integer
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
+from pgvector.sqlalchemy import Vector
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -28,3 +29,7 @@ class OffreEmploi(Base):
     date_publication: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     statut: Mapped[str] = mapped_column(String(20), nullable=False, default="ouverte")
     json_structure: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Embedding persisté + tampon (modèle, hash du texte) pour éviter de ré-encoder
+    embedding: Mapped[list[float] | None] = mapped_column(Vector(), nullable=True)
+    embedding_modele: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    embedding_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
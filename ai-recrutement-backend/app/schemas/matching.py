@@ -3,7 +3,7 @@
 Schémas Pydantic pour les réponses de matching
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
@@ -89,18 +89,33 @@ class MatchingResponse(BaseModel):
     )
 
 
+class EtapesRecherche(BaseModel):
+    """Tailles de chaque étape du pipeline de recherche"""
+    source_shortlist: str = Field(description="chroma (présélection vectorielle) ou base (tous les documents)")
+    taille_shortlist: int = Field(description="Taille de présélection demandée (M)")
+    candidats_rescores: int = Field(description="Documents rescorés avec calculer_score_final")
+    explications_generees: int = Field(description="Résultats ayant reçu une explication IA")
+
+
 class MatchingListResponse(BaseModel):
     """Réponse pour une liste de matchings"""
     cv_id: Optional[str] = None
     offre_id: Optional[str] = None
     matches: List[MatchingResponse]
     total_results: int
+    etapes: Optional[EtapesRecherche] = Field(
+        default=None,
+        description="Tailles des étapes présélection / rescoring / explications"
+    )
 
 
 # ============================================
 # REQUÊTES
 # ============================================
 
+# template : règles sur les détails (sans LLM) | llm : LangChain + Groq | hybrid : LLM avec repli template
+ModeExplication = Literal["template", "llm", "hybrid"]
+
 class MatchingRequest(BaseModel):
     """Requête pour exécuter un matching"""
     cv_id: str = Field(description="ID du CV")
@@ -109,6 +124,10 @@ class MatchingRequest(BaseModel):
         default=True,
         description="Générer les explications IA"
     )
+    mode: ModeExplication = Field(
+        default="llm",
+        description="Moteur d'explication : template, llm ou hybrid"
+    )
 
 
 class SearchMatchingRequest(BaseModel):
@@ -119,3 +138,7 @@ class SearchMatchingRequest(BaseModel):
         default=True,
         description="Générer les explications IA"
     )
+    mode: ModeExplication = Field(
+        default="llm",
+        description="Moteur d'explication : template, llm ou hybrid"
+    )
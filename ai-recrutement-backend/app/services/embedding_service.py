@@ -0,0 +1,91 @@
+"""
+Embeddings persistés des CV et offres (colonnes embedding / embedding_modele / embedding_hash).
+Le vecteur n'est recalculé que si le texte ou le modèle a changé depuis le dernier calcul.
+"""
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.models.cv import CV
+from app.models.offre_emploi import OffreEmploi
+from app.ai.embeddings import MODEL_NAME, embed_text, hash_texte
+from app.ai.moteur_matching import preparer_texte_cv, preparer_texte_offre
+
+
+def offre_json_de(offre: OffreEmploi) -> dict:
+    """JSON utilisé pour le matching d'une offre (fallback titre/description)."""
+    return offre.json_structure or {"titre": offre.titre, "description": offre.description}
+
+
+def texte_embedding_cv(cv: CV) -> str | None:
+    """Texte embeddé d'un CV (None sans JSON : ingestion en cours ou en échec)."""
+    if cv.json_structure is None:
+        return None
+    return preparer_texte_cv(cv.json_structure)
+
+
+def texte_embedding_offre(offre: OffreEmploi) -> str:
+    """Texte embeddé d'une offre."""
+    return preparer_texte_offre(offre_json_de(offre))
+
+
+def embedding_perime(doc, texte: str | None) -> bool:
+    """True si l'embedding de `doc` est absent ou calculé sur un autre texte/modèle (texte vide : jamais)."""
+    if not texte or not texte.strip():
+        return False
+    return not (
+        doc.embedding is not None
+        and doc.embedding_modele == MODEL_NAME
+        and doc.embedding_hash == hash_texte(texte)
+    )
+
+
+def appliquer_embedding(doc, texte: str, vecteur: List[float]) -> None:
+    """Stocke le vecteur calculé pour `texte` et son tampon (modèle + hash), sans commit."""
+    doc.embedding = vecteur
+    doc.embedding_modele = MODEL_NAME
+    doc.embedding_hash = hash_texte(texte)
+
+
+def _rafraichir(doc, texte: str | None) -> bool:
+    """Met à jour l'embedding de `doc` si son tampon est périmé. Retourne True si recalculé."""
+    if not embedding_perime(doc, texte):
+        return False
+    appliquer_embedding(doc, texte, embed_text(texte))
+    return True
+
+
+def rafraichir_embedding_cv(cv: CV) -> bool:
+    """Calcule l'embedding du CV si absent ou périmé (sans commit)."""
+    return _rafraichir(cv, texte_embedding_cv(cv))
+
+
+def rafraichir_embedding_offre(offre: OffreEmploi) -> bool:
+    """Calcule l'embedding de l'offre si absent ou périmé (sans commit)."""
+    return _rafraichir(offre, texte_embedding_offre(offre))
+
+
+def vecteur_stocke(doc) -> List[float] | None:
+    """Embedding stocké d'un CV/offre sous forme de liste (None si absent)."""
+    if doc.embedding is None:
+        return None
+    return [float(x) for x in doc.embedding]
+
+
+def obtenir_embedding_cv(db: Session, cv: CV) -> List[float] | None:
+    """
+    Retourne l'embedding stocké du CV, en le (re)calculant et le persistant si nécessaire.
+    None pour un CV sans JSON (ingestion en cours ou en échec) : pas d'embedding d'un texte vide.
+    """
+    if cv.json_structure is None:
+        return None
+    if rafraichir_embedding_cv(cv):
+        db.commit()
+    return vecteur_stocke(cv)
+
+
+def obtenir_embedding_offre(db: Session, offre: OffreEmploi) -> List[float] | None:
+    """Retourne l'embedding stocké de l'offre, en le (re)calculant et le persistant si nécessaire."""
+    if rafraichir_embedding_offre(offre):
+        db.commit()
+    return vecteur_stocke(offre)
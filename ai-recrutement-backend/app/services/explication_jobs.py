@@ -0,0 +1,239 @@
+"""
+Jobs d'explication différés pour les candidatures.
+POST /candidatures renvoie le score tout de suite ; les explications IA (2 appels LLM)
+sont générées par des workers locaux puis persistées dans Candidature.explication.
+
+Statuts (Candidature.explication_statut) : en_attente → en_cours → pret | echec
+Plusieurs process (workers uvicorn) partagent la base : un job est réservé par un UPDATE
+conditionnel (en_attente, ou en_cours dont le bail a expiré) avant d'être exécuté,
+un seul worker fait donc les appels LLM d'une candidature.
+"""
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+EN_ATTENTE = "en_attente"
+EN_COURS = "en_cours"
+PRET = "pret"
+ECHEC = "echec"
+STATUTS_TERMINAUX = (PRET, ECHEC)
+
+_file: "queue.Queue[Optional[tuple]]" = queue.Queue()
+_workers: list = []
+_lock = threading.Lock()
+_stats = {"soumis": 0, "termines": 0, "echecs": 0}
+
+
+def formater_explication(explications: Dict) -> Optional[str]:
+    """Texte stocké dans Candidature.explication à partir des explications recruteur/candidat."""
+    if not explications:
+        return None
+    rec = explications.get("pour_recruteur") or {}
+    cand = explications.get("pour_candidat") or {}
+    return f"Recruteur: {rec.get('synthese', '')} | Candidat: {cand.get('message_principal', '')}"
+
+
+# ============================================
+# RÉSERVATION (partagée entre process via la base)
+# ============================================
+
+def _bail_expire():
+    """Condition SQL : job en_cours dont le worker n'a pas renouvelé le bail (process arrêté)."""
+    from sqlalchemy import and_, func, or_
+    from app.models.candidature import Candidature
+
+    limite = func.now() - timedelta(seconds=settings.EXPLICATION_JOBS_BAIL_S)
+    return and_(
+        Candidature.explication_statut == EN_COURS,
+        or_(Candidature.explication_reserve_a.is_(None), Candidature.explication_reserve_a < limite),
+    )
+
+
+def _reserver(db, candidature_id: str, jeton: Optional[datetime] = None) -> bool:
+    """
+    Réserve atomiquement le job d'une candidature pour ce worker (et renouvelle le bail).
+
+    Args:
+        jeton: Horodatage de réservation rendu par reprendre_jobs_en_suspens (job déjà réservé
+            par ce process) ; None pour un job soumis en_attente
+
+    Returns:
+        bool: False si un autre worker détient le job ou s'il est terminé
+    """
+    from sqlalchemy import func, or_, update
+    from app.models.candidature import Candidature
+
+    if jeton is None:
+        condition = or_(Candidature.explication_statut == EN_ATTENTE, _bail_expire())
+    else:
+        condition = (Candidature.explication_statut == EN_COURS) & (Candidature.explication_reserve_a == jeton)
+    resultat = db.execute(
+        update(Candidature)
+        .where(Candidature.id == candidature_id, condition)
+        .values(explication_statut=EN_COURS, explication_reserve_a=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return resultat.rowcount == 1
+
+
+# ============================================
+# EXÉCUTION D'UN JOB
+# ============================================
+
+def _scoring_depuis_bdd(db, candidature) -> Optional[Dict]:
+    """
+    Recalcule score/détails d'une candidature (reprise d'un job après redémarrage),
+    avec le CV utilisé pour postuler. None si ce CV ou l'offre n'existe plus.
+    """
+    from app.models.cv import CV
+    from app.services.ingestion_cv import cv_ingere
+    from app.models.offre_emploi import OffreEmploi
+    from app.ai.moteur_matching import executer_matching
+    from app.services.embedding_service import obtenir_embedding_cv, obtenir_embedding_offre, offre_json_de
+
+    if candidature.cv_id is None:
+        return None  # candidature antérieure au suivi du CV : pas de CV sûr pour l'expliquer
+    offre = db.query(OffreEmploi).filter(OffreEmploi.id == candidature.offre_id).first()
+    cv = db.query(CV).filter(CV.id == candidature.cv_id, cv_ingere()).first()
+    if not offre or not cv:
+        return None
+    offre_json = offre_json_de(offre)
+    resultat = executer_matching(
+        cv.json_structure or {},
+        offre_json,
+        cv_embedding=obtenir_embedding_cv(db, cv),
+        offre_embedding=obtenir_embedding_offre(db, offre),
+        generer_explications=False,
+    )
+    resultat["titre_poste"] = offre_json.get("titre", "Poste sans titre")
+    return resultat
+
+
+def _executer_job(candidature_id: str, scoring: Optional[Dict], jeton: Optional[datetime] = None) -> None:
+    from app.core.database import SessionLocal
+    from app.models.candidature import Candidature
+    from app.ai.agent_explication import generer_explications_completes
+
+    db = SessionLocal()
+    try:
+        if not _reserver(db, candidature_id, jeton):
+            return  # job pris par un autre worker, terminé ou candidature supprimée
+        candidature = db.query(Candidature).filter(Candidature.id == candidature_id).first()
+        if not candidature:
+            return
+
+        try:
+            if scoring is None:
+                scoring = _scoring_depuis_bdd(db, candidature)
+            if scoring is None:
+                raise ValueError("CV ou offre introuvable")
+            explications = generer_explications_completes(
+                scoring["score_final"],
+                scoring["details"],
+                scoring["recommandation"],
+                scoring["titre_poste"],
+            )
+            candidature.explication = formater_explication(explications)
+            candidature.explication_statut = PRET
+            candidature.explication_reserve_a = None
+            with _lock:
+                _stats["termines"] += 1
+            print(f"✅ Explication de la candidature {candidature_id} prête")
+        except Exception as e:
+            db.rollback()
+            candidature.explication_statut = ECHEC
+            candidature.explication_reserve_a = None
+            with _lock:
+                _stats["echecs"] += 1
+            print(f"❌ Explication de la candidature {candidature_id} en échec : {e}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def _boucle() -> None:
+    while True:
+        job = _file.get()
+        if job is None:  # signal d'arrêt
+            break
+        try:
+            _executer_job(*job)
+        except Exception as e:
+            print(f"❌ Worker explications : {e}")
+
+
+# ============================================
+# API DU SERVICE
+# ============================================
+
+def soumettre_explication(candidature_id: str, scoring: Optional[Dict] = None) -> None:
+    """
+    Met en file la génération des explications d'une candidature.
+
+    Args:
+        candidature_id: ID de la candidature (déjà commitée avec explication_statut=en_attente)
+        scoring: score_final, details, recommandation, titre_poste (recalculés depuis la BDD si absent)
+    """
+    with _lock:
+        _stats["soumis"] += 1
+    _file.put((candidature_id, scoring, None))
+
+
+def reprendre_jobs_en_suspens() -> int:
+    """
+    Réserve puis remet en file les candidatures en_attente et celles restées en_cours au-delà
+    du bail (process arrêté avant la fin). Les jobs en cours dans un autre worker vivant
+    ne sont pas repris.
+    """
+    from sqlalchemy import func, or_, update
+    from app.core.database import SessionLocal
+    from app.models.candidature import Candidature
+
+    db = SessionLocal()
+    try:
+        reserves: List[Tuple[str, datetime]] = db.execute(
+            update(Candidature)
+            .where(or_(Candidature.explication_statut == EN_ATTENTE, _bail_expire()))
+            .values(explication_statut=EN_COURS, explication_reserve_a=func.now())
+            .returning(Candidature.id, Candidature.explication_reserve_a)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+    finally:
+        db.close()
+    with _lock:
+        _stats["soumis"] += len(reserves)
+    for c_id, jeton in reserves:
+        _file.put((str(c_id), None, jeton))
+    if reserves:
+        print(f"↩️  {len(reserves)} explication(s) de candidature remise(s) en file")
+    return len(reserves)
+
+
+def demarrer_workers() -> None:
+    """Démarre les workers d'explication (au démarrage de l'application)."""
+    with _lock:
+        if _workers:
+            return
+        for i in range(max(1, settings.EXPLICATION_JOBS_WORKERS)):
+            t = threading.Thread(target=_boucle, name=f"explication-job-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def arreter_workers() -> None:
+    """Signale l'arrêt aux workers (les jobs restants seront repris au prochain démarrage)."""
+    with _lock:
+        for _ in _workers:
+            _file.put(None)
+        _workers.clear()
+
+
+def stats_jobs() -> Dict:
+    with _lock:
+        return {**_stats, "en_file": _file.qsize(), "workers": len(_workers)}
@@ -0,0 +1,425 @@
+"""
+Pipeline d'ingestion asynchrone des CV.
+POST /cvs/upload stocke le PDF, crée la ligne CV et rend la main ; les étapes suivantes
+sont exécutées par des workers locaux, chacune persistée dans CV.ingestion_etapes :
+
+    stockage → extraction (texte PDF) → structuration (LLM) → embedding → indexation (Chroma)
+
+Statuts (CV.ingestion_statut et par étape) : en_attente → en_cours → pret | echec
+Une étape en échec peut être relancée seule : les étapes déjà prêtes ne sont pas rejouées.
+Plusieurs process partagent la base : un CV est réservé par un UPDATE conditionnel
+(en_attente/echec, ou en_cours dont le bail a expiré) avant d'être traité.
+
+Déduplication : si un CV au PDF identique (même SHA-256, quel que soit le candidat) est déjà
+ingéré, son texte, son JSON et son embedding sont repris : ni extraction ni appel LLM.
+"""
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+EN_ATTENTE = "en_attente"
+EN_COURS = "en_cours"
+PRET = "pret"
+ECHEC = "echec"
+
+ETAPES: List[str] = ["stockage", "extraction", "structuration", "embedding", "indexation"]
+
+_file: "queue.Queue[Optional[Tuple[str, Optional[datetime]]]]" = queue.Queue()
+_workers: list = []
+_en_file: set = set()  # CV déjà en file (pas de double traitement)
+_lock = threading.Lock()
+_stats = {"soumis": 0, "termines": 0, "echecs": 0}
+_durees: Dict[str, List[float]] = {e: [0, 0.0] for e in ETAPES}  # étape -> [exécutions réussies, durée totale ms]
+_dedup = {"uploads": 0, "pdf_deja_stockes": 0, "extractions_reutilisees": 0}
+
+
+def etapes_initiales(fichier_stocke: bool) -> Dict[str, Dict]:
+    """Statut initial des étapes d'un CV qui vient d'être uploadé."""
+    etapes = {e: {"statut": EN_ATTENTE} for e in ETAPES}
+    if fichier_stocke:
+        etapes["stockage"] = {"statut": PRET}
+    return etapes
+
+
+def etat_ingestion(cv) -> Dict:
+    """Statut global + détail par étape d'un CV (GET /cvs/{id}/ingestion)."""
+    etapes = cv.ingestion_etapes or {}
+    return {
+        "cv_id": cv.id,
+        "statut": cv.ingestion_statut or PRET,  # CV antérieurs au pipeline : ingérés en synchrone
+        "etape_courante": next((e for e in ETAPES if (etapes.get(e) or {}).get("statut") != PRET), None),
+        "etapes": etapes,
+    }
+
+
+def cv_ingere():
+    """Condition SQL : CV exploitable pour le matching (ingéré, ou antérieur au pipeline)."""
+    from app.models.cv import CV
+    return (CV.ingestion_statut == PRET) | CV.ingestion_statut.is_(None)
+
+
+def est_ingere(cv) -> bool:
+    """True si le texte et le JSON du CV sont disponibles (pas en file, en cours ou en échec)."""
+    return cv.ingestion_statut in (PRET, None)
+
+
+# ============================================
+# ÉTAPES
+# ============================================
+
+def _doublon_ingere(db, cv):
+    """Autre CV au PDF identique dont le texte et le JSON sont déjà extraits (None sinon)."""
+    from app.models.cv import CV
+    if not cv.fichier_hash:
+        return None
+    return (
+        db.query(CV)
+        .filter(
+            CV.fichier_hash == cv.fichier_hash,
+            CV.id != cv.id,
+            CV.texte_brut.isnot(None),
+            CV.json_structure.isnot(None),
+            cv_ingere(),
+        )
+        .order_by(CV.date_upload.desc())
+        .first()
+    )
+
+
+def _reutiliser_doublon(db, cv) -> bool:
+    """
+    Reprend texte, JSON et embedding d'un doublon déjà ingéré (étapes extraction,
+    structuration et embedding marquées prêtes). Ne commit pas.
+    """
+    source = _doublon_ingere(db, cv)
+    if source is None:
+        return False
+    cv.texte_brut = source.texte_brut
+    cv.json_structure = source.json_structure
+    cv.embedding = source.embedding
+    cv.embedding_modele = source.embedding_modele
+    cv.embedding_hash = source.embedding_hash
+    etapes = dict(cv.ingestion_etapes or etapes_initiales(fichier_stocke=True))
+    for etape in ("extraction", "structuration", "embedding"):
+        etapes[etape] = {"statut": PRET, "duree_ms": 0.0, "source": str(source.id)}
+    cv.ingestion_etapes = etapes
+    with _lock:
+        _dedup["extractions_reutilisees"] += 1
+    print(f"♻️  CV {cv.id} : PDF identique au CV {source.id}, extraction et LLM évités")
+    return True
+
+
+def _extraction(db, cv) -> None:
+    from app.ai.analyse_cv import extraire_texte_pdf
+    if _reutiliser_doublon(db, cv):  # doublon ingéré entre-temps (uploads simultanés)
+        return
+    if not cv.fichier_chemin:
+        raise ValueError("PDF du CV introuvable")
+    cv.texte_brut = extraire_texte_pdf(cv.fichier_chemin)
+
+
+def _structuration(db, cv) -> None:
+    from app.ai.analyse_cv import extraire_cv_texte
+    if not cv.texte_brut:
+        raise ValueError("Texte du CV absent : relancer l'extraction")
+    cv.json_structure = extraire_cv_texte(cv.texte_brut, avec_fallback=False)
+
+
+def _embedding(db, cv) -> None:
+    from app.services.embedding_service import rafraichir_embedding_cv
+    rafraichir_embedding_cv(cv)
+
+
+def _indexation(db, cv) -> None:
+    from app.services.embedding_service import vecteur_stocke
+    from app.vector_store.indexing import index_cv_from_json
+    index_cv_from_json(
+        str(cv.id),
+        cv.json_structure or {},
+        metadata={"candidat_id": cv.candidat_id, "nom_fichier": cv.fichier_nom},
+        embedding=vecteur_stocke(cv),
+    )
+
+
+_FONCTIONS_ETAPES = {
+    "extraction": _extraction,
+    "structuration": _structuration,
+    "embedding": _embedding,
+    "indexation": _indexation,
+}
+
+
+def _marquer(db, cv, etape: str, **etat) -> None:
+    """
+    Met à jour le statut d'une étape (nouveau dict : JSONB non muté en place), renouvelle
+    le bail de réservation et commit.
+    """
+    from sqlalchemy import func
+    etapes = dict(cv.ingestion_etapes or etapes_initiales(fichier_stocke=True))
+    etapes[etape] = etat
+    cv.ingestion_etapes = etapes
+    cv.ingestion_reserve_a = func.now()
+    db.commit()
+
+
+# ============================================
+# RÉSERVATION (partagée entre process via la base)
+# ============================================
+
+def _bail_expire():
+    """Condition SQL : CV en_cours dont le worker n'a pas renouvelé le bail (process arrêté)."""
+    from sqlalchemy import and_, func, or_
+    from app.models.cv import CV
+
+    limite = func.now() - timedelta(seconds=settings.INGESTION_CV_BAIL_S)
+    return and_(
+        CV.ingestion_statut == EN_COURS,
+        or_(CV.ingestion_reserve_a.is_(None), CV.ingestion_reserve_a < limite),
+    )
+
+
+def _reserver(db, cv_id: str, jeton: Optional[datetime] = None) -> bool:
+    """
+    Réserve atomiquement l'ingestion d'un CV pour ce worker.
+
+    Args:
+        jeton: Horodatage de réservation rendu par reprendre_ingestions_en_suspens (CV déjà
+            réservé par ce process) ; None pour un CV soumis en_attente
+
+    Returns:
+        bool: False si un autre worker traite le CV, s'il est prêt ou supprimé
+    """
+    from sqlalchemy import func, or_, update
+    from app.models.cv import CV
+
+    if jeton is None:
+        condition = or_(CV.ingestion_statut.in_([EN_ATTENTE, ECHEC]), _bail_expire())
+    else:
+        condition = (CV.ingestion_statut == EN_COURS) & (CV.ingestion_reserve_a == jeton)
+    resultat = db.execute(
+        update(CV)
+        .where(CV.id == cv_id, condition)
+        .values(ingestion_statut=EN_COURS, ingestion_reserve_a=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return resultat.rowcount == 1
+
+
+def _executer_ingestion(cv_id: str, jeton: Optional[datetime] = None) -> None:
+    from app.core.database import SessionLocal
+    from app.models.cv import CV
+
+    db = SessionLocal()
+    try:
+        if not _reserver(db, cv_id, jeton):
+            return  # CV pris par un autre worker, déjà ingéré ou supprimé
+        cv = db.query(CV).filter(CV.id == cv_id).first()
+        if not cv:
+            return
+
+        for etape in ETAPES[1:]:
+            if ((cv.ingestion_etapes or {}).get(etape) or {}).get("statut") == PRET:
+                continue  # déjà faite (relance après échec)
+            _marquer(db, cv, etape, statut=EN_COURS)
+            debut = time.perf_counter()
+            try:
+                _FONCTIONS_ETAPES[etape](db, cv)
+            except Exception as e:
+                db.rollback()
+                _marquer(db, cv, etape, statut=ECHEC, erreur=str(e)[:500])
+                cv.ingestion_statut = ECHEC
+                cv.ingestion_reserve_a = None
+                db.commit()
+                with _lock:
+                    _stats["echecs"] += 1
+                print(f"❌ Ingestion du CV {cv_id} : échec de l'étape {etape} ({e})")
+                return
+            duree_ms = round((time.perf_counter() - debut) * 1000, 1)
+            _marquer(db, cv, etape, statut=PRET, duree_ms=duree_ms)
+            with _lock:
+                _durees[etape][0] += 1
+                _durees[etape][1] += duree_ms
+
+        cv.ingestion_statut = PRET
+        cv.ingestion_reserve_a = None
+        db.commit()
+        with _lock:
+            _stats["termines"] += 1
+        print(f"✅ CV {cv_id} ingéré")
+    finally:
+        db.close()
+
+
+def _boucle() -> None:
+    while True:
+        element = _file.get()
+        if element is None:  # signal d'arrêt
+            break
+        cv_id, jeton = element
+        with _lock:
+            _en_file.discard(cv_id)
+        try:
+            _executer_ingestion(cv_id, jeton)
+        except Exception as e:
+            print(f"❌ Worker ingestion CV : {e}")
+
+
+# ============================================
+# API DU SERVICE
+# ============================================
+
+def creer_cv_a_ingerer(
+    db,
+    candidat_id: str,
+    fichier_nom: str,
+    fichier_chemin: str,
+    fichier_hash: Optional[str] = None,
+    pdf_deja_stocke: bool = False
+):
+    """
+    Crée la ligne CV d'un PDF stocké (étape « stockage » faite) et met son ingestion en file.
+    Si un doublon est déjà ingéré, ses extractions sont reprises : il ne reste que l'indexation.
+
+    Args:
+        fichier_hash: SHA-256 du PDF (déduplication)
+        pdf_deja_stocke: True si ce contenu était déjà présent dans le stockage
+
+    Returns:
+        CV: Instance créée (texte_brut et json_structure remplis par les workers ou repris)
+    """
+    import uuid
+    from app.models.cv import CV
+
+    cv = CV(
+        id=str(uuid.uuid4()),
+        candidat_id=candidat_id,
+        fichier_nom=fichier_nom,
+        fichier_chemin=fichier_chemin,
+        fichier_hash=fichier_hash,
+        ingestion_statut=EN_ATTENTE,
+        ingestion_etapes=etapes_initiales(fichier_stocke=True),
+    )
+    with _lock:
+        _dedup["uploads"] += 1
+        _dedup["pdf_deja_stockes"] += 1 if pdf_deja_stocke else 0
+    if pdf_deja_stocke:
+        _reutiliser_doublon(db, cv)
+    db.add(cv)
+    db.commit()
+    db.refresh(cv)
+    soumettre_ingestion(str(cv.id))
+    return cv
+
+
+def soumettre_ingestion(cv_id: str, jeton: Optional[datetime] = None) -> bool:
+    """
+    Met en file l'ingestion d'un CV (ligne déjà commitée avec ingestion_statut=en_attente).
+
+    Args:
+        jeton: Horodatage de réservation si le CV est déjà réservé par ce process
+
+    Returns:
+        bool: False si le CV est déjà en file
+    """
+    with _lock:
+        if cv_id in _en_file:
+            return False
+        _en_file.add(cv_id)
+        _stats["soumis"] += 1
+    _file.put((cv_id, jeton))
+    return True
+
+
+def relancer_ingestion(db, cv, depuis: Optional[str] = None) -> Dict:
+    """
+    Relance les étapes en échec d'un CV (ou toutes les étapes à partir de `depuis`).
+
+    Args:
+        db: Session SQLAlchemy
+        cv: CV à relancer
+        depuis: Étape à partir de laquelle tout rejouer (ex. "structuration" après changement de prompt)
+
+    Returns:
+        dict: Nouvel état d'ingestion
+    """
+    if depuis is not None and depuis not in ETAPES[1:]:
+        raise ValueError(f"Étape inconnue : {depuis} (attendu : {', '.join(ETAPES[1:])})")
+    etapes = dict(cv.ingestion_etapes or etapes_initiales(fichier_stocke=bool(cv.fichier_chemin)))
+    for etape in ETAPES[1:]:
+        a_rejouer = ETAPES.index(etape) >= ETAPES.index(depuis) if depuis else (etapes.get(etape) or {}).get("statut") != PRET
+        if a_rejouer:
+            etapes[etape] = {"statut": EN_ATTENTE}
+    cv.ingestion_etapes = etapes
+    cv.ingestion_statut = EN_ATTENTE
+    db.commit()
+    soumettre_ingestion(str(cv.id))
+    return etat_ingestion(cv)
+
+
+def reprendre_ingestions_en_suspens() -> int:
+    """
+    Réserve puis remet en file les CV en_attente et ceux restés en_cours au-delà du bail
+    (process arrêté avant la fin). Les CV en cours dans un autre worker vivant ne sont pas repris.
+    """
+    from sqlalchemy import func, or_, update
+    from app.core.database import SessionLocal
+    from app.models.cv import CV
+
+    db = SessionLocal()
+    try:
+        reserves: List[Tuple[str, datetime]] = db.execute(
+            update(CV)
+            .where(or_(CV.ingestion_statut == EN_ATTENTE, _bail_expire()))
+            .values(ingestion_statut=EN_COURS, ingestion_reserve_a=func.now())
+            .returning(CV.id, CV.ingestion_reserve_a)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+    finally:
+        db.close()
+    for cv_id, jeton in reserves:
+        soumettre_ingestion(str(cv_id), jeton)
+    if reserves:
+        print(f"↩️  {len(reserves)} ingestion(s) de CV remise(s) en file")
+    return len(reserves)
+
+
+def demarrer_workers_ingestion() -> None:
+    """Démarre les workers d'ingestion (au démarrage de l'application)."""
+    with _lock:
+        if _workers:
+            return
+        for i in range(max(1, settings.INGESTION_CV_WORKERS)):
+            t = threading.Thread(target=_boucle, name=f"ingestion-cv-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def arreter_workers_ingestion() -> None:
+    """Signale l'arrêt aux workers (les ingestions restantes seront reprises au prochain démarrage)."""
+    with _lock:
+        for _ in _workers:
+            _file.put(None)
+        _workers.clear()
+
+
+def stats_ingestion() -> Dict:
+    with _lock:
+        return {
+            **_stats,
+            "duree_ms_moyenne_par_etape": {
+                e: round(total / n, 1) if n else None for e, (n, total) in _durees.items()
+            },
+            "en_file": _file.qsize(),
+            "workers": len(_workers),
+            "deduplication": {
+                **_dedup,
+                "hit_ratio": round(_dedup["extractions_reutilisees"] / _dedup["uploads"], 4) if _dedup["uploads"] else 0.0,
+            },
+        }
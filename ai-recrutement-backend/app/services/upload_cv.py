@@ -0,0 +1,164 @@
+"""
+Réception en streaming des CV PDF.
+Le fichier est lu par blocs : la taille max est vérifiée au fil de l'eau, le contenu est
+écrit dans un fichier temporaire de uploads/cvs/ (rangé ensuite par simple renommage)
+et son SHA-256 calculé au passage. Mémoire par upload bornée à un bloc, quel que soit le fichier.
+Stockage adressé par contenu : uploads/cvs/<2 premiers caractères du hash>/<hash>.pdf,
+un PDF identique n'est stocké qu'une fois.
+LimiteTailleUpload refuse (413) un corps trop gros avant que Starlette ne le mette en
+fichier temporaire (parsing multipart) : Content-Length d'abord, puis octets reçus.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+
+TAILLE_MAX_CV = 10 * 1024 * 1024  # 10 Mo
+TAILLE_BLOC = 1024 * 1024  # 1 Mo
+# Enveloppe multipart (boundary, en-têtes de partie, autres champs) tolérée au-delà du fichier
+MARGE_MULTIPART = 64 * 1024
+
+
+class FichierTropVolumineux(ValueError):
+    """Levée dès que le flux dépasse la taille max (le fichier temporaire est supprimé)."""
+
+
+async def recevoir_pdf(file: UploadFile, dossier: Path, taille_max: int = TAILLE_MAX_CV) -> Dict:
+    """
+    Copie l'upload dans un fichier temporaire de `dossier`, bloc par bloc.
+
+    Args:
+        file: Fichier reçu (UploadFile FastAPI)
+        dossier: Dossier de destination (même système de fichiers que le stockage final)
+        taille_max: Taille max en octets
+
+    Returns:
+        dict: chemin (fichier temporaire, à ranger ou supprimer par l'appelant), taille, sha256
+    """
+    dossier.mkdir(parents=True, exist_ok=True)
+    descripteur, chemin = tempfile.mkstemp(prefix=".upload_", suffix=".part", dir=dossier)
+    empreinte = hashlib.sha256()
+    taille = 0
+    try:
+        with os.fdopen(descripteur, "wb") as sortie:
+            while True:
+                bloc = await file.read(TAILLE_BLOC)
+                if not bloc:
+                    break
+                taille += len(bloc)
+                if taille > taille_max:
+                    raise FichierTropVolumineux(f"Fichier trop volumineux (max {taille_max // (1024 * 1024)} Mo)")
+                empreinte.update(bloc)
+                await run_in_threadpool(sortie.write, bloc)
+    except BaseException:
+        supprimer_fichier_temporaire(chemin)
+        raise
+
+    return {"chemin": chemin, "taille": taille, "sha256": empreinte.hexdigest()}
+
+
+def chemin_par_empreinte(sha256: str, dossier: Path) -> Path:
+    """Emplacement d'un PDF dans le stockage adressé par contenu (sous-dossier créé si besoin)."""
+    sous_dossier = dossier / sha256[:2]
+    sous_dossier.mkdir(parents=True, exist_ok=True)
+    return sous_dossier / f"{sha256}.pdf"
+
+
+def stocker_par_empreinte(chemin_temporaire: str, sha256: str, dossier: Path) -> Tuple[str, bool]:
+    """
+    Range le fichier temporaire sous son empreinte (renommage atomique, même système de fichiers).
+
+    Returns:
+        tuple: (chemin du PDF stocké, True si ce contenu était déjà stocké)
+    """
+    chemin = chemin_par_empreinte(sha256, dossier)
+    if chemin.exists():
+        supprimer_fichier_temporaire(chemin_temporaire)
+        return str(chemin), True
+    os.replace(chemin_temporaire, chemin)
+    return str(chemin), False
+
+
+def supprimer_fichier_temporaire(chemin: str) -> None:
+    """Supprime le fichier temporaire s'il n'a pas été rangé."""
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
+
+
+# ============================================
+# LIMITE DE TAILLE DU CORPS (middleware ASGI)
+# ============================================
+
+class LimiteTailleUpload:
+    """
+    Middleware ASGI : corps des requêtes POST sur `chemins` limité à `taille_max` octets.
+    - Content-Length annoncé trop grand : 413 sans lire le corps
+    - Corps sans Content-Length (chunked) : lecture interrompue dès le dépassement, 413
+    Le parsing multipart de Starlette ne met donc jamais plus de `taille_max` octets sur disque.
+    """
+
+    def __init__(self, app, chemins: Iterable[str], taille_max: int = TAILLE_MAX_CV + MARGE_MULTIPART):
+        self.app = app
+        self.chemins = tuple(chemins)
+        self.taille_max = taille_max
+
+    def _detail(self) -> str:
+        return f"Fichier trop volumineux (max {TAILLE_MAX_CV // (1024 * 1024)} Mo)"
+
+    async def _refuser(self, send) -> None:
+        corps = json.dumps({"detail": self._detail()}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(corps)).encode())],
+        })
+        await send({"type": "http.response.body", "body": corps})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.chemins:
+            await self.app(scope, receive, send)
+            return
+
+        longueur = dict(scope["headers"]).get(b"content-length")
+        if longueur is not None and longueur.isdigit() and int(longueur) > self.taille_max:
+            await self._refuser(send)
+            return
+
+        recu = 0
+        depasse = False
+        reponse_remplacee = False
+
+        async def recevoir():
+            nonlocal recu, depasse
+            message = await receive()
+            if message["type"] == "http.request":
+                recu += len(message.get("body", b""))
+                if recu > self.taille_max:
+                    depasse = True
+                    raise FichierTropVolumineux(self._detail())
+            return message
+
+        async def envoyer(message):
+            # Erreur de parsing provoquée par le dépassement : réponse remplacée par le 413
+            nonlocal reponse_remplacee
+            if message["type"] == "http.response.start" and depasse:
+                reponse_remplacee = True
+                await self._refuser(send)
+                return
+            if not reponse_remplacee:
+                await send(message)
+
+        try:
+            await self.app(scope, recevoir, envoyer)
+        except FichierTropVolumineux:
+            if not reponse_remplacee:
+                await self._refuser(send)
+
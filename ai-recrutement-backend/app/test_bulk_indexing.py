@@ -0,0 +1,126 @@
+"""
+Indexation en masse : interruption puis reprise depuis le checkpoint (ni doublon ni trou),
+réutilisation des vecteurs stockés en BDD. Collection Chroma et encodeur factices.
+Lance avec: python -m app.test_bulk_indexing
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+import app.vector_store.bulk_indexing as bulk_indexing
+from app.ai.embeddings import MODEL_NAME, hash_texte
+from app.vector_store.text_builders import build_cv_text
+
+
+class _CollectionFactice:
+    """Upsert en mémoire ; lève une erreur à partir du `panne_au`-ième upsert (process interrompu)."""
+
+    def __init__(self):
+        self.documents = {}
+        self.upserts = []
+        self.panne_au = None
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if self.panne_au is not None and len(self.upserts) + 1 >= self.panne_au:
+            raise RuntimeError("Chroma indisponible")
+        self.upserts.append(list(ids))
+        for doc_id, document, vecteur in zip(ids, documents, embeddings):
+            self.documents[doc_id] = (document, vecteur)
+
+
+class _EncodeurFactice:
+    def __init__(self):
+        self.textes = []
+
+    def __call__(self, textes):
+        self.textes.extend(textes)
+        return [[float(len(t)), 1.0] for t in textes]
+
+
+@contextmanager
+def _remplacer(**attributs):
+    origines = {nom: getattr(bulk_indexing, nom) for nom in attributs}
+    for nom, valeur in attributs.items():
+        setattr(bulk_indexing, nom, valeur)
+    try:
+        yield
+    finally:
+        for nom, valeur in origines.items():
+            setattr(bulk_indexing, nom, valeur)
+
+
+def _dossier_json(n: int) -> str:
+    dossier = tempfile.mkdtemp()
+    for i in range(n):
+        with open(os.path.join(dossier, f"cv_{i:02d}.json"), "w", encoding="utf-8") as f:
+            json.dump({"titre": f"Développeur {i}", "competences": ["Python", f"Outil {i}"]}, f)
+    return dossier
+
+
+def test_interruption_puis_reprise():
+    dossier = _dossier_json(10)
+    checkpoint = os.path.join(tempfile.mkdtemp(), "bulk.checkpoint.json")
+    collection, encodeur = _CollectionFactice(), _EncodeurFactice()
+    collection.panne_au = 3  # 2 lots de 3 indexés, le 3e échoue
+
+    with _remplacer(get_collection=lambda nom: collection, embed_texts=encodeur):
+        try:
+            bulk_indexing.reindexer("cvs", source="dossier", dossier=dossier, taille_lot=3, checkpoint=checkpoint)
+            raise AssertionError("interruption attendue")
+        except RuntimeError:
+            pass
+        assert bulk_indexing.lire_checkpoint(checkpoint) == {"dernier_id": "cv_05", "indexes": 6}
+
+        collection.panne_au = None
+        stats = bulk_indexing.reindexer("cvs", source="dossier", dossier=dossier, taille_lot=3, checkpoint=checkpoint)
+        assert stats["indexes"] == 4 and stats["total_indexes"] == 10, stats
+
+        # Chaque document upserté exactement une fois, dans l'ordre
+        upsertes = [doc_id for lot in collection.upserts for doc_id in lot]
+        assert upsertes == [f"cv_{i:02d}" for i in range(10)], upsertes
+        assert bulk_indexing.lire_checkpoint(checkpoint) == {"dernier_id": "cv_09", "indexes": 10}
+
+        # Checkpoint à la fin : rien à refaire ; reset : tout est réindexé (upsert idempotent)
+        assert bulk_indexing.reindexer("cvs", source="dossier", dossier=dossier, checkpoint=checkpoint)["indexes"] == 0
+        stats = bulk_indexing.reindexer("cvs", source="dossier", dossier=dossier, checkpoint=checkpoint, reset=True)
+        assert stats["indexes"] == 10 and len(collection.documents) == 10
+
+
+def test_vecteurs_stockes_reutilises():
+    def texte_matching(doc_json):
+        return " ".join(doc_json["competences"])
+
+    a_jour = {"titre": "Data", "competences": ["Python", "SQL"]}
+    perime = {"titre": "Back", "competences": ["Go"]}
+    sans_tampon = {"titre": "Front", "competences": ["React"]}
+    documents = [
+        ("1", a_jour, {}, {"embedding": [9.0, 9.0], "modele": MODEL_NAME, "hash": hash_texte("Python SQL")}),
+        ("2", perime, {}, {"embedding": [9.0, 9.0], "modele": "ancien-modele", "hash": hash_texte("Go")}),
+        ("3", sans_tampon, {"candidat_id": None}, None),
+    ]
+    collection, encodeur, persistes = _CollectionFactice(), _EncodeurFactice(), []
+
+    with _remplacer(
+        get_collection=lambda nom: collection,
+        embed_texts=encodeur,
+        _persister_tampons=lambda modele_bdd, lignes: persistes.extend(lignes),
+    ):
+        stats = bulk_indexing.indexer_en_masse(
+            documents, "cvs", build_cv_text, "cv", texte_matching=texte_matching, modele_bdd="CV"
+        )
+
+    assert stats["vecteurs_reutilises"] == 1 and stats["vecteurs_encodes"] == 2, stats
+    assert collection.documents["1"][1] == [9.0, 9.0]  # vecteur stocké, non réencodé
+    assert encodeur.textes == ["Go", build_cv_text(sans_tampon)]
+    assert collection.documents["2"][1] == [2.0, 1.0]
+    # Seul le tampon périmé est persisté (le document sans tampon n'a pas de ligne en BDD)
+    assert persistes == [("2", [2.0, 1.0], hash_texte("Go"))]
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
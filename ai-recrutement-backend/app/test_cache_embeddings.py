@@ -0,0 +1,90 @@
+"""
+Cache d'embeddings : clé (modèle, texte normalisé), encodage des seuls manquants, LRU et tier disque.
+Lance avec: python -m app.test_cache_embeddings
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+import app.ai.embeddings as embeddings
+
+
+# ============================================
+# OUTILS
+# ============================================
+
+class _ModeleFactice:
+    """Remplace le modèle sentence-transformers : vecteur = [longueur, nb d'appels]."""
+
+    def __init__(self):
+        self.textes_encodes = []
+
+    def encode(self, textes):
+        self.textes_encodes.extend(textes)
+        return np.array([[float(len(t)), float(len(self.textes_encodes))] for t in textes])
+
+
+@contextmanager
+def _modele_factice():
+    """Modèle factice pendant le bloc, puis restauration du vrai chargeur."""
+    vrai_chargeur = embeddings.get_model
+    modele = _ModeleFactice()
+    embeddings.get_model = lambda: modele
+    try:
+        yield modele
+    finally:
+        embeddings.get_model = vrai_chargeur
+
+
+def _isoler(taille_max: int):
+    """Cache vide avec un tier disque dans un dossier temporaire."""
+    embeddings.CACHE_TAILLE_MAX = taille_max
+    embeddings.CACHE_DISQUE = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+    embeddings._disque = None
+    embeddings._cache.clear()
+    for compteur in embeddings._cache_stats:
+        embeddings._cache_stats[compteur] = 0
+
+
+def test_cle_embedding_ignore_la_mise_en_forme():
+    assert embeddings._cle_cache("Python  FastAPI\n\nSQL") == embeddings._cle_cache(" Python FastAPI SQL ")
+    assert embeddings._cle_cache("Python") != embeddings._cle_cache("python")
+    assert embeddings._cle_cache("Python").startswith(f"{embeddings.MODEL_NAME}:")
+
+
+def test_embeddings_encode_seulement_les_manquants():
+    _isoler(taille_max=10)
+    with _modele_factice() as modele:
+        premiers = embeddings.embed_texts(["a", "bb", "a"])
+        assert modele.textes_encodes == ["a", "bb"]  # doublon encodé une seule fois
+        assert premiers[0] == premiers[2]
+
+        seconds = embeddings.embed_texts(["bb", "ccc"])
+        assert modele.textes_encodes == ["a", "bb", "ccc"]
+        assert seconds[0] == premiers[1]
+        assert embeddings.stats_cache_embeddings()["misses"] == 3
+
+
+def test_embeddings_lru_et_tier_disque():
+    _isoler(taille_max=2)
+    with _modele_factice() as modele:
+        embeddings.embed_texts(["a", "bb"])
+        embeddings.embed_texts(["a"])  # "a" devient le plus récent
+        embeddings.embed_texts(["ccc"])  # évince "bb"
+        assert list(embeddings._cache) == [embeddings._cle_cache("a"), embeddings._cle_cache("ccc")]
+        assert embeddings.stats_cache_embeddings()["evictions"] == 1
+
+        # "bb" revient du disque sans ré-encodage
+        embeddings.embed_texts(["bb"])
+        assert modele.textes_encodes == ["a", "bb", "ccc"]
+        assert embeddings.stats_cache_embeddings()["hits_disque"] == 1
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
@@ -0,0 +1,110 @@
+"""
+Cache des explications IA : clé canonique, copies, LRU, TTL et tier disque (CacheHierarchise).
+Lance avec: python -m app.test_cache_explications
+"""
+
+import os
+import tempfile
+import time
+
+from app.ai.cache_explications import cle_explication
+from app.ai.cache_hierarchise import CacheHierarchise
+
+
+def _cache(taille_max: int = 2, ttl_s: int = 3600, disque_max: int = 100) -> CacheHierarchise:
+    """Cache neuf avec un tier disque dans un dossier temporaire."""
+    chemin = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+    return CacheHierarchise("explications", ttl_s, taille_max, chemin, disque_max)
+
+
+def test_cle_explication_canonique():
+    details = {"competences": {"score": 80.0, "trouvees": ["Python"]}, "experience": {"score": 100.0}}
+    details_reordonnes = {"experience": {"score": 100.0}, "competences": {"trouvees": ["Python"], "score": 80.0}}
+    cle = cle_explication(72.5, details, "BON", "Dev Python", "v1", "llama3")
+
+    assert cle == cle_explication(72.5, details_reordonnes, "BON", "Dev Python", "v1", "llama3")
+    assert cle != cle_explication(72.5, details, "BON", "Dev Python", "v2", "llama3")
+    assert cle != cle_explication(72.5, details, "BON", "Dev Python", "v1", "mistral")
+    assert cle != cle_explication(72.6, details, "BON", "Dev Python", "v1", "llama3")
+
+
+def test_copies_en_lecture_et_en_ecriture():
+    cache = _cache()
+    valeur = {"points_forts": ["Python"]}
+    cache.ecrire("a", valeur)
+    valeur["points_forts"].append("modifié après écriture")
+
+    lue = cache.lire("a")
+    assert lue == {"points_forts": ["Python"]}
+    lue["points_forts"].append("modifié après lecture")
+    assert cache.lire("a") == {"points_forts": ["Python"]}
+
+
+def test_lru_puis_tier_disque():
+    cache = _cache(taille_max=2)
+    cache.ecrire("a", {"n": 1})
+    cache.ecrire("b", {"n": 2})
+    cache.lire("a")  # "a" devient le plus récent
+    cache.ecrire("c", {"n": 3})  # évince "b" de la mémoire
+
+    assert list(cache._cache) == ["a", "c"]
+    assert cache.lire("b") == {"n": 2}  # relu du disque, remis en mémoire
+    stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["hits_disque"] == 1 and stats["hits_memoire"] == 1
+
+    # Un autre worker (autre instance, même fichier) voit les entrées du tier disque
+    autre = CacheHierarchise("explications", 3600, 2, cache.chemin_disque, 100)
+    assert autre.lire("c") == {"n": 3}
+    assert autre.lire("absente") is None
+    assert autre.stats()["misses"] == 1
+
+
+def test_expiration():
+    cache = _cache(ttl_s=3600)
+    with cache._lock:
+        cache._memoriser("d", time.time() - 1, {"n": 4})
+        conn = cache._connexion_disque()
+        conn.execute(
+            "INSERT OR REPLACE INTO explications (cle, valeur, expire_a, utilise_a) VALUES (?, ?, ?, ?)",
+            ("d", '{"n": 4}', time.time() - 1, time.time()),
+        )
+        conn.commit()
+
+    assert cache.lire("d") is None  # expirée en mémoire et sur disque
+    assert "d" not in cache._cache
+    assert cache.stats()["expirees"] == 1
+
+    assert _cache(ttl_s=0)._expiration() == float("inf")
+
+
+def test_purge_disque():
+    cache = _cache(taille_max=1, disque_max=2)
+    for i, cle in enumerate(["a", "b", "c", "d"]):
+        cache.ecrire(cle, {"n": i})
+        time.sleep(0.01)
+    with cache._lock:
+        conn = cache._connexion_disque()
+        conn.execute("UPDATE explications SET expire_a = ? WHERE cle = 'd'", (time.time() - 1,))
+        cache._purger_disque(conn)
+        conn.commit()
+
+    # "d" expirée, puis seules les 2 plus récemment utilisées restent
+    restantes = [ligne[0] for ligne in conn.execute("SELECT cle FROM explications ORDER BY cle")]
+    assert restantes == ["b", "c"], restantes
+
+
+def test_vider():
+    cache = _cache()
+    cache.ecrire("a", {"n": 1})
+    cache.vider()
+    assert cache.stats()["taille"] == 0
+    assert cache.lire("a") == {"n": 1}  # tier disque conservé
+    cache.vider(disque=True)
+    assert cache.lire("a") is None
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
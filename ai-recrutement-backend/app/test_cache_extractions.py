@@ -0,0 +1,55 @@
+"""
+Cache des extractions LLM : clé sur texte normalisé, compteurs de contournement.
+Lance avec: python -m app.test_cache_extractions
+"""
+
+import os
+import tempfile
+
+import app.ai.cache_extractions as cache_extractions
+from app.ai.cache_extractions import cle_extraction, version_prompt
+
+
+# Tier disque dans un dossier temporaire : pas d'écriture dans cache/
+cache_extractions.cache.chemin_disque = os.path.join(tempfile.mkdtemp(), "extractions.sqlite")
+
+
+def test_cle_extraction_normalise_le_texte():
+    cle = cle_extraction("cv", "Jean Dupont\nPython   SQL\n", "v1", "llama3")
+    assert cle == cle_extraction("cv", "  Jean Dupont\n\n\nPython SQL", "v1", "llama3")
+    # é précomposé (NFC) = e + accent combinant (NFD)
+    assert cle_extraction("cv", "Ing\u00e9nieur", "v1", "llama3") == cle_extraction("cv", "Inge\u0301nieur", "v1", "llama3")
+    assert cle != cle_extraction("offre", "Jean Dupont\nPython SQL", "v1", "llama3")
+    assert cle != cle_extraction("cv", "Jean Dupont\nPython SQL", "v2", "llama3")
+    assert cle != cle_extraction("cv", "Jean Dupont\nPython SQL", "v1", "mistral")
+
+
+def test_version_prompt():
+    assert version_prompt("template", "schema") == version_prompt("template", "schema")
+    assert version_prompt("template", "schema") != version_prompt("templateschema")
+
+
+def test_lecture_ecriture_et_compteurs():
+    cache_extractions.vider_cache_extractions()
+    avant = cache_extractions.stats_cache_extractions()
+
+    cle = cle_extraction("cv", "Jean Dupont\nPython SQL", "test", "test")
+    cache_extractions.ecrire_extraction(cle, {"competences": ["Python"]})
+    extraction = cache_extractions.lire_extraction(cle)
+    assert extraction == {"competences": ["Python"]}
+    extraction["competences"].append("SQL")
+    assert cache_extractions.lire_extraction(cle) == {"competences": ["Python"]}
+
+    cache_extractions.compter_contournement(rafraichir=False)
+    cache_extractions.compter_contournement(rafraichir=True)
+    apres = cache_extractions.stats_cache_extractions()
+    assert apres["contournements"] == avant["contournements"] + 1
+    assert apres["rafraichissements"] == avant["rafraichissements"] + 1
+    assert apres["hits_memoire"] == avant["hits_memoire"] + 2
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
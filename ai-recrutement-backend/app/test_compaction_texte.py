@@ -0,0 +1,79 @@
+"""
+Compaction du texte d'un CV sous un budget de tokens (prompt « compact »).
+Lance avec: python -m app.test_compaction_texte
+"""
+
+from app.ai.compaction_texte import (
+    MARQUE_TRONCATURE,
+    compacter_texte_cv,
+    decouper_sections,
+    normaliser_texte,
+)
+from app.ai.fournisseurs_llm import estimer_tokens
+
+
+CV_TEXTE = """Sarah   Martin
+Développeuse Python - Lyon
+
+
+Compétences
+Python, Django, FastAPI, PostgreSQL, Docker
+Expérience professionnelle
+Développeuse backend chez Acme (2020-2024)
+""" + "\n".join(f"- Réalisation {i} : API REST, optimisation SQL, revue de code" for i in range(40)) + """
+Formation
+Master Informatique, Université Lyon 1 (2020)
+Langues
+Français, Anglais C1
+Centres d'intérêt
+Escalade, photographie, voyages, lecture, bénévolat associatif
+Références
+Disponibles sur demande
+"""
+
+
+def test_normalisation():
+    assert normaliser_texte("a  \t b c\n\n\n  d  \n") == "a b c\nd"
+
+
+def test_decoupage_sections():
+    sections = [s for s, _ in decouper_sections(normaliser_texte(CV_TEXTE))]
+    assert sections == ["entete", "competences", "experiences", "formations", "langues", "secondaire", "secondaire"]
+
+
+def test_budget_nul_normalisation_seule():
+    assert compacter_texte_cv(CV_TEXTE, 0) == normaliser_texte(CV_TEXTE)
+
+
+def test_texte_sous_le_budget_inchange():
+    texte = normaliser_texte(CV_TEXTE)
+    assert compacter_texte_cv(CV_TEXTE, estimer_tokens(texte)) == texte
+
+
+def test_sections_secondaires_abandonnees_en_premier():
+    texte = normaliser_texte(CV_TEXTE)
+    budget = estimer_tokens(texte) - 5
+    compact = compacter_texte_cv(CV_TEXTE, budget)
+    assert "Escalade" not in compact and "Références" not in compact
+    assert "Réalisation 39" in compact  # sections utiles intactes
+    assert MARQUE_TRONCATURE not in compact
+
+
+def test_troncature_sous_le_budget():
+    for budget in (40, 80, 150, 300):
+        compact = compacter_texte_cv(CV_TEXTE, budget)
+        # Tolérance : marques de troncature et sauts de ligne entre sections
+        assert estimer_tokens(compact) <= budget + 10, (budget, estimer_tokens(compact))
+        # Titres des sections utiles conservés, dans l'ordre du CV ; le reste est tronqué
+        for ligne in ("Compétences", "Formation", "Langues"):
+            assert ligne in compact, (budget, ligne)
+        assert compact.index("Compétences") < compact.index("Formation") < compact.index("Langues")
+        assert MARQUE_TRONCATURE in compact
+        assert "Escalade" not in compact
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
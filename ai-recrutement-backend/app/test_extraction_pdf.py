@@ -0,0 +1,50 @@
+"""
+Découpage des pages d'un PDF en plages pour le pool d'extraction.
+Lance avec: python -m app.test_extraction_pdf
+"""
+
+import app.ai.extraction_pdf as extraction_pdf
+
+
+def _plages(nb_pages: int, workers: int, pages_par_tache: int):
+    extraction_pdf.PDF_WORKERS, extraction_pdf.PDF_PAGES_PAR_TACHE = workers, pages_par_tache
+    return extraction_pdf._plages(nb_pages)
+
+
+def test_plages_couvrent_toutes_les_pages_dans_l_ordre():
+    workers_origine, pages_origine = extraction_pdf.PDF_WORKERS, extraction_pdf.PDF_PAGES_PAR_TACHE
+    try:
+        for workers in (1, 2, 3, 4, 8):
+            for pages_par_tache in (0, 1, 2, 5):
+                for nb_pages in range(1, 60):
+                    plages = _plages(nb_pages, workers, pages_par_tache)
+                    cas = (nb_pages, workers, pages_par_tache, plages)
+
+                    assert plages[0][0] == 0 and plages[-1][1] == nb_pages, cas
+                    assert all(fin == debut for (_, fin), (debut, _) in zip(plages, plages[1:])), cas
+                    assert all(debut < fin for debut, fin in plages), cas
+                    assert len(plages) <= workers, cas
+                    if len(plages) > 1:
+                        assert all(fin - debut >= pages_par_tache for debut, fin in plages), cas
+    finally:
+        extraction_pdf.PDF_WORKERS, extraction_pdf.PDF_PAGES_PAR_TACHE = workers_origine, pages_origine
+
+
+def test_plages_exemples():
+    workers_origine, pages_origine = extraction_pdf.PDF_WORKERS, extraction_pdf.PDF_PAGES_PAR_TACHE
+    try:
+        assert _plages(1, 4, 2) == [(0, 1)]  # CV d'une page : une seule tâche
+        assert _plages(3, 4, 2) == [(0, 3)]
+        assert _plages(8, 4, 2) == [(0, 2), (2, 4), (4, 6), (6, 8)]
+        assert _plages(9, 4, 2) == [(0, 3), (3, 5), (5, 7), (7, 9)]
+        assert _plages(7, 3, 2) == [(0, 3), (3, 5), (5, 7)]  # pas de dernière plage d'une page
+        assert _plages(100, 4, 2) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    finally:
+        extraction_pdf.PDF_WORKERS, extraction_pdf.PDF_PAGES_PAR_TACHE = workers_origine, pages_origine
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
@@ -0,0 +1,186 @@
+"""
+Pipeline d'ingestion des CV sur la base configurée (DATABASE_URL) : réservation et bail,
+réutilisation d'un doublon (même SHA-256), échec d'une étape puis relance.
+Les lignes créées (utilisateur, candidat, CV) sont supprimées en fin de test.
+Lance avec: python -m app.test_ingestion_cv
+"""
+
+import hashlib
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.candidat import Candidat
+from app.models.cv import CV
+from app.models.user import RoleEnum, User
+from app.services import ingestion_cv
+from app.services.ingestion_cv import ECHEC, EN_ATTENTE, EN_COURS, PRET
+
+
+@contextmanager
+def _candidat():
+    """Session + candidat jetable ; supprime ses CV, le candidat et l'utilisateur à la sortie."""
+    db = SessionLocal()
+    user_id, candidat_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.add(User(id=user_id, email=f"test-ingestion-{user_id}@example.com", mot_de_passe="x", role=RoleEnum.candidat))
+    db.flush()
+    db.add(Candidat(id=candidat_id, user_id=user_id, nom="Test Ingestion"))
+    db.commit()
+    try:
+        yield db, candidat_id
+    finally:
+        db.rollback()
+        db.query(CV).filter(CV.candidat_id == candidat_id).delete(synchronize_session=False)
+        db.query(Candidat).filter(Candidat.id == candidat_id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def _cv(db, candidat_id: str, **champs) -> CV:
+    cv = CV(
+        id=str(uuid.uuid4()),
+        candidat_id=candidat_id,
+        fichier_nom="cv.pdf",
+        fichier_chemin="/tmp/cv-test-ingestion.pdf",
+        ingestion_statut=EN_ATTENTE,
+        ingestion_etapes=ingestion_cv.etapes_initiales(fichier_stocke=True),
+        **champs,
+    )
+    db.add(cv)
+    db.commit()
+    return cv
+
+
+def _vider_file() -> list:
+    """Retire les CV mis en file par le test (aucun worker n'est démarré)."""
+    elements = []
+    while not ingestion_cv._file.empty():
+        elements.append(ingestion_cv._file.get_nowait())
+    with ingestion_cv._lock:
+        ingestion_cv._en_file.clear()
+    return elements
+
+
+@contextmanager
+def _etapes(**fonctions):
+    origines = dict(ingestion_cv._FONCTIONS_ETAPES)
+    ingestion_cv._FONCTIONS_ETAPES.update(fonctions)
+    try:
+        yield
+    finally:
+        ingestion_cv._FONCTIONS_ETAPES.clear()
+        ingestion_cv._FONCTIONS_ETAPES.update(origines)
+
+
+def test_reservation_et_bail():
+    with _candidat() as (db, candidat_id):
+        cv = _cv(db, candidat_id)
+
+        assert ingestion_cv._reserver(db, cv.id)
+        assert not ingestion_cv._reserver(db, cv.id)  # déjà en cours chez un worker vivant
+        db.refresh(cv)
+        assert cv.ingestion_statut == EN_COURS and cv.ingestion_reserve_a is not None
+
+        # Jeton rendu par reprendre_ingestions_en_suspens : seul ce worker peut reprendre la réservation
+        jeton = cv.ingestion_reserve_a
+        assert not ingestion_cv._reserver(db, cv.id, jeton - timedelta(seconds=1))
+        assert ingestion_cv._reserver(db, cv.id, jeton)
+
+        # Worker arrêté sans renouveler son bail : un autre worker peut reprendre le CV
+        cv.ingestion_reserve_a = datetime.now(timezone.utc) - timedelta(seconds=settings.INGESTION_CV_BAIL_S + 60)
+        db.commit()
+        assert ingestion_cv._reserver(db, cv.id)
+        assert not ingestion_cv._reserver(db, cv.id)
+
+        # Prêt : plus jamais réservé
+        cv.ingestion_statut = PRET
+        db.commit()
+        assert not ingestion_cv._reserver(db, cv.id)
+
+
+def test_doublon_reutilise():
+    with _candidat() as (db, candidat_id):
+        empreinte = hashlib.sha256(f"pdf-{uuid.uuid4()}".encode()).hexdigest()
+        source = _cv(
+            db, candidat_id,
+            fichier_hash=empreinte,
+            texte_brut="Jean Dupont\nPython SQL",
+            json_structure={"competences": ["Python", "SQL"]},
+            embedding=[0.1, 0.2, 0.3],
+            embedding_modele="modele-test",
+            embedding_hash="h",
+        )
+        source.ingestion_statut = PRET
+        db.commit()
+        reutilisations = ingestion_cv.stats_ingestion()["deduplication"]["extractions_reutilisees"]
+
+        cv = ingestion_cv.creer_cv_a_ingerer(
+            db, candidat_id, "copie.pdf", source.fichier_chemin, fichier_hash=empreinte, pdf_deja_stocke=True
+        )
+        assert [element[0] for element in _vider_file()] == [cv.id]
+        assert cv.texte_brut == source.texte_brut and cv.json_structure == source.json_structure
+        assert list(cv.embedding) == [0.1, 0.2, 0.3] and cv.embedding_modele == "modele-test"
+        for etape in ("extraction", "structuration", "embedding"):
+            assert cv.ingestion_etapes[etape] == {"statut": PRET, "duree_ms": 0.0, "source": str(source.id)}
+        assert cv.ingestion_etapes["indexation"]["statut"] == EN_ATTENTE  # seule étape restante
+        assert ingestion_cv.stats_ingestion()["deduplication"]["extractions_reutilisees"] == reutilisations + 1
+
+        # Autre contenu : rien n'est repris
+        autre = ingestion_cv.creer_cv_a_ingerer(db, candidat_id, "autre.pdf", "/tmp/autre.pdf", fichier_hash="0" * 64)
+        _vider_file()
+        assert autre.texte_brut is None and autre.ingestion_etapes["extraction"]["statut"] == EN_ATTENTE
+
+
+def test_echec_d_une_etape_puis_relance():
+    appels = {"extraction": 0, "structuration": 0}
+
+    def extraction(db, cv):
+        appels["extraction"] += 1
+        cv.texte_brut = "Jean Dupont\nPython SQL"
+
+    def structuration(db, cv):
+        appels["structuration"] += 1
+        if appels["structuration"] == 1:
+            raise RuntimeError("429 Too Many Requests")
+        cv.json_structure = {"competences": ["Python"]}
+
+    with _candidat() as (db, candidat_id), _etapes(
+        extraction=extraction,
+        structuration=structuration,
+        embedding=lambda db, cv: None,
+        indexation=lambda db, cv: None,
+    ):
+        cv = _cv(db, candidat_id)
+        ingestion_cv._executer_ingestion(cv.id)
+        db.refresh(cv)
+        assert cv.ingestion_statut == ECHEC and cv.ingestion_reserve_a is None
+        assert cv.ingestion_etapes["extraction"]["statut"] == PRET
+        assert cv.ingestion_etapes["structuration"]["statut"] == ECHEC
+        assert "429" in cv.ingestion_etapes["structuration"]["erreur"]
+        assert cv.ingestion_etapes["embedding"]["statut"] == EN_ATTENTE
+        assert ingestion_cv.etat_ingestion(cv)["etape_courante"] == "structuration"
+
+        # Relance : seule l'étape en échec et les suivantes sont rejouées
+        etat = ingestion_cv.relancer_ingestion(db, cv)
+        assert etat["statut"] == EN_ATTENTE and etat["etapes"]["extraction"]["statut"] == PRET
+        (cv_id, jeton), = _vider_file()
+        ingestion_cv._executer_ingestion(cv_id, jeton)
+        db.refresh(cv)
+        assert cv.ingestion_statut == PRET and cv.json_structure == {"competences": ["Python"]}
+        assert all(cv.ingestion_etapes[e]["statut"] == PRET for e in ingestion_cv.ETAPES)
+        assert appels == {"extraction": 1, "structuration": 2}
+
+        # Relance à partir d'une étape (ex. nouveau prompt) : elle et les suivantes seulement
+        etat = ingestion_cv.relancer_ingestion(db, cv, depuis="structuration")
+        _vider_file()
+        assert [etat["etapes"][e]["statut"] for e in ingestion_cv.ETAPES] == [PRET, PRET, EN_ATTENTE, EN_ATTENTE, EN_ATTENTE]
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
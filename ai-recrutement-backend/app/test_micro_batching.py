@@ -0,0 +1,91 @@
+"""
+Micro-batching des encodages : lots bornés à taille_max, un seul thread appelle le modèle.
+Lance avec: python -m app.test_micro_batching
+"""
+
+import threading
+import time
+
+import numpy as np
+
+import app.ai.embeddings as embeddings
+
+
+class _ModeleFactice:
+    """Vecteur = [longueur du texte] ; note la taille des lots et le thread appelant."""
+
+    def __init__(self):
+        self.lots = []
+        self.threads = set()
+        self._en_cours = 0
+        self.chevauchements = 0
+
+    def encode(self, textes):
+        self._en_cours += 1
+        if self._en_cours > 1:
+            self.chevauchements += 1
+        self.lots.append(len(textes))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.005)
+        self._en_cours -= 1
+        return np.array([[float(len(t))] for t in textes])
+
+
+def _encoder_en_parallele(batcher, demandes):
+    resultats = {}
+
+    def encoder(i, textes):
+        resultats[i] = batcher.encoder(textes)
+
+    threads = [threading.Thread(target=encoder, args=(i, textes)) for i, textes in enumerate(demandes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultats
+
+
+def test_lots_bornes_et_modele_appele_par_un_seul_thread():
+    vrai_chargeur = embeddings.get_model
+    modele = _ModeleFactice()
+    embeddings.get_model = lambda: modele
+    try:
+        batcher = embeddings._MicroBatcher(taille_max=4, attente_ms=20)
+        # Petites demandes concurrentes + demandes plus grosses qu'un lot
+        demandes = [["x" * (i + 1)] * (i % 3 + 1) for i in range(12)] + [["y" * 7] * 10, ["z" * 3] * 4]
+        resultats = _encoder_en_parallele(batcher, demandes)
+    finally:
+        embeddings.get_model = vrai_chargeur
+
+    for i, textes in enumerate(demandes):
+        assert resultats[i] == [[float(len(t))] for t in textes], i
+    assert max(modele.lots) <= 4, modele.lots
+    assert sum(modele.lots) == sum(len(d) for d in demandes)
+    assert modele.threads == {"embedding-batcher"}, modele.threads
+    assert modele.chevauchements == 0
+    assert batcher.stats()["textes"] == sum(len(d) for d in demandes)
+
+
+def test_erreur_du_modele_transmise_aux_appelants():
+    class _ModeleEnPanne:
+        def encode(self, textes):
+            raise RuntimeError("modèle indisponible")
+
+    vrai_chargeur = embeddings.get_model
+    embeddings.get_model = lambda: _ModeleEnPanne()
+    try:
+        batcher = embeddings._MicroBatcher(taille_max=4, attente_ms=1)
+        try:
+            batcher.encoder(["a", "b"])
+            raise AssertionError("exception attendue")
+        except RuntimeError as e:
+            assert "indisponible" in str(e)
+    finally:
+        embeddings.get_model = vrai_chargeur
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
@@ -0,0 +1,125 @@
+"""
+Équivalence du moteur vectorisé (moteur_matching_batch) avec le scoring unitaire (utils/scoring.py).
+Lance avec: python -m app.test_moteur_matching_batch
+"""
+
+import random
+
+import numpy as np
+
+from app.ai.moteur_matching import calculer_similarite_cosinus
+from app.ai.moteur_matching_batch import (
+    _score_competences,
+    _score_experience,
+    _score_langues,
+    calculer_similarites_cosinus,
+    caracteristiques_cv,
+    caracteristiques_offre,
+    classer_cvs_pour_offre,
+    classer_offres_pour_cv,
+)
+from app.utils.scoring import calculer_score_final, determiner_recommandation
+
+
+COMPETENCES = ["Python", "FastAPI", "Django", "SQL", "PostgreSQL", "Docker", "Kubernetes", "React", "Java", "Git", "node-js"]
+LANGUES = ["Français courant", "Anglais B2", "Espagnol", "Allemand notions", "Arabe"]
+FORMATIONS = ["Bac", "BTS Informatique", "Licence Informatique", "Master Data Science", "Ingénieur", "Doctorat"]
+PERIODES = ["2018-2021", "2 ans", "2020 - 2024", "6 mois", "", "2015-2016"]
+
+
+def _cv_aleatoire(rng: random.Random) -> dict:
+    return {
+        "competences": rng.sample(COMPETENCES, rng.randint(0, 6)),
+        "experiences": [{"poste": "Dev", "periode": rng.choice(PERIODES)} for _ in range(rng.randint(0, 3))],
+        "formations": [{"diplome": rng.choice(FORMATIONS)} for _ in range(rng.randint(0, 2))],
+        "langues": rng.sample(LANGUES, rng.randint(0, 3)),
+    }
+
+
+def _offre_aleatoire(rng: random.Random) -> dict:
+    return {
+        "titre": "Poste",
+        "competences_requises": rng.sample(COMPETENCES, rng.randint(0, 5)),
+        "experience_requise_ans": rng.randint(0, 6),
+        "niveau_etudes_requis": rng.randint(0, 5),
+        "langues_requises": rng.sample(LANGUES, rng.randint(0, 2)),
+    }
+
+
+def _vecteurs(rng: np.random.Generator, n: int, dim: int = 16) -> np.ndarray:
+    return rng.normal(size=(n, dim))
+
+
+def test_criteres_identiques_au_scoring_unitaire():
+    """Chaque critère calculé sur caractéristiques = celui de calculer_score_final."""
+    rng = random.Random(42)
+    for _ in range(300):
+        cv, offre = _cv_aleatoire(rng), _offre_aleatoire(rng)
+        cv_f, offre_f = caracteristiques_cv(cv), caracteristiques_offre(offre)
+        details = calculer_score_final(0.5, cv, offre)["details"]
+
+        assert round(_score_competences(cv_f, offre_f) * 100, 2) == details["competences"]["score"], (cv, offre)
+        assert round(_score_experience(cv_f["annees"], offre_f["annees_requises"]) * 100, 2) == details["experience"]["score"], (cv, offre)
+        assert round(_score_langues(cv_f, offre_f) * 100, 2) == details["langues"]["score"], (cv, offre)
+
+
+def test_similarites_identiques_au_cosinus_unitaire():
+    rng = np.random.default_rng(0)
+    requete = rng.normal(size=16)
+    matrice = _vecteurs(rng, 50)
+    matrice[3] = 0.0  # vecteur nul : similarité 0
+
+    sims = calculer_similarites_cosinus(requete, matrice)
+    attendues = [calculer_similarite_cosinus(list(requete), list(v)) for v in matrice]
+    assert np.allclose(sims, attendues), (sims, attendues)
+
+
+def test_classement_offres_identique_au_scoring_unitaire():
+    """Top-k vectorisé = tri des scores unitaires (score, recommandation, détails)."""
+    rng, rng_np = random.Random(7), np.random.default_rng(7)
+    cv = _cv_aleatoire(rng)
+    offres = [_offre_aleatoire(rng) for _ in range(40)]
+    cv_emb, offres_emb = rng_np.normal(size=16), _vecteurs(rng_np, 40)
+
+    attendus = []
+    for i, (offre, emb) in enumerate(zip(offres, offres_emb)):
+        sim = calculer_similarite_cosinus(list(cv_emb), list(emb))
+        attendus.append((calculer_score_final(sim, cv, offre), i))
+
+    resultats = classer_offres_pour_cv(cv, list(cv_emb), offres, list(offres_emb), top_k=10)
+    assert len(resultats) == 10
+
+    scores_attendus = sorted((r["score_final"] for r, _ in attendus), reverse=True)[:10]
+    assert [r["score_final"] for r in resultats] == scores_attendus
+    for r in resultats:
+        scoring, _ = attendus[r["index"]]
+        assert r["score_final"] == scoring["score_final"]
+        assert r["details"] == scoring["details"]
+        assert r["recommandation"] == determiner_recommandation(scoring["score_final"])
+
+
+def test_classement_cvs_identique_au_scoring_unitaire():
+    rng, rng_np = random.Random(11), np.random.default_rng(11)
+    offre = _offre_aleatoire(rng)
+    cvs = [_cv_aleatoire(rng) for _ in range(25)]
+    offre_emb, cvs_emb = rng_np.normal(size=16), _vecteurs(rng_np, 25)
+
+    resultats = classer_cvs_pour_offre(offre, list(offre_emb), cvs, list(cvs_emb), top_k=100)
+    assert sorted(r["index"] for r in resultats) == list(range(25))
+    for r in resultats:
+        sim = calculer_similarite_cosinus(list(offre_emb), list(cvs_emb[r["index"]]))
+        assert r["score_final"] == calculer_score_final(sim, cvs[r["index"]], offre)["score_final"]
+    scores = [r["score_final"] for r in resultats]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_listes_vides():
+    assert classer_offres_pour_cv({}, [1.0, 0.0], [], []) == []
+    assert classer_cvs_pour_offre({}, [1.0, 0.0], [], []) == []
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
@@ -0,0 +1,223 @@
+"""
+Passerelle LLM contre le faux serveur (serveur_llm_factice) : disjoncteur fermé → ouvert →
+demi-ouvert → fermé, budget de relances, état partagé hors de la boucle d'événements.
+Lance avec: python -m app.test_passerelle_llm
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+# État partagé dans un dossier temporaire : pas d'écriture dans cache/
+os.environ.setdefault("LLM_SHARED_STATE_PATH", os.path.join(tempfile.mkdtemp(), "passerelle_llm.sqlite"))
+
+import app.ai.passerelle_llm as passerelle_llm
+import app.ai.serveur_llm_factice as serveur_llm_factice
+from app.ai.passerelle_llm import (
+    DEMI_OUVERT, FERME, OUVERT, Disjoncteur, DisjoncteurOuvert, PasserelleLLM, SeauJetons,
+)
+
+
+class ErreurHTTP(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _serveur(taux_429: float = 0.0, taux_500: float = 0.0) -> int:
+    """Démarre un faux LLM sur un port libre et retourne ce port."""
+    serveur = serveur_llm_factice.demarrer(port=0, latence_ms=1, taux_429=taux_429, taux_500=taux_500)
+    return serveur.server_address[1]
+
+
+def _appel(port: int) -> dict:
+    corps = {"model": "factice", "messages": [{"role": "user", "content": "Extrais ce CV"}]}
+    requete = urllib.request.Request(
+        f"http://127.0.0.1:{port}/v1/chat/completions",
+        data=json.dumps(corps).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(requete, timeout=5) as reponse:
+            return json.loads(reponse.read())
+    except urllib.error.HTTPError as e:
+        raise ErreurHTTP(e.code)
+
+
+def _requetes_recues() -> int:
+    with serveur_llm_factice._stats_lock:
+        return serveur_llm_factice._stats["requetes"]
+
+
+def _passerelle(seuil: int = 2, pause_s: float = 0.2) -> PasserelleLLM:
+    """Passerelle neuve : état partagé dans un fichier temporaire, débit non limitant."""
+    chemin = os.path.join(tempfile.mkdtemp(), "passerelle.sqlite")
+    passerelle = PasserelleLLM()
+    passerelle.seau = SeauJetons(1000, 1000, chemin)
+    passerelle.disjoncteur = Disjoncteur(seuil, pause_s, chemin)
+    return passerelle
+
+
+@contextmanager
+def _reglages(**valeurs):
+    origines = {nom: getattr(passerelle_llm, nom) for nom in valeurs}
+    for nom, valeur in valeurs.items():
+        setattr(passerelle_llm, nom, valeur)
+    try:
+        yield
+    finally:
+        for nom, valeur in origines.items():
+            setattr(passerelle_llm, nom, valeur)
+
+
+def _echoue(fn, exception=ErreurHTTP):
+    try:
+        fn()
+    except exception:
+        return
+    raise AssertionError(f"{exception.__name__} attendue")
+
+
+PORT_SAIN = _serveur()
+PORT_EN_PANNE = _serveur(taux_500=1.0)
+PORT_SATURE = _serveur(taux_429=1.0)
+
+
+def test_disjoncteur_ouvert_demi_ouvert_ferme():
+    passerelle = _passerelle(seuil=2, pause_s=0.2)
+    with _reglages(LLM_RELANCES_MAX=0):
+        assert passerelle.appeler(lambda: _appel(PORT_SAIN))["choices"]
+        assert passerelle.disjoncteur.etat == FERME
+
+        # Deux 500 consécutifs : ouvert, les appels suivants n'atteignent plus le serveur
+        _echoue(lambda: passerelle.appeler(lambda: _appel(PORT_EN_PANNE)))
+        assert passerelle.disjoncteur.etat == FERME
+        _echoue(lambda: passerelle.appeler(lambda: _appel(PORT_EN_PANNE)))
+        assert passerelle.disjoncteur.etat == OUVERT
+        avant = _requetes_recues()
+        _echoue(lambda: passerelle.appeler(lambda: _appel(PORT_SAIN)), DisjoncteurOuvert)
+        assert _requetes_recues() == avant
+        assert passerelle.stats()["rejets_disjoncteur"] == 1
+
+        # Pause écoulée : un seul essai, son échec rouvre le disjoncteur
+        time.sleep(0.25)
+        _echoue(lambda: passerelle.appeler(lambda: _appel(PORT_EN_PANNE)))
+        assert passerelle.disjoncteur.etat == OUVERT
+        assert passerelle.disjoncteur.stats()["ouvertures"] == 2
+
+        time.sleep(0.25)
+        assert passerelle.disjoncteur.autoriser() == DEMI_OUVERT
+        assert passerelle.disjoncteur.autoriser() is None  # essai déjà en cours
+        passerelle.disjoncteur.abandon()  # essai annulé : un autre est permis
+
+        # Essai réussi : refermé
+        assert passerelle.appeler(lambda: _appel(PORT_SAIN))["choices"]
+        stats = passerelle.disjoncteur.stats()
+        assert stats["etat"] == FERME and stats["echecs_consecutifs"] == 0
+
+
+def test_disjoncteur_partage_entre_instances():
+    chemin = os.path.join(tempfile.mkdtemp(), "passerelle.sqlite")
+    worker_1, worker_2 = Disjoncteur(1, 0.2, chemin), Disjoncteur(1, 0.2, chemin)
+    worker_1.echec()
+    assert worker_2.etat == OUVERT and worker_2.autoriser() is None
+    time.sleep(0.25)
+    assert worker_1.autoriser() == DEMI_OUVERT
+    assert worker_2.autoriser() is None  # un seul essai pour tous les process
+    worker_1.succes()
+    assert worker_2.etat == FERME
+
+
+def test_budget_relances():
+    passerelle = _passerelle(seuil=100)
+    avant = _requetes_recues()
+    with _reglages(LLM_RELANCES_MAX=3, LLM_BUDGET_RELANCES=0.2, LLM_BACKOFF_INITIAL_S=0.001):
+        for _ in range(5):
+            _echoue(lambda: passerelle.appeler(lambda: _appel(PORT_SATURE)))
+
+    stats = passerelle.stats()
+    # 1er appel : 3 relances (franchise, puis LLM_RELANCES_MAX) ; appels 2 à 4 : budget épuisé ;
+    # 5e : 0.2 x 5 + 3 = 4 relances permises, une de plus, puis refus
+    assert stats["appels"] == 5
+    assert stats["relances"] == 4, stats
+    assert stats["relances_refusees_budget"] == 4, stats
+    assert _requetes_recues() - avant == stats["appels"] + stats["relances"]
+
+
+def test_relance_puis_succes_en_async():
+    passerelle = _passerelle(seuil=100)
+    ports = [PORT_SATURE, PORT_SATURE, PORT_SAIN]
+
+    async def appel():
+        return await asyncio.to_thread(_appel, ports.pop(0))
+
+    with _reglages(LLM_BACKOFF_INITIAL_S=0.001):
+        reponse = asyncio.run(passerelle.aappeler(appel))
+    assert reponse["choices"]
+    stats = passerelle.stats()
+    assert stats["relances"] == 2 and stats["succes"] == 1 and stats["en_cours"] == 0
+
+
+def test_etat_partage_hors_de_la_boucle():
+    """Verrou SQLite tenu par un autre process : la boucle d'événements continue de tourner."""
+    passerelle = _passerelle()
+    autre_worker = sqlite3.connect(passerelle.disjoncteur._etat.chemin, isolation_level=None, check_same_thread=False)
+    autre_worker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.3, lambda: autre_worker.execute("COMMIT")).start()
+
+    async def scenario():
+        ecarts = []
+
+        async def horloge():
+            precedent = time.monotonic()
+            while not appel.done():
+                await asyncio.sleep(0.01)
+                maintenant = time.monotonic()
+                ecarts.append(maintenant - precedent)
+                precedent = maintenant
+
+        appel = asyncio.ensure_future(passerelle.aappeler(lambda: asyncio.to_thread(_appel, PORT_SAIN)))
+        await horloge()
+        return await appel, ecarts
+
+    debut = time.monotonic()
+    reponse, ecarts = asyncio.run(scenario())
+    assert reponse["choices"]
+    assert time.monotonic() - debut >= 0.3  # l'appel a bien attendu le verrou
+    assert max(ecarts) < 0.15, max(ecarts)
+
+
+def test_annulation_pendant_l_admission_rend_le_jeton():
+    passerelle = _passerelle()
+    passerelle.seau = SeauJetons(0.001, 1, os.path.join(tempfile.mkdtemp(), "seau.sqlite"))
+    autre_worker = sqlite3.connect(passerelle.seau._etat.chemin, isolation_level=None, check_same_thread=False)
+    autre_worker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.2, lambda: autre_worker.execute("COMMIT")).start()
+
+    async def scenario():
+        appel = asyncio.ensure_future(passerelle.aappeler(lambda: asyncio.to_thread(_appel, PORT_SAIN)))
+        await asyncio.sleep(0.05)  # bloqué sur le verrou du seau
+        appel.cancel()
+        try:
+            await appel
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.4)  # réservation aboutie puis rendue depuis un thread
+
+    asyncio.run(scenario())
+    assert passerelle.seau.disponibles() >= 0.99
+    assert passerelle.stats()["en_cours"] == 0
+
+
+if __name__ == "__main__":
+    for nom, test in list(globals().items()):
+        if nom.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {nom}")
@@ -0,0 +1,334 @@
+"""
+Indexation en masse des CV et offres dans Chroma.
+- Sources : tables cvs / offres_emploi (streaming) ou dossier de JSON (ex. app/cv_extraits)
+- Vecteurs déjà stockés en BDD (tampon modèle + hash à jour) réutilisés tels quels ;
+  seuls les documents au tampon périmé sont encodés, par gros lots via embed_texts, et leur
+  tampon est persisté. Upsert Chroma par chunks
+- Reprise possible grâce à un fichier checkpoint (dernier ID indexé)
+
+Usage :
+    python -m app.vector_store.bulk_indexing cvs --source db
+    python -m app.vector_store.bulk_indexing cvs --source dossier --dossier app/cv_extraits
+    python -m app.vector_store.bulk_indexing offres --taille-lot 512 --reset
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.ai.embeddings import MODEL_NAME, embed_texts, hash_texte
+from app.vector_store.chroma_client import dossier_persistance, get_collection, nom_collection
+from app.vector_store.indexing import load_json_file
+from app.vector_store.text_builders import build_cv_text, build_offer_text
+
+
+# (id, json, metadata, tampon d'embedding stocké en BDD {embedding, modele, hash} ou None)
+Document = Tuple[str, Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]
+
+
+# ============================================
+# SOURCES
+# ============================================
+
+def iter_cvs_db(depuis_id: Optional[str] = None, taille_lot: int = 256) -> Iterator[Document]:
+    """Parcourt les CV ingérés par ID croissant, sans charger texte_brut."""
+    from app.core.database import SessionLocal
+    from app.models.cv import CV
+    from app.services.ingestion_cv import cv_ingere
+
+    db = SessionLocal()
+    try:
+        q = db.query(
+            CV.id, CV.json_structure, CV.candidat_id, CV.fichier_nom,
+            CV.embedding, CV.embedding_modele, CV.embedding_hash,
+        ).filter(cv_ingere())
+        if depuis_id:
+            q = q.filter(CV.id > depuis_id)
+        for cv_id, cv_json, candidat_id, fichier_nom, emb, modele, empreinte in q.order_by(CV.id).yield_per(taille_lot):
+            yield (
+                str(cv_id),
+                cv_json or {},
+                {"candidat_id": str(candidat_id), "nom_fichier": fichier_nom},
+                {"embedding": emb, "modele": modele, "hash": empreinte},
+            )
+    finally:
+        db.close()
+
+
+def iter_offres_db(depuis_id: Optional[str] = None, taille_lot: int = 256) -> Iterator[Document]:
+    """Parcourt la table offres_emploi par ID croissant."""
+    from app.core.database import SessionLocal
+    from app.models.offre_emploi import OffreEmploi
+
+    db = SessionLocal()
+    try:
+        q = db.query(
+            OffreEmploi.id,
+            OffreEmploi.json_structure,
+            OffreEmploi.titre,
+            OffreEmploi.description,
+            OffreEmploi.recruteur_id,
+            OffreEmploi.embedding,
+            OffreEmploi.embedding_modele,
+            OffreEmploi.embedding_hash,
+        )
+        if depuis_id:
+            q = q.filter(OffreEmploi.id > depuis_id)
+        lignes = q.order_by(OffreEmploi.id).yield_per(taille_lot)
+        for offre_id, offre_json, titre, description, recruteur_id, emb, modele, empreinte in lignes:
+            yield (
+                str(offre_id),
+                offre_json or {"titre": titre, "description": description},
+                {"recruteur_id": str(recruteur_id), "titre": titre},
+                {"embedding": emb, "modele": modele, "hash": empreinte},
+            )
+    finally:
+        db.close()
+
+
+def iter_dossier_json(dossier: str, depuis_id: Optional[str] = None) -> Iterator[Document]:
+    """Parcourt les fichiers .json d'un dossier par nom croissant (ID = nom sans extension)."""
+    for filename in sorted(f for f in os.listdir(dossier) if f.lower().endswith(".json")):
+        doc_id = os.path.splitext(filename)[0]
+        if depuis_id and doc_id <= depuis_id:
+            continue
+        yield doc_id, load_json_file(os.path.join(dossier, filename)), {"source_file": filename}, None
+
+
+# ============================================
+# CHECKPOINT
+# ============================================
+
+def chemin_checkpoint_defaut(collection: str, source: str) -> str:
+    # Nom versionné par le modèle : un changement de modèle ne reprend pas l'ancien checkpoint
+    return os.path.join(dossier_persistance(), f"bulk_{nom_collection(collection)}_{source}.checkpoint.json")
+
+
+def lire_checkpoint(chemin: str) -> Dict[str, Any]:
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ecrire_checkpoint(chemin: str, data: Dict[str, Any]) -> None:
+    tmp = chemin + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, chemin)  # écriture atomique
+
+
+# ============================================
+# INDEXATION
+# ============================================
+
+def _nettoyer_metadata(md: Dict[str, Any], type_doc: str) -> Dict[str, Any]:
+    # Chroma refuse les valeurs None dans les métadonnées
+    propre = {k: v for k, v in md.items() if v is not None}
+    propre.setdefault("type", type_doc)
+    return propre
+
+
+def _persister_tampons(modele_bdd: Any, lignes: List[Tuple[str, List[float], str]]) -> None:
+    """Enregistre en BDD les embeddings recalculés (même tampon que embedding_service)."""
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for doc_id, vecteur, empreinte in lignes:
+            db.query(modele_bdd).filter(modele_bdd.id == doc_id).update(
+                {"embedding": vecteur, "embedding_modele": MODEL_NAME, "embedding_hash": empreinte},
+                synchronize_session=False,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def indexer_en_masse(
+    documents: Iterable[Document],
+    collection: str,
+    build_text: Callable[[Dict[str, Any]], str],
+    type_doc: str,
+    taille_lot: int = 256,
+    checkpoint: Optional[str] = None,
+    deja_indexes: int = 0,
+    texte_matching: Optional[Callable[[Dict[str, Any]], str]] = None,
+    modele_bdd: Any = None,
+) -> Dict[str, Any]:
+    """
+    Encode (si besoin) et upsert des documents par lots.
+
+    Args:
+        documents: Itérable (id, json, metadata, tampon), trié par ID croissant pour la reprise
+        collection: Nom de la collection Chroma
+        build_text: build_cv_text ou build_offer_text
+        type_doc: "cv" ou "offre" (métadonnée type)
+        taille_lot: Nombre de documents encodés puis upsertés ensemble
+        checkpoint: Fichier de reprise mis à jour après chaque lot
+        deja_indexes: Compteur repris du checkpoint
+        texte_matching: preparer_texte_cv / preparer_texte_offre (texte du vecteur stocké en BDD)
+        modele_bdd: CV / OffreEmploi, pour persister les tampons recalculés
+
+    Returns:
+        Dict: documents indexés, ignorés (texte vide), vecteurs réutilisés/encodés, durée et débit (docs/s)
+    """
+    col = get_collection(collection)
+    debut = time.perf_counter()
+    indexes = 0
+    ignores = 0
+    reutilises = 0
+    lot: list = []
+
+    def _vecteurs() -> List[List[float]]:
+        """Vecteur stocké si son tampon est à jour, sinon encodage groupé (et tampon persisté)."""
+        nonlocal reutilises
+        vecteurs: List[Optional[List[float]]] = [None] * len(lot)
+        a_encoder: List[Tuple[int, str, Optional[str]]] = []  # (position, texte, empreinte à persister)
+        for i, (_, doc, _, doc_json, tampon) in enumerate(lot):
+            texte = texte_matching(doc_json) if tampon is not None and texte_matching else ""
+            if not texte.strip():
+                a_encoder.append((i, doc, None))  # comme index_cv_from_json sans vecteur stocké
+                continue
+            empreinte = hash_texte(texte)
+            if tampon["embedding"] is not None and tampon["modele"] == MODEL_NAME and tampon["hash"] == empreinte:
+                vecteurs[i] = [float(x) for x in tampon["embedding"]]
+                reutilises += 1
+            else:
+                a_encoder.append((i, texte, empreinte))
+        if a_encoder:
+            for (i, _, _), vecteur in zip(a_encoder, embed_texts([texte for _, texte, _ in a_encoder])):
+                vecteurs[i] = vecteur
+            a_persister = [(lot[i][0], vecteurs[i], empreinte) for i, _, empreinte in a_encoder if empreinte]
+            if a_persister and modele_bdd is not None:
+                _persister_tampons(modele_bdd, a_persister)
+        return vecteurs
+
+    def _flush() -> None:
+        nonlocal indexes
+        if not lot:
+            return
+        ids, docs, mds, _, _ = zip(*lot)
+        col.upsert(
+            ids=list(ids),
+            documents=list(docs),
+            metadatas=list(mds),
+            embeddings=_vecteurs(),
+        )
+        indexes += len(lot)
+        if checkpoint:
+            ecrire_checkpoint(checkpoint, {"dernier_id": ids[-1], "indexes": deja_indexes + indexes})
+        duree = time.perf_counter() - debut
+        print(f"📚 {deja_indexes + indexes} documents indexés ({indexes / duree:.1f} docs/s)")
+        lot.clear()
+
+    for doc_id, doc_json, md, tampon in documents:
+        texte = build_text(doc_json)
+        if not texte:
+            ignores += 1
+            continue
+        lot.append((doc_id, texte, _nettoyer_metadata(md, type_doc), doc_json, tampon))
+        if len(lot) >= taille_lot:
+            _flush()
+    _flush()
+
+    duree = time.perf_counter() - debut
+    return {
+        "collection": collection,
+        "indexes": indexes,
+        "total_indexes": deja_indexes + indexes,
+        "ignores": ignores,
+        "vecteurs_reutilises": reutilises,
+        "vecteurs_encodes": indexes - reutilises,
+        "duree_s": round(duree, 2),
+        "docs_par_seconde": round(indexes / duree, 1) if duree > 0 else 0.0,
+    }
+
+
+def reindexer(
+    cible: str,
+    source: str = "db",
+    dossier: Optional[str] = None,
+    taille_lot: int = 256,
+    checkpoint: Optional[str] = None,
+    reset: bool = False,
+) -> Dict[str, Any]:
+    """
+    Point d'entrée programmatique (CLI ou script) : (ré)indexe les CV ou les offres.
+
+    Args:
+        cible: "cvs" ou "offres"
+        source: "db" (tables PostgreSQL) ou "dossier" (fichiers JSON)
+        dossier: Dossier des JSON si source="dossier"
+        taille_lot: Taille des lots d'encodage / upsert
+        checkpoint: Fichier de reprise (par défaut dans CHROMA_PERSIST_DIR)
+        reset: Ignore le checkpoint existant et repart du début
+    """
+    if cible == "cvs":
+        collection, build_text, type_doc = settings.CHROMA_COLLECTION_CVS, build_cv_text, "cv"
+    elif cible == "offres":
+        collection, build_text, type_doc = settings.CHROMA_COLLECTION_OFFRES, build_offer_text, "offre"
+    else:
+        raise ValueError(f"Cible inconnue : {cible} (cvs | offres)")
+
+    checkpoint = checkpoint or chemin_checkpoint_defaut(collection, source)
+    etat = {} if reset else lire_checkpoint(checkpoint)
+    depuis_id = etat.get("dernier_id")
+    if depuis_id:
+        print(f"↩️  Reprise après l'ID {depuis_id} ({etat.get('indexes', 0)} déjà indexés)")
+
+    texte_matching, modele_bdd = None, None
+    if source == "db":
+        from app.ai.moteur_matching import preparer_texte_cv, preparer_texte_offre
+        from app.models.cv import CV
+        from app.models.offre_emploi import OffreEmploi
+        iterateur = iter_cvs_db if cible == "cvs" else iter_offres_db
+        documents = iterateur(depuis_id, taille_lot)
+        texte_matching = preparer_texte_cv if cible == "cvs" else preparer_texte_offre
+        modele_bdd = CV if cible == "cvs" else OffreEmploi
+    elif source == "dossier":
+        if not dossier:
+            raise ValueError("--dossier requis avec --source dossier")
+        documents = iter_dossier_json(dossier, depuis_id)
+    else:
+        raise ValueError(f"Source inconnue : {source} (db | dossier)")
+
+    return indexer_en_masse(
+        documents,
+        collection,
+        build_text,
+        type_doc,
+        taille_lot=taille_lot,
+        checkpoint=checkpoint,
+        deja_indexes=etat.get("indexes", 0),
+        texte_matching=texte_matching,
+        modele_bdd=modele_bdd,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Indexation en masse Chroma (CV / offres)")
+    parser.add_argument("cible", choices=["cvs", "offres"])
+    parser.add_argument("--source", choices=["db", "dossier"], default="db")
+    parser.add_argument("--dossier", default=None, help="Dossier de JSON (source=dossier)")
+    parser.add_argument("--taille-lot", type=int, default=256)
+    parser.add_argument("--checkpoint", default=None, help="Fichier de reprise")
+    parser.add_argument("--reset", action="store_true", help="Repartir du début (ignore le checkpoint)")
+    args = parser.parse_args()
+
+    stats = reindexer(
+        args.cible,
+        source=args.source,
+        dossier=args.dossier,
+        taille_lot=args.taille_lot,
+        checkpoint=args.checkpoint,
+        reset=args.reset,
+    )
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
+import hashlib
 import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 
 from app.core.config import settings
 
 
-def _persist_dir() -> str:
+def dossier_persistance() -> str:
     """
     Dossier où Chroma stocke ses données (persistant).
     On le résout en chemin absolu pour éviter les surprises.
@@ -16,20 +21,153 @@ def _persist_dir() -> str:
     return path
 
 
-# Embedding local (pas de clé, pas de quota)
-_embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+class SharedEmbeddingFunction(EmbeddingFunction):
+    """
+    Embedding Chroma branché sur app.ai.embeddings (même instance SentenceTransformer
+    que le moteur de matching) : un seul modèle en mémoire, vecteurs réutilisables
+    entre la BDD, Chroma et le scoring.
+    """
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        from app.ai.embeddings import embed_texts
+        return embed_texts(list(input))
+
+    @staticmethod
+    def name() -> str:
+        return "sparkmind-sentence-transformer"
+
+    def get_config(self) -> dict:
+        from app.ai.embeddings import MODEL_NAME
+        return {"model_name": MODEL_NAME}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "SharedEmbeddingFunction":
+        return SharedEmbeddingFunction()
+
+
+# Embedding local partagé (pas de clé, pas de quota, pas de second modèle ONNX)
+_embedding_fn = SharedEmbeddingFunction()
+
+
+def nom_collection(name: str) -> str:
+    """
+    Nom physique d'une collection, versionné par le modèle d'embedding (cvs → cvs__all-MiniLM-L6-v2) :
+    changer de modèle ouvre une nouvelle collection au lieu de mélanger deux espaces de vecteurs
+    (ou d'entrer en conflit avec la fonction d'embedding enregistrée par Chroma).
+    """
+    from app.ai.embeddings import MODEL_NAME
+    modele = re.sub(r"[^a-zA-Z0-9_-]+", "-", MODEL_NAME).strip("-_")
+    nom = f"{name}__{modele}"
+    if len(nom) > 63:  # limite de Chroma
+        nom = f"{nom[:54].rstrip('-_')}-{hashlib.sha256(nom.encode()).hexdigest()[:8]}"
+    return nom
+
+
+# ============================================
+# REGISTRE DU CLIENT (1 par process) ET DES COLLECTIONS
+# ============================================
+
+_lock = threading.Lock()
+_client: Optional[chromadb.PersistentClient] = None
+_collections: Dict[str, Any] = {}
+_stats = {
+    "clients_ouverts": 0,
+    "client_reutilise": 0,
+    "collections_ouvertes": 0,
+    "collection_reutilisee": 0,
+}
+_a_reconstruire: List[str] = []  # collections vides alors qu'une version d'un autre modèle existe
+
+
+def ouvrir_client() -> chromadb.PersistentClient:
+    """
+    Ouvre le client Chroma du process (idempotent).
+    Appelé au démarrage par le lifespan FastAPI, sinon à la première utilisation.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = chromadb.PersistentClient(path=dossier_persistance())
+            _stats["clients_ouverts"] += 1
+        return _client
 
 
 def get_client() -> chromadb.PersistentClient:
-    return chromadb.PersistentClient(path=_persist_dir())
+    if _client is not None:
+        with _lock:
+            _stats["client_reutilise"] += 1
+        return _client
+    return ouvrir_client()
+
+
+def _signaler_reconstruction(client, name: str, col) -> None:
+    """Alerte si la collection du modèle courant est vide alors qu'une autre version est remplie."""
+    try:
+        if col.count() > 0:
+            return
+        existantes = [getattr(c, "name", c) for c in client.list_collections()]
+    except Exception:
+        return
+    anciennes = [n for n in existantes if n != col.name and (n == name or n.startswith(f"{name}__"))]
+    if not anciennes:
+        return
+    _a_reconstruire.append(col.name)
+    print(
+        f"🚨 Collection Chroma '{col.name}' vide : l'index existant ({', '.join(anciennes)}) a été construit "
+        f"avec un autre modèle d'embedding et n'est plus utilisé. La recherche se rabat sur un scan complet "
+        f"tant que l'index n'est pas reconstruit : python -m app.vector_store.bulk_indexing {name} --source db"
+    )
 
 
 def get_collection(name: str):
     """
-    Récupère ou crée une collection Chroma (cvs / offres).
+    Récupère ou crée une collection Chroma (cvs / offres), dans sa version du modèle d'embedding courant.
+    Le handle est mis en cache : les SQLite/HNSW ne sont pas rouverts à chaque requête.
     """
+    col = _collections.get(name)
+    if col is not None:
+        with _lock:
+            _stats["collection_reutilisee"] += 1
+        return col
+
     client = get_client()
-    return client.get_or_create_collection(
-        name=name,
-        embedding_function=_embedding_fn,
-    )
+    with _lock:
+        col = _collections.get(name)
+        if col is None:
+            col = client.get_or_create_collection(
+                name=nom_collection(name),
+                embedding_function=_embedding_fn,
+            )
+            _signaler_reconstruction(client, name, col)
+            _collections[name] = col
+            _stats["collections_ouvertes"] += 1
+        return col
+
+
+def fermer_client() -> None:
+    """Libère le client et les handles de collections (arrêt de l'application)."""
+    global _client
+    with _lock:
+        client = _client
+        _client = None
+        _collections.clear()
+    if client is None:
+        return
+    try:
+        client.clear_system_cache()
+    except Exception:
+        pass
+
+
+def stats_chroma() -> Dict[str, Any]:
+    """Compteurs d'ouverture/réutilisation du client et des collections."""
+    with _lock:
+        return {
+            **_stats,
+            "client_actif": _client is not None,
+            "collections_en_cache": sorted(c.name for c in _collections.values()),
+            "collections_a_reconstruire": list(_a_reconstruire),
+        }
@@ -1,7 +1,8 @@
 import json
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 from app.core.config import settings
+from app.ai.embeddings import embed_text
 from app.vector_store.chroma_client import get_collection
 from app.vector_store.text_builders import build_cv_text, build_offer_text
 
@@ -9,8 +10,13 @@ from app.vector_store.text_builders import build_cv_text, build_offer_text
 def index_cv_from_json(
     cv_id: str,
     cv_json: Dict[str, Any],
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    embedding: Optional[List[float]] = None
 ):
+    """
+    Indexe un CV. Si `embedding` est fourni (ex. vecteur déjà stocké en BDD),
+    il est passé tel quel à Chroma : pas de second encodage.
+    """
     col = get_collection(settings.CHROMA_COLLECTION_CVS)
     doc = build_cv_text(cv_json)
 
@@ -21,14 +27,19 @@ def index_cv_from_json(
         ids=[cv_id],
         documents=[doc],
         metadatas=[md],
+        embeddings=[embedding if embedding is not None else embed_text(doc)],
     )
 
 
 def index_offer(
     offer_id: str,
     offer: Union[Dict[str, Any], str],
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    embedding: Optional[List[float]] = None
 ):
+    """
+    Indexe une offre. Si `embedding` est fourni, il est passé tel quel à Chroma.
+    """
     col = get_collection(settings.CHROMA_COLLECTION_OFFRES)
     doc = build_offer_text(offer)
 
@@ -39,26 +50,37 @@ def index_offer(
         ids=[offer_id],
         documents=[doc],
         metadatas=[md],
+        embeddings=[embedding if embedding is not None else embed_text(doc)],
     )
 
 
-def search_cvs_for_offer(offer: Union[Dict[str, Any], str], top_k: int = 10):
+def search_cvs_for_offer(
+    offer: Union[Dict[str, Any], str],
+    top_k: int = 10,
+    query_embedding: Optional[List[float]] = None
+):
     col = get_collection(settings.CHROMA_COLLECTION_CVS)
-    query_text = build_offer_text(offer)
+    if query_embedding is None:
+        query_embedding = embed_text(build_offer_text(offer))
 
     return col.query(
-        query_texts=[query_text],
+        query_embeddings=[query_embedding],
         n_results=top_k,
         include=["metadatas", "distances", "documents"],
     )
 
 
-def search_offres_for_cv(cv_json: Dict[str, Any], top_k: int = 10):
+def search_offres_for_cv(
+    cv_json: Dict[str, Any],
+    top_k: int = 10,
+    query_embedding: Optional[List[float]] = None
+):
     col = get_collection(settings.CHROMA_COLLECTION_OFFRES)
-    query_text = build_cv_text(cv_json)
+    if query_embedding is None:
+        query_embedding = embed_text(build_cv_text(cv_json))
 
     return col.query(
-        query_texts=[query_text],
+        query_embeddings=[query_embedding],
         n_results=top_k,
         include=["metadatas", "distances", "documents"],
     )